@@ -0,0 +1,61 @@
+"""Accounts creation and deletion throughput, per-call and bulk.
+
+Usage: DSN=postgresql://... python benchmarks/bulk_accounts.py
+
+Database must be migrated. The app runs in-process, accounts are created
+and deleted one request per account and then by bulk requests.
+"""
+import asyncio
+import time
+
+import httpx
+from asgi_lifespan import LifespanManager
+from paymaster.scripts.main import get_application
+
+ACCOUNTS = 20000
+BULK_SIZE = 10000
+CONCURRENCY = 16
+PER_CALL_USERS = range(1000000, 1000000 + ACCOUNTS)
+BULK_USERS = range(2000000, 2000000 + ACCOUNTS)
+
+
+async def per_call(client: httpx.AsyncClient, method: str, path: str) -> float:  # noqa: D103 E501
+    queue = iter(PER_CALL_USERS)
+
+    async def worker() -> None:  # noqa: WPS430
+        for user_id in queue:
+            await client.request(method, path.format(user_id))
+
+    started_at = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(CONCURRENCY)])
+    return ACCOUNTS / (time.perf_counter() - started_at)
+
+
+async def bulk(client: httpx.AsyncClient, path: str) -> float:  # noqa: D103
+    started_at = time.perf_counter()
+    for start in range(0, ACCOUNTS, BULK_SIZE):
+        response = await client.post(path, json={
+            'user_ids': list(BULK_USERS[start:start + BULK_SIZE]),
+        })
+        assert not response.json()['conflicts']
+    return ACCOUNTS / (time.perf_counter() - started_at)
+
+
+async def main() -> None:  # noqa: D103
+    app = get_application()
+    async with LifespanManager(app):
+        async with httpx.AsyncClient(app=app, base_url='http://test') as client:
+            created = await per_call(
+                client, 'POST', '/account/create/user_id/{0}',
+            )
+            deleted = await per_call(
+                client, 'DELETE', '/account/delete/user_id/{0}',
+            )
+            print(f'per-call: created/s: {created:.0f}, deleted/s: {deleted:.0f}')  # noqa: E501
+            created = await bulk(client, '/accounts/create')
+            deleted = await bulk(client, '/accounts/delete')
+            print(f'bulk: created/s: {created:.0f}, deleted/s: {deleted:.0f}')
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,53 @@
+"""Cold start and time-to-first-request benchmark.
+
+Usage: DSN=postgresql://... python benchmarks/cold_start.py
+"""
+import asyncio
+import subprocess  # noqa: S404
+import sys
+import time
+
+import httpx
+from asgi_lifespan import LifespanManager
+
+RUNS = 5
+
+
+def measure_import() -> float:
+    """Measure app import time in fresh interpreter.
+
+    Returns:
+        seconds
+    """
+    started_at = time.perf_counter()
+    subprocess.run(  # noqa: S603
+        [sys.executable, '-c', 'import paymaster.scripts.main'],
+        check=True,
+    )
+    return time.perf_counter() - started_at
+
+
+async def measure_first_request() -> float:
+    """Measure time from app startup to first served request.
+
+    Returns:
+        seconds
+    """
+    from paymaster.scripts.main import get_application  # noqa: WPS433
+
+    started_at = time.perf_counter()
+    app = get_application()
+    async with LifespanManager(app):
+        async with httpx.AsyncClient(
+            app=app,
+            base_url='http://testserver',
+        ) as client:
+            await client.get('/balance/get/user_id/1')
+    return time.perf_counter() - started_at
+
+
+if __name__ == '__main__':
+    imports = [measure_import() for _ in range(RUNS)]
+    print('interpreter + import, s: {0:.3f}'.format(min(imports)))
+    first_request = asyncio.run(measure_first_request())
+    print('startup + first request, s: {0:.3f}'.format(first_request))
@@ -0,0 +1,67 @@
+"""Credits throughput to one account by stripes count.
+
+Usage: DSN=postgresql://... python benchmarks/hot_account.py
+
+Database must be migrated. Each credit is a transfer from one of many
+senders to the same merchant account, as with checkout payments.
+"""
+import asyncio
+import time
+
+from paymaster.app.data_schemas import OperationType
+from paymaster.database.db import (
+    change_balance,
+    create_acc,
+    set_acc_stripes,
+    transfer_between_accs,
+)
+from paymaster.database.sharding import create_shard_router, get_shard_dsns
+from paymaster.money import Money
+
+STRIPES = (1, 2, 4, 8, 16)
+SENDERS = 64
+CREDITS_PER_SENDER = 100
+MERCHANT_ID = 900000000
+
+
+async def send_credits(router, sender_id: int) -> None:  # noqa: D103
+    for _ in range(CREDITS_PER_SENDER):
+        async with router.connection(sender_id) as db_con:
+            await transfer_between_accs(
+                sender_id=sender_id,
+                recipient_id=MERCHANT_ID,
+                qty_value=Money.from_major(1),
+                db_con=db_con,
+            )
+
+
+async def main() -> None:  # noqa: D103
+    router = await create_shard_router(get_shard_dsns()[:1])
+    senders = range(MERCHANT_ID + 1, MERCHANT_ID + 1 + SENDERS)
+    try:
+        async with router.connection(MERCHANT_ID) as db_con:
+            await create_acc(MERCHANT_ID, db_con)
+            for sender_id in senders:
+                await create_acc(sender_id, db_con)
+                await change_balance(
+                    user_id=sender_id,
+                    qty_value=Money.from_major(1000000),
+                    operation_type=OperationType.replenishment,
+                    db_con=db_con,
+                )
+        for stripes_count in STRIPES:
+            async with router.connection(MERCHANT_ID) as db_con:
+                await set_acc_stripes(MERCHANT_ID, stripes_count, db_con)
+            started_at = time.perf_counter()
+            await asyncio.gather(*[
+                send_credits(router, sender_id) for sender_id in senders
+            ])
+            elapsed = time.perf_counter() - started_at
+            throughput = SENDERS * CREDITS_PER_SENDER / elapsed
+            print(f'stripes: {stripes_count}, credits/s: {throughput:.0f}')
+    finally:
+        await router.close()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
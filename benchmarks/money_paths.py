@@ -0,0 +1,96 @@
+"""CPU cost of amounts handling on request hot paths.
+
+Usage: python benchmarks/money_paths.py
+
+Compares Decimal amounts scaled on every step with integer minor units of
+Money: parsing of request total, balance conversion and rendering of
+history page. Database isn't needed.
+"""
+import json
+import random
+import timeit
+from decimal import Decimal
+from typing import Any, Dict, List
+
+from paymaster.app.data_schemas import Operation, PageOut
+from paymaster.money import Money
+from pydantic import BaseModel, ConstrainedDecimal
+
+RUNS = 5
+NUMBER = 2000
+PAGE_SIZE = 100
+RATE = Decimal('0.0132')
+FRACTIONAL_VALUE = Decimal(100)
+
+
+class DecimalTotal(ConstrainedDecimal):  # noqa: D101
+    gt = Decimal(0)
+    decimal_places = 2
+
+
+class DecimalOperation(BaseModel):  # noqa: D101
+    operation: str
+    user_id: int
+    total: DecimalTotal
+
+
+class DecimalPageOut(BaseModel):  # noqa: D101
+    content: List[Dict[str, Any]]  # noqa: WPS110
+
+
+request = {'operation': 'replenishment', 'user_id': 1, 'total': '1234.56'}
+stripes_sum = 123456789
+rows = [
+    {'deal_with': 1, 'description': 'payment', 'total': random.randint(  # noqa: S311 E501
+        -100000, 100000,
+    )}
+    for _ in range(PAGE_SIZE)
+]
+
+
+def decimal_request() -> int:  # noqa: D103
+    return int(DecimalOperation(**request).total * FRACTIONAL_VALUE)
+
+
+def money_request() -> int:  # noqa: D103
+    return Operation(**request).total.minor
+
+
+def decimal_balance() -> Decimal:  # noqa: D103
+    balance = Decimal(stripes_sum) / FRACTIONAL_VALUE
+    return Decimal(round(balance * RATE, 2))
+
+
+def money_balance() -> Money:  # noqa: D103
+    return Money(stripes_sum).convert(RATE)
+
+
+def decimal_history() -> str:  # noqa: D103
+    page = [
+        dict(row, total=row['total'] / FRACTIONAL_VALUE) for row in rows
+    ]
+    return DecimalPageOut(content=page).json()
+
+
+def money_history() -> str:  # noqa: D103
+    page = [dict(row, total=Money(row['total'])) for row in rows]
+    return PageOut(content=page).json()
+
+
+def measure(func) -> float:  # noqa: D103
+    timings = timeit.repeat(func, number=NUMBER, repeat=RUNS)
+    return min(timings) / NUMBER * 1e6
+
+
+if __name__ == '__main__':
+    assert money_request() == decimal_request()
+    assert money_balance().major == decimal_balance()
+    assert json.loads(money_history()) == json.loads(decimal_history())
+    for name, decimal_path, money_path in (
+        ('request total', decimal_request, money_request),
+        ('balance conversion', decimal_balance, money_balance),
+        (f'history page of {PAGE_SIZE}', decimal_history, money_history),
+    ):
+        print('{0}: decimal {1:.2f} us, money {2:.2f} us'.format(
+            name, measure(decimal_path), measure(money_path),
+        ))
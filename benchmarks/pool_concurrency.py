@@ -0,0 +1,78 @@
+"""Requests served by fixed connections pool.
+
+Usage: DSN=postgresql://... python benchmarks/pool_concurrency.py
+
+Database must be migrated. The app runs in-process with a small pool and
+a mix of balance reads, transfers and rejected transfers; the ratio of
+request latency to connection hold time shows how many requests share
+one pooled connection.
+"""
+import asyncio
+import os
+import random
+import time
+
+os.environ.setdefault('POOL_MAX_SIZE', '4')
+os.environ.setdefault('BALANCE_CACHE_SIZE', '10000')
+
+import httpx  # noqa: E402
+from asgi_lifespan import LifespanManager  # noqa: E402
+from paymaster.scripts.main import get_application  # noqa: E402
+
+CLIENTS = 64
+REQUESTS_PER_CLIENT = 50
+USERS = range(700000, 700100)
+
+
+async def prepare(client: httpx.AsyncClient) -> None:  # noqa: D103
+    for user_id in USERS:
+        await client.post(f'/account/create/user_id/{user_id}')
+        await client.post('/balance/change', json={
+            'operation': 'replenishment', 'user_id': user_id, 'total': 1000,
+        })
+
+
+async def run_client(client: httpx.AsyncClient, statuses: dict) -> None:  # noqa: D103 E501
+    for _ in range(REQUESTS_PER_CLIENT):
+        sender_id, recipient_id = random.sample(USERS, 2)  # noqa: S311
+        dice = random.random()  # noqa: S311
+        if dice < 0.5:  # noqa: WPS459
+            response = await client.get(
+                f'/balance/get/user_id/{sender_id}?max_staleness=1',
+            )
+        elif dice < 0.8:
+            response = await client.post('/transactions/transfer', json={
+                'sender_id': sender_id, 'recipient_id': recipient_id, 'total': 1,
+            })
+        else:
+            response = await client.post('/transactions/transfer', json={
+                'sender_id': sender_id, 'recipient_id': sender_id, 'total': 1,
+            })
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1  # noqa: E501
+
+
+async def main() -> None:  # noqa: D103
+    app = get_application()
+    async with LifespanManager(app):
+        async with httpx.AsyncClient(app=app, base_url='http://test') as client:
+            await prepare(client)
+            admission = app.state.shards.admissions[0]
+            acquired, held = admission.acquired, admission.held_seconds
+            statuses: dict = {}
+            started_at = time.perf_counter()
+            await asyncio.gather(*[
+                run_client(client, statuses) for _ in range(CLIENTS)
+            ])
+            elapsed = time.perf_counter() - started_at
+    requests = CLIENTS * REQUESTS_PER_CLIENT
+    latency = CLIENTS * elapsed / requests
+    hold = (admission.held_seconds - held) / requests
+    print(f'requests/s: {requests / elapsed:.0f}, statuses: {statuses}')
+    print(f'acquires per request: {(admission.acquired - acquired) / requests:.2f}')  # noqa: E501
+    print(f'mean latency, ms: {latency * 1000:.2f}')
+    print(f'mean connection hold per request, ms: {hold * 1000:.2f}')
+    print(f'requests served per connection: {latency / hold:.1f}')
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,108 @@
+"""Transfers throughput of many app replicas with and without pooler.
+
+Usage: DSN=postgresql://localhost:6432/treasury \\
+    DIRECT_DSN=postgresql://localhost:5432/treasury \\
+    python benchmarks/pooler_mode.py
+
+Run a PgBouncer stand-in in transaction mode with
+``docker-compose --profile pooler up -d pgbouncer``. Database must be
+migrated. Each replica has its own pool; replicas connect to database
+directly in session mode and through the pooler in transaction mode.
+Server connections are counted on the direct url.
+"""
+import asyncio
+import random
+import time
+
+from asyncpg import connect
+from paymaster.app.data_schemas import OperationType
+from paymaster.database.db import change_balance, create_acc, get_balance
+from paymaster.database.sagas import transfer
+from paymaster.database.sharding import (
+    TRANSACTION_POOLER_MODE,
+    create_shard_router,
+    get_direct_dsns,
+    get_shard_dsns,
+)
+from paymaster.money import Money
+
+REPLICAS = 16
+CLIENTS_PER_REPLICA = 8
+REQUESTS_PER_CLIENT = 100
+USERS = range(800000, 800100)
+
+
+async def prepare(dsn: str) -> None:  # noqa: D103
+    router = await create_shard_router([dsn])
+    try:
+        async with router.connection(USERS[0]) as db_con:
+            for user_id in USERS:
+                await create_acc(user_id, db_con)
+                await change_balance(
+                    user_id=user_id,
+                    qty_value=Money.from_major(1000000),
+                    operation_type=OperationType.replenishment,
+                    db_con=db_con,
+                )
+    finally:
+        await router.close()
+
+
+async def run_client(router) -> None:  # noqa: D103
+    for _ in range(REQUESTS_PER_CLIENT):
+        sender_id, recipient_id = random.sample(USERS, 2)  # noqa: S311
+        if random.random() < 0.5:  # noqa: S311 WPS459
+            async with router.connection(sender_id) as db_con:
+                await db_con.set_statement_timeout(1000)  # noqa: WPS432
+                await get_balance(sender_id, db_con)
+        else:
+            await transfer(router, sender_id, recipient_id, Money(1))
+
+
+async def count_server_connections(dsn: str) -> int:  # noqa: D103
+    conn = await connect(dsn)
+    try:
+        return await conn.fetchval(
+            """ SELECT count(*)
+                FROM pg_stat_activity
+                WHERE datname = current_database()
+                AND pid != pg_backend_pid();""",
+        )
+    finally:
+        await conn.close()
+
+
+async def measure(dsn: str, pooler_mode: str, direct_dsn: str) -> None:  # noqa: D103 E501
+    routers = [
+        await create_shard_router([dsn], pooler_mode)
+        for _ in range(REPLICAS)
+    ]
+    try:
+        started_at = time.perf_counter()
+        await asyncio.gather(*[
+            run_client(router)
+            for router in routers
+            for _ in range(CLIENTS_PER_REPLICA)
+        ])
+        elapsed = time.perf_counter() - started_at
+        connections = await count_server_connections(direct_dsn)
+    finally:
+        for router in routers:
+            await router.close()
+    requests = REPLICAS * CLIENTS_PER_REPLICA * REQUESTS_PER_CLIENT
+    print(
+        f'{pooler_mode}: requests/s: {requests / elapsed:.0f}, '
+        f'server connections: {connections}',
+    )
+
+
+async def main() -> None:  # noqa: D103
+    pooled_dsn = get_shard_dsns()[0]
+    direct_dsn = get_direct_dsns()[0]
+    await prepare(direct_dsn)
+    await measure(direct_dsn, 'session', direct_dsn)
+    await measure(pooled_dsn, TRANSACTION_POOLER_MODE, direct_dsn)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
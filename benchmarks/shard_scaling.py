@@ -0,0 +1,82 @@
+"""Transfers throughput by shards count.
+
+Usage: SHARD_DSNS=postgresql://...,postgresql://... \\
+    python benchmarks/shard_scaling.py
+
+Databases must be migrated and empty. Transfers are made between accounts
+of the same shard, one cross-shard transfer per CROSS_SHARD_EVERY.
+"""
+import asyncio
+import random
+import time
+
+from paymaster.app.data_schemas import OperationType
+from paymaster.database.db import change_balance, create_acc
+from paymaster.database.sagas import transfer
+from paymaster.database.sharding import create_shard_router, get_shard_dsns
+from paymaster.money import Money
+
+ACCOUNTS_PER_SHARD = 200
+CONCURRENCY_PER_SHARD = 8
+TRANSFERS_PER_SHARD = 2000
+CROSS_SHARD_EVERY = 10
+FIRST_USER_ID = 1000000
+
+
+async def prepare_accounts(router, users) -> None:  # noqa: D103
+    for user_id in users:
+        async with router.connection(user_id) as db_con:
+            await create_acc(user_id, db_con)
+            await change_balance(
+                user_id=user_id,
+                qty_value=Money.from_major(1000000),
+                operation_type=OperationType.replenishment,
+                db_con=db_con,
+            )
+
+
+async def run_transfers(router, users, transfers: int) -> None:  # noqa: D103
+    by_shard = {}
+    for user_id in users:
+        by_shard.setdefault(router.shard_of(user_id), []).append(user_id)
+    for index in range(transfers):
+        sender_id = random.choice(users)  # noqa: S311
+        if index % CROSS_SHARD_EVERY:
+            candidates = by_shard[router.shard_of(sender_id)]
+        else:
+            candidates = users
+        recipient_id = random.choice(candidates)  # noqa: S311
+        if recipient_id != sender_id:
+            await transfer(router, sender_id, recipient_id, Money.from_major(1))
+
+
+async def measure(dsns, first_user_id: int) -> float:  # noqa: D103
+    router = await create_shard_router(dsns)
+    users = list(range(
+        first_user_id,
+        first_user_id + ACCOUNTS_PER_SHARD * len(dsns),
+    ))
+    try:
+        await prepare_accounts(router, users)
+        workers = CONCURRENCY_PER_SHARD * len(dsns)
+        transfers = TRANSFERS_PER_SHARD * len(dsns) // workers
+        started_at = time.perf_counter()
+        await asyncio.gather(*[
+            run_transfers(router, users, transfers) for _ in range(workers)
+        ])
+        elapsed = time.perf_counter() - started_at
+    finally:
+        await router.close()
+    return transfers * workers / elapsed
+
+
+async def main() -> None:  # noqa: D103
+    dsns = get_shard_dsns()
+    for shards_count in range(1, len(dsns) + 1):
+        first_user_id = FIRST_USER_ID * shards_count
+        throughput = await measure(dsns[:shards_count], first_user_id)
+        print(f'shards: {shards_count}, transfers/s: {throughput:.0f}')
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
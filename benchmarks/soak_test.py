@@ -0,0 +1,244 @@
+"""Long-running soak test with memory, connections and event loop checks.
+
+Usage: DSN=postgresql://... DIRECT_DSN=postgresql://... \\
+    SOAK_DURATION=14400 SOAK_RATE=100 python benchmarks/soak_test.py
+
+Database must be migrated. The app runs in-process and is driven at fixed
+request rate by a mix of balance, history, transfer and conversion
+requests. When API_KEY is set, currency rates are also fetched from remote
+server periodically, as the background job does. Every sample interval
+traced python memory, RSS, server connections of the database and the
+worst event loop lag are recorded. Samples of the warm-up period are
+dropped, the rest are split in thirds: growth is sustained when medians
+rise from third to third and the last one exceeds the first by more than
+threshold. Exits with 1 on sustained growth of any metric and prints
+the allocations grown most since the end of warm-up.
+"""
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Dict, List, Optional
+
+import httpx
+from asgi_lifespan import LifespanManager
+from asyncpg import connect
+from paymaster.currencies import get_currencies_rates
+from paymaster.database.sharding import get_direct_dsns
+from paymaster.scripts.main import get_application
+
+DURATION = float(os.getenv('SOAK_DURATION', '14400'))
+WARMUP = float(os.getenv('SOAK_WARMUP', '600'))
+RATE = float(os.getenv('SOAK_RATE', '100'))
+SAMPLE_INTERVAL = float(os.getenv('SOAK_SAMPLE_INTERVAL', '60'))
+CURRENCIES_INTERVAL = float(os.getenv('SOAK_CURRENCIES_INTERVAL', '60'))
+MAX_IN_FLIGHT = 256
+LAG_PROBE_INTERVAL = 0.1
+TOP_ALLOCATIONS = 15
+API_KEY = os.getenv('API_KEY')
+USERS = range(900000, 901000)
+# growth of last third median over the first one, per metric
+THRESHOLDS = {  # noqa: WPS407
+    'traced_mb': float(os.getenv('SOAK_TRACED_THRESHOLD', '10')),
+    'rss_mb': float(os.getenv('SOAK_RSS_THRESHOLD', '50')),
+    'connections': float(os.getenv('SOAK_CONNECTIONS_THRESHOLD', '2')),
+    'loop_lag_ms': float(os.getenv('SOAK_LAG_THRESHOLD', '50')),
+}
+MEGABYTE = 1024 * 1024
+
+
+class Stats(object):  # noqa: D101
+    def __init__(self) -> None:  # noqa: D107
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+        self.max_lag = 0.0
+
+
+async def prepare(client: httpx.AsyncClient) -> None:  # noqa: D103
+    await client.post('/accounts/create', json={'user_ids': list(USERS)})
+    for user_id in USERS:
+        await client.post('/balance/change', json={
+            'operation': 'replenishment',
+            'user_id': user_id,
+            'total': 1000000,
+        })
+
+
+async def send_request(client: httpx.AsyncClient, stats: Stats) -> None:  # noqa: D103 E501
+    user_id, other_id = random.sample(USERS, 2)  # noqa: S311
+    choice = random.random()  # noqa: S311
+    if choice < 0.4:  # noqa: WPS459
+        request = client.get(f'/balance/get/user_id/{user_id}', params={
+            'currencies': ['EUR', 'RUB'],
+        })
+    elif choice < 0.6:  # noqa: WPS459
+        request = client.get(f'/transactions/history/user_id/{user_id}')
+    elif choice < 0.9:  # noqa: WPS459
+        request = client.post('/transactions/transfer', json={
+            'sender_id': user_id,
+            'recipient_id': other_id,
+            'total': 0.01,
+            'description': 'soak',
+        })
+    else:
+        request = client.post('/currencies/convert', json={'content': [
+            {'from_currency': 'USD', 'to_currency': 'EUR', 'amount': 10},
+        ]})
+    try:
+        response = await request
+    except httpx.HTTPError:
+        stats.failed += 1
+        return
+    if response.status_code >= 500:  # noqa: WPS432
+        stats.failed += 1
+
+
+async def drive(client: httpx.AsyncClient, stats: Stats, deadline: float) -> None:  # noqa: D103 E501
+    # open loop: requests are sent on schedule regardless of responses
+    in_flight = set()
+    interval = 1 / RATE
+    next_at = time.monotonic()
+    while next_at < deadline:
+        await asyncio.sleep(max(0, next_at - time.monotonic()))
+        next_at += interval
+        if len(in_flight) >= MAX_IN_FLIGHT:
+            stats.dropped += 1
+            continue
+        task = asyncio.ensure_future(send_request(client, stats))
+        in_flight.add(task)
+        task.add_done_callback(in_flight.discard)
+        stats.sent += 1
+    await asyncio.gather(*in_flight)
+
+
+async def probe_lag(stats: Stats, deadline: float) -> None:  # noqa: D103
+    while time.monotonic() < deadline:
+        started_at = time.monotonic()
+        await asyncio.sleep(LAG_PROBE_INTERVAL)
+        lag = time.monotonic() - started_at - LAG_PROBE_INTERVAL
+        stats.max_lag = max(stats.max_lag, lag)
+
+
+async def refresh_currencies(deadline: float) -> None:  # noqa: D103
+    while time.monotonic() < deadline:
+        await get_currencies_rates(API_KEY)
+        await asyncio.sleep(CURRENCIES_INTERVAL)
+
+
+def read_rss() -> Optional[float]:  # noqa: D103
+    try:
+        with open('/proc/self/statm') as statm:
+            pages = int(statm.read().split()[1])
+    except OSError:
+        return None
+    return pages * os.sysconf('SC_PAGE_SIZE') / MEGABYTE
+
+
+async def count_connections(dsn: str) -> int:  # noqa: D103
+    conn = await connect(dsn)
+    try:
+        return await conn.fetchval(
+            """ SELECT count(*)
+                FROM pg_stat_activity
+                WHERE datname = current_database()
+                AND pid != pg_backend_pid();""",
+        )
+    finally:
+        await conn.close()
+
+
+async def sample(  # noqa: D103
+    stats: Stats,
+    deadline: float,
+    samples: List[Dict[str, float]],
+) -> None:
+    dsn = get_direct_dsns()[0]
+    started_at = time.monotonic()
+    while time.monotonic() < deadline:
+        await asyncio.sleep(SAMPLE_INTERVAL)
+        traced, _ = tracemalloc.get_traced_memory()
+        metrics = {
+            'elapsed': time.monotonic() - started_at,
+            'traced_mb': traced / MEGABYTE,
+            'connections': await count_connections(dsn),
+            'loop_lag_ms': stats.max_lag * 1000,
+        }
+        rss = read_rss()
+        if rss is not None:
+            metrics['rss_mb'] = rss
+        stats.max_lag = 0
+        samples.append(metrics)
+        print(
+            ', '.join(f'{name}: {value:.1f}' for name, value in metrics.items()),  # noqa: E501
+            f'sent: {stats.sent}, failed: {stats.failed}, '
+            f'dropped: {stats.dropped}',
+        )
+
+
+def find_growth(samples: List[Dict[str, float]]) -> Dict[str, float]:
+    """Find metrics growing through the whole run.
+
+    Args:
+        samples: samples taken after warm-up
+
+    Returns:
+        growth of metrics exceeding thresholds
+    """
+    third = len(samples) // 3
+    if not third:
+        return {}
+    growth = {}
+    for name, threshold in THRESHOLDS.items():
+        values = [metrics[name] for metrics in samples if name in metrics]
+        if len(values) < len(samples):
+            continue
+        medians = [
+            statistics.median(values[start:start + third])
+            for start in (0, third, len(values) - third)
+        ]
+        rising = medians[0] < medians[1] < medians[2]
+        if rising and medians[2] - medians[0] > threshold:
+            growth[name] = medians[2] - medians[0]
+    return growth
+
+
+async def main() -> int:  # noqa: D103 WPS210
+    tracemalloc.start()
+    app = get_application()
+    stats = Stats()
+    samples: List[Dict[str, float]] = []
+    async with LifespanManager(app):
+        async with httpx.AsyncClient(app=app, base_url='http://test') as client:
+            await prepare(client)
+            deadline = time.monotonic() + DURATION
+            jobs = [
+                drive(client, stats, deadline),
+                probe_lag(stats, deadline),
+                sample(stats, deadline, samples),
+            ]
+            if API_KEY:
+                jobs.append(refresh_currencies(deadline))
+            warmup = asyncio.ensure_future(asyncio.sleep(WARMUP))
+            running = asyncio.gather(*jobs)
+            await warmup
+            baseline = tracemalloc.take_snapshot()
+            await running
+    steady = [metrics for metrics in samples if metrics['elapsed'] > WARMUP]
+    growth = find_growth(steady)
+    if not growth:
+        print('no sustained growth')
+        return 0
+    for name, grown in growth.items():
+        print(f'sustained growth of {name}: {grown:.1f}')
+    top = tracemalloc.take_snapshot().compare_to(baseline, 'lineno')
+    for allocation in top[:TOP_ALLOCATIONS]:
+        print(allocation)
+    return 1
+
+
+if __name__ == '__main__':
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,98 @@
+"""Throughput of production launcher by number of workers.
+
+Usage: DSN=postgresql://... DB_CONNECTIONS_BUDGET=64 \\
+    python benchmarks/worker_scaling.py
+
+Database must be migrated. The launcher is started for every number of
+workers up to number of CPUs, its pools are sized by the connections
+budget. Balance reads and balance changes are sent over keep-alive
+connections by concurrent clients from this process, so the load
+generator takes one core of the machine too.
+"""
+import asyncio
+import os
+import random
+import subprocess  # noqa: S404
+import sys
+import time
+
+import httpx
+
+PORT = 5055
+BASE_URL = f'http://127.0.0.1:{PORT}'
+CLIENTS = 64
+DURATION = 10
+STARTUP_TIMEOUT = 30
+USERS = range(700000, 700100)
+
+
+async def wait_ready(client: httpx.AsyncClient) -> None:  # noqa: D103
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        try:
+            await client.get('/openapi.json')
+        except httpx.TransportError:
+            await asyncio.sleep(0.2)  # noqa: WPS432
+        else:
+            return
+    raise SystemExit('Launcher has not started')
+
+
+async def prepare(client: httpx.AsyncClient) -> None:  # noqa: D103
+    await client.post('/accounts/create', json={'user_ids': list(USERS)})
+    for user_id in USERS:
+        await client.post('/balance/change', json={
+            'operation': 'replenishment',
+            'user_id': user_id,
+            'total': 1000000,
+        })
+
+
+async def run_client(client: httpx.AsyncClient, deadline: float) -> int:  # noqa: D103 E501
+    served = 0
+    while time.monotonic() < deadline:
+        user_id = random.choice(USERS)  # noqa: S311
+        if random.random() < 0.8:  # noqa: S311 WPS459
+            await client.get(f'/balance/get/user_id/{user_id}')
+        else:
+            await client.post('/balance/change', json={
+                'operation': 'replenishment',
+                'user_id': user_id,
+                'total': 1,
+            })
+        served += 1
+    return served
+
+
+async def measure(workers: int) -> float:  # noqa: D103
+    launcher = subprocess.Popen(  # noqa: S603
+        [sys.executable, 'paymaster/scripts/serve.py'],
+        env=dict(os.environ, WEB_WORKERS=str(workers), PORT=str(PORT)),
+    )
+    limits = httpx.Limits(max_connections=CLIENTS)
+    try:
+        async with httpx.AsyncClient(
+            base_url=BASE_URL, limits=limits,
+        ) as client:
+            await wait_ready(client)
+            if workers == 1:
+                await prepare(client)
+            deadline = time.monotonic() + DURATION
+            served = await asyncio.gather(*[
+                run_client(client, deadline) for _ in range(CLIENTS)
+            ])
+    finally:
+        launcher.terminate()
+        launcher.wait()
+    return sum(served) / DURATION
+
+
+async def main() -> None:  # noqa: D103
+    workers = 1
+    while workers <= (os.cpu_count() or 1):
+        print(f'workers: {workers}, requests/s: {await measure(workers):.0f}')
+        workers *= 2
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
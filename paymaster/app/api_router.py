@@ -1,6 +1,10 @@
 """API routes module."""
 import logging
-from typing import Any, Dict, Tuple
+import math
+from datetime import date, timezone
+from functools import partial
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from uuid import UUID, uuid4
 
 from asyncpg import Connection
 from fastapi import (
@@ -9,32 +13,104 @@ from fastapi import (
     HTTPException,
     Path,
     Query,
+    Request,
     Response,
     status,
 )
+from paymaster.app.cancellation import (
+    HTTP_499_CLIENT_CLOSED_REQUEST,
+    run_within_budget,
+)
 from paymaster.app.data_schemas import (
+    DESCRIPTION_MAX_LENGTH,
+    AccountConflict,
+    Accounts,
+    AccountsOut,
     Balance,
+    BalanceValue,
+    Conversions,
+    ConversionsOut,
+    Converted,
+    HistoryFilter,
+    Hold,
+    HoldOut,
+    ImportOut,
     Operation,
     PageOut,
+    QueuedTransferOut,
+    ScheduledTransfer,
+    ScheduledTransferOut,
+    ScheduledTransferState,
     SortKey,
+    StatementLine,
+    StatementOut,
+    StatementPeriod,
+    TotalValue,
     Transaction,
 )
-from paymaster.currencies import BASE_CURRENCY
+from paymaster.app.ledger_import import IMPORTS_SHARD_KEY, LedgerImport
+from paymaster.app.responses import MoneyJSONResponse
+from paymaster.app.traced_route import TracedRoute
+from paymaster.currencies import BASE_CURRENCY, CrossRates
+from paymaster.database.balance_cache import (
+    BalanceCache,
+    fetch_balance,
+    read_balance,
+)
+from paymaster.database.currency_rates import CurrencyRates
 from paymaster.database.db import (
-    FRACTIONAL_VALUE,
+    MAX_STRIPES,
+    HistoryPage,
+    cancel_scheduled_transfer,
+    capture_hold,
     change_balance,
     create_acc,
+    create_accs,
     delete_acc,
+    delete_accs,
     fetch_acc_history,
-    get_balance,
-    transfer_between_accs,
+    fetch_acc_statement,
+    fetch_acc_version,
+    fetch_import,
+    fetch_scheduled_transfer,
+    hold_funds,
+    release_hold,
+    schedule_transfer,
+    set_acc_stripes,
+)
+from paymaster.database.dependencies import (
+    ShardConnector,
+    get_balance_cache,
+    get_balance_connector,
+    get_currency_rates,
+    get_history_connector,
+    get_import_connector,
+    get_write_connector,
+)
+from paymaster.database.retry import retry_stats, run_with_retries
+from paymaster.database.sagas import transfer
+from paymaster.exceptions import (
+    AccountError,
+    BalanceValueError,
+    CurrencyError,
+    HoldError,
+    ImportNotFoundError,
+    ScheduledTransferError,
 )
-from paymaster.database.dependencies import get_connection_from_pool
-from paymaster.exceptions import AccountError, BalanceValueError
+from paymaster.money import Money
 from pydantic import PositiveInt
+from starlette.requests import ClientDisconnect
 
 LOGGER = logging.getLogger(__name__)
-router = APIRouter()
+USER_NOT_FOUND = 'User not found'
+UserIds = List[int]
+AccountsChange = Callable[[UserIds, Connection], Awaitable[UserIds]]
+SCHEDULED_TRANSFER_URL = (
+    '/transfers/scheduled/user_id/{user_id}/transfer_id/{transfer_id}'
+)
+router = APIRouter(
+    route_class=TracedRoute, default_response_class=MoneyJSONResponse,
+)
 
 
 @router.post(
@@ -43,11 +119,16 @@ router = APIRouter()
 )
 async def create_user_acc(
     user_id: PositiveInt,
-    connection: Connection = Depends(get_connection_from_pool),
+    http_request: Request,
+    connector: ShardConnector = Depends(get_write_connector),
 ) -> Response:
     """Create user account."""
     try:
-        await create_acc(user_id=user_id, db_con=connection)
+        async with connector.connection(user_id) as connection:
+            await run_within_budget(
+                http_request,
+                create_acc(user_id=user_id, db_con=connection),
+            )
     except AccountError as exc:
         LOGGER.warning(exc)
         raise HTTPException(
@@ -63,11 +144,90 @@ async def create_user_acc(
 )
 async def delete_user_acc(
     user_id: PositiveInt,
-    connection: Connection = Depends(get_connection_from_pool),
+    http_request: Request,
+    connector: ShardConnector = Depends(get_write_connector),
+    cache: Optional[BalanceCache] = Depends(get_balance_cache),
 ):
     """Delete user account."""
     try:
-        await delete_acc(user_id=user_id, db_con=connection)
+        async with connector.connection(user_id) as connection:
+            await run_within_budget(
+                http_request,
+                delete_acc(user_id=user_id, db_con=connection),
+            )
+    except AccountError as exc:
+        LOGGER.warning(exc)
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Account doesn't exists",
+        )
+    _invalidate_balances(cache, user_id)
+    return Response(status_code=status.HTTP_200_OK)
+
+
+@router.post(
+    '/accounts/create',
+    response_model=AccountsOut,
+    status_code=status.HTTP_200_OK,
+)
+async def create_user_accs(
+    request: Accounts,
+    http_request: Request,
+    connector: ShardConnector = Depends(get_import_connector),
+):
+    """Create user accounts at once, users having account are reported."""
+    created = await _change_accs(
+        http_request, connector, create_accs, request.user_ids,
+    )
+    return _report_accs(request.user_ids, created, 'Account already exists')
+
+
+@router.post(
+    '/accounts/delete',
+    response_model=AccountsOut,
+    status_code=status.HTTP_200_OK,
+)
+async def delete_user_accs(
+    request: Accounts,
+    http_request: Request,
+    connector: ShardConnector = Depends(get_import_connector),
+    cache: Optional[BalanceCache] = Depends(get_balance_cache),
+):
+    """Delete user accounts at once, users without account are reported."""
+    deleted = await _change_accs(
+        http_request, connector, delete_accs, request.user_ids,
+    )
+    _invalidate_balances(cache, *deleted)
+    return _report_accs(request.user_ids, deleted, "Account doesn't exists")
+
+
+@router.post(
+    '/account/stripes/user_id/{user_id}',
+    status_code=status.HTTP_200_OK,
+)
+async def stripe_user_acc(
+    user_id: PositiveInt,
+    http_request: Request,
+    stripes: int = Query(
+        ...,
+        ge=1,
+        le=MAX_STRIPES,
+        description='number of sub-ledgers for incoming credits',
+    ),
+    connector: ShardConnector = Depends(get_write_connector),
+):
+    """Spread incoming credits of high fan-in account across sub-ledgers."""
+    try:
+        async with connector.connection(user_id) as connection:
+            await run_within_budget(
+                http_request,
+                run_with_retries(partial(
+                    set_acc_stripes,
+                    user_id=user_id,
+                    stripes_count=stripes,
+                    db_con=connection,
+                )),
+            )
     except AccountError as exc:
         LOGGER.warning(exc)
         raise HTTPException(
@@ -80,21 +240,25 @@ async def delete_user_acc(
 @router.post('/balance/change', status_code=status.HTTP_201_CREATED)
 async def change_user_balance(
     request: Operation,
-    connection: Connection = Depends(get_connection_from_pool),
+    http_request: Request,
+    connector: ShardConnector = Depends(get_write_connector),
+    cache: Optional[BalanceCache] = Depends(get_balance_cache),
 ):
     """Change user balance."""
     try:
-        await change_balance(
-            user_id=request.user_id,
-            qty_value=request.total,
-            operation_type=request.operation.name,
-            db_con=connection,
-            description=request.description,
-        )
+        async with connector.connection(request.user_id) as connection:
+            await run_within_budget(http_request, run_with_retries(partial(
+                change_balance,
+                user_id=request.user_id,
+                qty_value=request.total,
+                operation_type=request.operation.name,
+                db_con=connection,
+                description=request.description,
+            )))
     except AccountError as exc:
         LOGGER.warning(exc)
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail='User not found',
+            status_code=status.HTTP_404_NOT_FOUND, detail=USER_NOT_FOUND,
         )
     except BalanceValueError as exc:
         LOGGER.warning(exc)
@@ -102,13 +266,16 @@ async def change_user_balance(
             status_code=status.HTTP_409_CONFLICT,
             detail='Insufficient funds on the debiting account',
         )
+    _invalidate_balances(cache, request.user_id)
     return Response(status_code=status.HTTP_201_CREATED)
 
 
 @router.post('/transactions/transfer', status_code=status.HTTP_201_CREATED)
 async def transfer_between_users(
     request: Transaction,
-    connection: Connection = Depends(get_connection_from_pool),
+    http_request: Request,
+    connector: ShardConnector = Depends(get_write_connector),
+    cache: Optional[BalanceCache] = Depends(get_balance_cache),
 ):
     """Transfer funds from one account to another."""
     if request.sender_id == request.recipient_id:
@@ -119,13 +286,13 @@ async def transfer_between_users(
         LOGGER.warning(exc)
         raise exc
     try:
-        await transfer_between_accs(
+        await run_within_budget(http_request, transfer(
+            connector=connector,
             sender_id=request.sender_id,
             recipient_id=request.recipient_id,
             qty_value=request.total,
             description=request.description,
-            db_con=connection,
-        )
+        ))
     except AccountError as exc:
         LOGGER.warning(exc)
         message = exc.args[0]
@@ -138,15 +305,278 @@ async def transfer_between_users(
             status_code=status.HTTP_409_CONFLICT,
             detail='Insufficient funds on the debiting account',
         )
+    _invalidate_balances(cache, request.sender_id, request.recipient_id)
+    return Response(status_code=status.HTTP_201_CREATED)
+
+
+@router.post(
+    '/transactions/transfer/queue',
+    response_model=QueuedTransferOut,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def queue_transfer_between_users(
+    request: Transaction,
+    http_request: Request,
+    connector: ShardConnector = Depends(get_write_connector),
+):
+    """Accept transfer for execution by transfer workers.
+
+    Transfer is queued as scheduled transfer due now, its outcome is
+    reported by scheduled transfer state.
+    """
+    if request.sender_id == request.recipient_id:
+        conflict = HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Sender and recipient accounts it's the same account",
+        )
+        LOGGER.warning(conflict)
+        raise conflict
+    operation_id = uuid4()
+    try:
+        async with connector.connection(request.sender_id) as connection:
+            await run_within_budget(http_request, schedule_transfer(
+                transfer_id=operation_id,
+                sender_id=request.sender_id,
+                recipient_id=request.recipient_id,
+                qty_value=request.total,
+                due_at=None,
+                db_con=connection,
+                description=request.description,
+            ))
+    except AccountError as exc:
+        LOGGER.warning(exc)
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail=USER_NOT_FOUND,
+        )
+    return QueuedTransferOut(
+        operation_id=operation_id,
+        status_url=SCHEDULED_TRANSFER_URL.format(
+            user_id=request.sender_id, transfer_id=operation_id,
+        ),
+    )
+
+
+@router.post(
+    '/transfers/schedule',
+    response_model=ScheduledTransferOut,
+    status_code=status.HTTP_201_CREATED,
+)
+async def schedule_user_transfer(
+    request: ScheduledTransfer,
+    http_request: Request,
+    connector: ShardConnector = Depends(get_write_connector),
+):
+    """Schedule transfer at due time, once or periodically."""
+    if request.sender_id == request.recipient_id:
+        conflict = HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Sender and recipient accounts it's the same account",
+        )
+        LOGGER.warning(conflict)
+        raise conflict
+    transfer_id = uuid4()
+    due_at = request.due_at
+    if due_at.tzinfo is not None:
+        due_at = due_at.astimezone(timezone.utc).replace(tzinfo=None)
+    try:
+        async with connector.connection(request.sender_id) as connection:
+            await run_within_budget(http_request, schedule_transfer(
+                transfer_id=transfer_id,
+                sender_id=request.sender_id,
+                recipient_id=request.recipient_id,
+                qty_value=request.total,
+                due_at=due_at,
+                db_con=connection,
+                period=request.period.value if request.period else None,
+                max_runs=request.runs,
+                description=request.description,
+            ))
+    except AccountError as exc:
+        LOGGER.warning(exc)
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail=USER_NOT_FOUND,
+        )
+    return ScheduledTransferOut(transfer_id=transfer_id, due_at=due_at)
+
+
+@router.get(
+    SCHEDULED_TRANSFER_URL,
+    response_model=ScheduledTransferState,
+    status_code=status.HTTP_200_OK,
+)
+async def get_scheduled_transfer(
+    user_id: PositiveInt,
+    transfer_id: UUID,
+    http_request: Request,
+    connector: ShardConnector = Depends(get_balance_connector),
+):
+    """Get runs of scheduled transfer of sender."""
+    try:
+        async with connector.connection(user_id) as connection:
+            scheduled = await run_within_budget(
+                http_request,
+                fetch_scheduled_transfer(transfer_id, user_id, connection),
+            )
+    except ScheduledTransferError as exc:
+        LOGGER.warning(exc)
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail='Scheduled transfer not found',
+        )
+    return ScheduledTransferState(**scheduled)
+
+
+@router.post(
+    '/transfers/cancel/user_id/{user_id}/transfer_id/{transfer_id}',
+    status_code=status.HTTP_200_OK,
+)
+async def cancel_user_transfer(
+    user_id: PositiveInt,
+    transfer_id: UUID,
+    http_request: Request,
+    connector: ShardConnector = Depends(get_write_connector),
+):
+    """Cancel future runs of scheduled transfer."""
+    try:
+        async with connector.connection(user_id) as connection:
+            await run_within_budget(
+                http_request,
+                cancel_scheduled_transfer(transfer_id, user_id, connection),
+            )
+    except ScheduledTransferError as exc:
+        LOGGER.warning(exc)
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail='Scheduled transfer not found',
+        )
+    return Response(status_code=status.HTTP_200_OK)
+
+
+@router.post(
+    '/holds/create',
+    response_model=HoldOut,
+    status_code=status.HTTP_201_CREATED,
+)
+async def hold_user_funds(
+    request: Hold,
+    http_request: Request,
+    connector: ShardConnector = Depends(get_write_connector),
+    cache: Optional[BalanceCache] = Depends(get_balance_cache),
+):
+    """Reserve user funds until capture, release or expiry."""
+    hold_id = uuid4()
+    try:
+        async with connector.connection(request.user_id) as connection:
+            expires_at = await run_within_budget(
+                http_request,
+                run_with_retries(partial(
+                    hold_funds,
+                    hold_id=hold_id,
+                    user_id=request.user_id,
+                    qty_value=request.total,
+                    ttl=request.ttl,
+                    db_con=connection,
+                    description=request.description,
+                )),
+            )
+    except AccountError as exc:
+        LOGGER.warning(exc)
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail=USER_NOT_FOUND,
+        )
+    except BalanceValueError as exc:
+        LOGGER.warning(exc)
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail='Insufficient funds on the debiting account',
+        )
+    _invalidate_balances(cache, request.user_id)
+    return HoldOut(hold_id=hold_id, expires_at=expires_at)
+
+
+@router.post(
+    '/holds/capture/user_id/{user_id}/hold_id/{hold_id}',
+    status_code=status.HTTP_201_CREATED,
+)
+async def capture_user_hold(  # noqa: WPS211
+    user_id: PositiveInt,
+    hold_id: UUID,
+    http_request: Request,
+    total: Optional[TotalValue] = Query(
+        None, description='captured total value, whole hold by default',
+    ),
+    connector: ShardConnector = Depends(get_write_connector),
+    cache: Optional[BalanceCache] = Depends(get_balance_cache),
+):
+    """Withdraw reserved user funds."""
+    try:
+        async with connector.connection(user_id) as connection:
+            await run_within_budget(http_request, run_with_retries(partial(
+                capture_hold,
+                hold_id=hold_id,
+                user_id=user_id,
+                db_con=connection,
+                qty_value=total,
+            )))
+    except HoldError as exc:
+        LOGGER.warning(exc)
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail='Active hold not found',
+        )
+    except AccountError as exc:
+        LOGGER.warning(exc)
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail='User not found',
+        )
+    except BalanceValueError as exc:
+        LOGGER.warning(exc)
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail='Captured total exceeds held funds',
+        )
+    _invalidate_balances(cache, user_id)
     return Response(status_code=status.HTTP_201_CREATED)
 
 
+@router.post(
+    '/holds/release/user_id/{user_id}/hold_id/{hold_id}',
+    status_code=status.HTTP_200_OK,
+)
+async def release_user_hold(
+    user_id: PositiveInt,
+    hold_id: UUID,
+    http_request: Request,
+    connector: ShardConnector = Depends(get_write_connector),
+    cache: Optional[BalanceCache] = Depends(get_balance_cache),
+):
+    """Return reserved user funds to available balance."""
+    try:
+        async with connector.connection(user_id) as connection:
+            await run_within_budget(http_request, run_with_retries(partial(
+                release_hold,
+                hold_id=hold_id,
+                user_id=user_id,
+                db_con=connection,
+            )))
+    except HoldError as exc:
+        LOGGER.warning(exc)
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail='Active hold not found',
+        )
+    _invalidate_balances(cache, user_id)
+    return Response(status_code=status.HTTP_200_OK)
+
+
 @router.get(
     '/balance/get/user_id/{user_id}',
     response_model=Balance,
     status_code=status.HTTP_200_OK,
 )
-async def get_user_balance(
+async def get_user_balance(  # noqa: WPS210 WPS211
+    http_request: Request,
+    response: Response,
     user_id: int = Path(..., description='external user id'),
     currency: str = Query(
         BASE_CURRENCY,
@@ -154,23 +584,67 @@ async def get_user_balance(
         max_length=3,
         description='currency alias for balance value presentation',
     ),
-    connection: Connection = Depends(get_connection_from_pool),
+    max_staleness: float = Query(
+        0,
+        ge=0,
+        description='acceptable age of cached balance in seconds, 0 for authoritative value',  # noqa: E501
+    ),
+    currencies: Optional[List[str]] = Query(
+        None,
+        description='additional currencies aliases for balance value presentation',  # noqa: E501
+    ),
+    connector: ShardConnector = Depends(get_balance_connector),
+    cache: Optional[BalanceCache] = Depends(get_balance_cache),
+    currency_rates: CurrencyRates = Depends(get_currency_rates),
 ):
-    """Get user account balance."""
+    """Get user account balance.
+
+    Authoritative balance is tagged by version of account ledger, it's
+    answered with 304 when the version isn't changed since tagged response.
+    """
     currency = currency.upper()
+    targets = [currency, *(alias.upper() for alias in currencies or ())]
+    cross_rates = await _get_cross_rates(currency_rates, connector, targets)
+    etag = None
     try:
-        balance = await get_balance(
-            user_id=user_id,
-            db_con=connection,
-            convert_to=currency,
-        )
+        if max_staleness:
+            balance = await run_within_budget(http_request, read_balance(
+                connector=connector,
+                user_id=user_id,
+                cache=cache,
+                max_staleness=max_staleness,
+            ))
+        else:
+            async with connector.connection(user_id) as connection:
+                # version is read before balance, so it's never newer
+                etag = await _fetch_etag(
+                    http_request,
+                    connection,
+                    user_id,
+                    cross_rates,
+                    with_held=True,
+                )
+                if etag is not None and _is_not_modified(http_request, etag):
+                    return _not_modified(etag)
+                balance = await run_within_budget(
+                    http_request, fetch_balance(user_id, connection, cache),
+                )
     except AccountError as exc:
         LOGGER.warning(exc)
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail='User not found',
+            detail=USER_NOT_FOUND,
         )
-    return Balance(user_id=user_id, balance=balance, currency=currency)
+    _set_etag(response, etag)
+    balances = {BASE_CURRENCY.upper(): balance}
+    if cross_rates is not None:
+        balances = _convert(cross_rates, [balance], targets)[0]
+    return Balance(
+        user_id=user_id,
+        balance=balances[currency],
+        currency=currency,
+        balances=balances if currencies else None,
+    )
 
 
 @router.get(
@@ -178,29 +652,359 @@ async def get_user_balance(
     response_model=PageOut,
     status_code=status.HTTP_200_OK,
 )
-async def get_user_history(  # noqa: WPS211
+async def get_user_history(  # noqa: WPS210 WPS211
+    http_request: Request,
+    response: Response,
     user_id: PositiveInt = Path(..., title='', description='external user id'),
     page_size: int = Query(20, gt=0, le=100, description='number of records per page'),  # noqa: WPS432 E501
     page_number: PositiveInt = Query(1, description='nuber of neccessary page'),
-    order_by_date: SortKey = Query(None, description='sort order by transaction date'),  # noqa: E501
-    order_by_total: SortKey = Query(None, description='sort order by transaction total value'),  # noqa: E501
-    connection: Connection = Depends(get_connection_from_pool),
+    order_by_date: SortKey = Query(
+        None, description='sort order by transaction date',
+    ),
+    order_by_total: SortKey = Query(
+        None, description='sort order by transaction total value',
+    ),
+    date_from: Optional[date] = Query(
+        None, description='first date of transactions',
+    ),
+    date_to: Optional[date] = Query(
+        None, description='last date of transactions',
+    ),
+    deal_with: Optional[PositiveInt] = Query(
+        None, description='external user id of counterparty',
+    ),
+    min_total: Optional[BalanceValue] = Query(
+        None, description='minimum signed transaction total value',
+    ),
+    max_total: Optional[BalanceValue] = Query(
+        None, description='maximum signed transaction total value',
+    ),
+    description: Optional[str] = Query(
+        None,
+        min_length=1,
+        max_length=DESCRIPTION_MAX_LENGTH,
+        description='transaction description prefix',
+    ),
+    currencies: Optional[List[str]] = Query(
+        None,
+        description='currencies aliases for transaction total value presentation',  # noqa: E501
+    ),
+    connector: ShardConnector = Depends(get_history_connector),
+    currency_rates: CurrencyRates = Depends(get_currency_rates),
 ):
-    """Get history of user account transactions."""
+    """Get history of user account transactions.
+
+    Pages are tagged by version of account ledger, they're answered with
+    304 when the version isn't changed since tagged response.
+    """
+    history_filter = HistoryFilter(
+        date_from=date_from,
+        date_to=date_to,
+        deal_with=deal_with,
+        min_total=min_total,
+        max_total=max_total,
+        description=description,
+    )
+    targets = [alias.upper() for alias in currencies or ()]
+    cross_rates = await _get_cross_rates(currency_rates, connector, targets)
     try:
-        history: Tuple[Dict[Any, Any], ...] = await fetch_acc_history(
-            user_id=user_id,
-            db_con=connection,
-            page_size=page_size,
-            page_number=page_number,
-            order_by_date=order_by_date,
-            order_by_total=order_by_total,
+        async with connector.connection(user_id) as connection:
+            etag = await _fetch_etag(
+                http_request, connection, user_id, cross_rates,
+            )
+            if etag is not None and _is_not_modified(http_request, etag):
+                return _not_modified(etag)
+            page: HistoryPage = await run_within_budget(
+                http_request,
+                fetch_acc_history(
+                    user_id=user_id,
+                    db_con=connection,
+                    page_size=page_size,
+                    page_number=page_number,
+                    order_by_date=order_by_date,
+                    order_by_total=order_by_total,
+                    history_filter=history_filter,
+                ),
+            )
+    except AccountError as exc:
+        LOGGER.warning(exc)
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail=USER_NOT_FOUND,
         )
+    if cross_rates is not None:
+        _add_converted(page.records, cross_rates, targets)
+    page_count = None
+    if page.total_count is not None:
+        page_count = math.ceil(page.total_count / page_size)
+    _set_etag(response, etag)
+    return PageOut(
+        content=page.records,
+        has_next=page.has_next,
+        total_count=page.total_count,
+        page_count=page_count,
+    )
+
+
+@router.get(
+    '/account/statement/user_id/{user_id}',
+    response_model=StatementOut,
+    status_code=status.HTTP_200_OK,
+)
+async def get_user_statement(  # noqa: WPS211
+    http_request: Request,
+    user_id: PositiveInt = Path(..., description='external user id'),
+    period: StatementPeriod = Query(StatementPeriod.month, description='statement period'),  # noqa: E501
+    date_from: date = Query(..., description='first date of statement'),
+    date_to: date = Query(..., description='last date of statement'),
+    connector: ShardConnector = Depends(get_history_connector),
+):
+    """Get user account statement with totals per day or month."""
+    try:
+        async with connector.connection(user_id) as connection:
+            statement = await run_within_budget(
+                http_request,
+                fetch_acc_statement(
+                    user_id=user_id,
+                    period=period,
+                    date_from=date_from,
+                    date_to=date_to,
+                    db_con=connection,
+                ),
+            )
     except AccountError as exc:
         LOGGER.warning(exc)
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail='User not found',
+            status_code=status.HTTP_404_NOT_FOUND, detail=USER_NOT_FOUND,
+        )
+    lines = [StatementLine(**line) for line in statement]
+    return StatementOut(user_id=user_id, period=period, content=lines)
+
+
+@router.post(
+    '/transactions/import',
+    response_model=ImportOut,
+    status_code=status.HTTP_201_CREATED,
+)
+async def import_transactions(
+    http_request: Request,
+    connector: ShardConnector = Depends(get_import_connector),
+    cache: Optional[BalanceCache] = Depends(get_balance_cache),
+):
+    """Import ledger records from NDJSON request body.
+
+    Each line is an operation with optional description and creation date.
+    Invalid lines and records which can't be applied are reported and
+    skipped, the rest is imported.
+    """
+    ledger_import = LedgerImport(connector, uuid4())
+    try:
+        await ledger_import.run(http_request.stream())
+    except ClientDisconnect as exc:
+        LOGGER.warning(exc)
+        raise HTTPException(
+            status_code=HTTP_499_CLIENT_CLOSED_REQUEST,
+            detail='Client closed request',
+        )
+    finally:
+        if cache is not None and ledger_import.imported:
+            cache.clear()
+    return ledger_import.report()
+
+
+@router.get(
+    '/transactions/import/{import_id}',
+    response_model=ImportOut,
+    status_code=status.HTTP_200_OK,
+)
+async def get_import_progress(
+    import_id: UUID,
+    connector: ShardConnector = Depends(get_history_connector),
+):
+    """Get progress of ledger import."""
+    try:
+        async with connector.connection(IMPORTS_SHARD_KEY) as connection:
+            ledger_import = await fetch_import(
+                import_id=import_id, db_con=connection,
+            )
+    except ImportNotFoundError as exc:
+        LOGGER.warning(exc)
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail='Import not found',
+        )
+    return ImportOut(import_id=import_id, **{
+        key: ledger_import[key]
+        for key in ('status', 'lines_count', 'imported', 'failed')
+    })
+
+
+@router.post(
+    '/currencies/convert',
+    response_model=ConversionsOut,
+    status_code=status.HTTP_200_OK,
+)
+async def convert_currencies(
+    request: Conversions,
+    connector: ShardConnector = Depends(get_balance_connector),
+    currency_rates: CurrencyRates = Depends(get_currency_rates),
+):
+    """Convert batch of amounts between any currencies."""
+    cross_rates = await currency_rates.get(connector)
+    try:
+        converted = cross_rates.convert_batch(
+            [conversion.amount for conversion in request.content],
+            [
+                (conversion.from_currency, conversion.to_currency)
+                for conversion in request.content
+            ],
+        )
+    except CurrencyError as exc:
+        LOGGER.warning(exc)
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=exc.args[0],
+        )
+    return ConversionsOut(content=[
+        Converted(converted=amount, **conversion.dict())
+        for conversion, amount in zip(request.content, converted)
+    ])
+
+
+@router.get('/cache/balance/stats', status_code=status.HTTP_200_OK)
+async def get_balance_cache_stats(
+    cache: Optional[BalanceCache] = Depends(get_balance_cache),
+) -> Dict[str, Any]:
+    """Get hit and miss counters of balance cache."""
+    if cache is None:
+        return {'enabled': False}
+    return {'enabled': True, **cache.stats()}
+
+
+@router.get('/database/retries/stats', status_code=status.HTTP_200_OK)
+async def get_retries_stats() -> Dict[str, Any]:
+    """Get counters of transactions retried after conflicts."""
+    return retry_stats.stats()
+
+
+async def _fetch_etag(
+    http_request: Request,
+    connection: Connection,
+    user_id: int,
+    cross_rates: Optional[CrossRates],
+    with_held: bool = False,
+) -> Optional[str]:
+    version = await run_within_budget(
+        http_request, fetch_acc_version(user_id, connection),
+    )
+    if version is None:
+        return None
+    parts = [str(version.account_id), str(version.version)]
+    if with_held:
+        parts.append(str(version.held))
+    if cross_rates is not None:
+        parts.append(cross_rates.tag)
+    return '"{0}"'.format('-'.join(parts))
+
+
+async def _get_cross_rates(
+    currency_rates: CurrencyRates,
+    connector: ShardConnector,
+    targets: List[str],
+) -> Optional[CrossRates]:
+    if all(target == BASE_CURRENCY.upper() for target in targets):
+        return None
+    return await currency_rates.get(connector)
+
+
+def _set_etag(response: Response, etag: Optional[str]) -> None:
+    if etag is not None:
+        response.headers['ETag'] = etag
+
+
+def _is_not_modified(http_request: Request, etag: str) -> bool:
+    if_none_match = http_request.headers.get('if-none-match')
+    if if_none_match is None:
+        return False
+    tags = {tag.strip() for tag in if_none_match.split(',')}
+    return bool(tags & {'*', etag, f'W/{etag}'})
+
+
+def _not_modified(etag: str) -> Response:
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED,
+        headers={'ETag': etag},
+    )
+
+
+def _invalidate_balances(cache: Optional[BalanceCache], *user_ids: int) -> None:
+    # other workers are notified by database triggers
+    if cache is not None:
+        for user_id in user_ids:
+            cache.invalidate(user_id)
+
+
+def _add_converted(
+    history: Tuple[Dict[Any, Any], ...],
+    cross_rates: CrossRates,
+    currencies: List[str],
+) -> None:
+    converted = _convert(
+        cross_rates, [record['total'] for record in history], currencies,
+    )
+    for record, totals in zip(history, converted):
+        record.update({'converted': totals})
+
+
+async def _change_accs(
+    http_request: Request,
+    connector: ShardConnector,
+    change: AccountsChange,
+    user_ids: List[int],
+) -> List[int]:
+    # one statement per shard
+    by_shard: Dict[int, List[int]] = {}
+    for user_id in user_ids:
+        by_shard.setdefault(connector.shard_of(user_id), []).append(user_id)
+    changed: List[int] = []
+    for shard_user_ids in by_shard.values():
+        async with connector.connection(shard_user_ids[0]) as connection:
+            changed.extend(await run_within_budget(
+                http_request, change(shard_user_ids, connection),
+            ))
+    return changed
+
+
+def _report_accs(
+    user_ids: List[int],
+    changed: List[int],
+    error: str,
+) -> AccountsOut:
+    succeeded = set(changed)
+    return AccountsOut(succeeded=changed, conflicts=[
+        AccountConflict(user_id=user_id, error=error)
+        for user_id in dict.fromkeys(user_ids)
+        if user_id not in succeeded
+    ])
+
+
+def _convert(
+    cross_rates: CrossRates,
+    amounts: List[Money],
+    currencies: List[str],
+) -> List[Dict[str, Money]]:
+    pairs = [(BASE_CURRENCY, currency) for currency in currencies]
+    try:
+        converted = cross_rates.convert_batch(
+            [amount for amount in amounts for _ in pairs],
+            pairs * len(amounts),
+        )
+    except CurrencyError as exc:
+        LOGGER.warning(exc)
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=exc.args[0],
         )
-    for record in history:
-        record.update({'total': record['total'] / FRACTIONAL_VALUE})
-    return PageOut(content=history)
+    return [
+        dict(zip(currencies, converted[index:index + len(pairs)]))
+        for index in range(0, len(converted), len(pairs))
+    ]
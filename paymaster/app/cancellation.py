@@ -0,0 +1,76 @@
+"""Cooperative cancellation of database calls."""
+import asyncio
+import logging
+from contextlib import suppress
+from typing import Awaitable, TypeVar
+
+from asyncpg import exceptions
+from fastapi import HTTPException, Request, status
+from paymaster.exceptions import TransactionConflictError
+
+DISCONNECT_POLL_INTERVAL = 0.1
+HTTP_499_CLIENT_CLOSED_REQUEST = 499  # noqa: WPS114
+CONFLICT_RETRY_AFTER = '1'
+LOGGER = logging.getLogger(__name__)
+ResultType = TypeVar('ResultType')
+
+
+async def run_within_budget(
+    request: Request,
+    db_call: Awaitable[ResultType],
+) -> ResultType:
+    """Run database call, cancel it when client disconnects.
+
+    Args:
+        request: incoming http request
+        db_call: database call
+
+    Returns:
+        result of database call
+
+    Raises:
+        HTTPException: time budget exceeded, client disconnected or
+            transaction conflicts weren't resolved by retries
+    """
+    task = asyncio.ensure_future(db_call)
+    try:
+        return await _wait_connected(request, task)
+    except exceptions.QueryCanceledError as exc:
+        LOGGER.warning(exc)
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail='Request time budget exceeded',
+        )
+    except TransactionConflictError as exc:
+        LOGGER.warning(exc)
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail='Conflicting concurrent transactions, try again later',
+            headers={'Retry-After': CONFLICT_RETRY_AFTER},
+        )
+    finally:
+        if not task.done():
+            await _cancel(task)
+
+
+async def _wait_connected(
+    request: Request,
+    task: 'asyncio.Future[ResultType]',
+) -> ResultType:
+    while not task.done():  # noqa: WPS328
+        await asyncio.wait({task}, timeout=DISCONNECT_POLL_INTERVAL)
+        if not task.done() and await request.is_disconnected():
+            await _cancel(task)
+            LOGGER.warning('Client disconnected, database call canceled')
+            raise HTTPException(
+                status_code=HTTP_499_CLIENT_CLOSED_REQUEST,
+                detail='Client closed request',
+            )
+    return task.result()
+
+
+async def _cancel(task: 'asyncio.Future[ResultType]') -> None:
+    # connection returns to pool only after the canceled call unwinds
+    task.cancel()
+    with suppress(asyncio.CancelledError, Exception):
+        await task
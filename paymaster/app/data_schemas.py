@@ -1,24 +1,58 @@
 """Responses and requests data schemas."""
-from decimal import Decimal
+from datetime import date, datetime
 from enum import Enum
-from typing import Any, Dict, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
 
 from fastapi import status
 from paymaster.currencies import BASE_CURRENCY
-from pydantic import BaseModel, ConstrainedDecimal, Field, PositiveInt
+from paymaster.money import Money, MoneyInput, render_money
+from pydantic import BaseModel, Field, PositiveInt
 
+DESCRIPTION_MAX_LENGTH = 255
+MAX_BULK_ACCOUNTS = 100000
+DEFAULT_HOLD_TTL = 900
+# one week
+MAX_HOLD_TTL = 604800
 
-class TotalValue(ConstrainedDecimal):
+
+class BalanceValue(Money):
+    """Type for validate balance value."""
+
+    __slots__ = ()
+
+
+class TotalValue(BalanceValue):
     """Type for validate total value."""
 
-    gt = Decimal(0)
-    decimal_places = 2
+    __slots__ = ()
 
+    @classmethod
+    def validate(cls, amount: MoneyInput) -> Money:
+        """Validate positive value in major units.
 
-class BalanceValue(ConstrainedDecimal):
-    """Type for validate balance value."""
+        Args:
+            amount: money or value in major units
+
+        Returns:
+            amount of money
+
+        Raises:
+            ValueError: value isn't positive
+        """
+        total = super().validate(amount)
+        if total.minor <= 0:
+            raise ValueError('ensure this value is greater than 0')
+        return total
+
+
+class MoneyModel(BaseModel):
+    """Base model rendering amounts of money in major units."""
 
-    decimal_places = 2
+    class Config(object):  # noqa: WPS431
+        """Model config."""
+
+        json_encoders = {Money: render_money}
 
 
 class OperationType(str, Enum):  # noqa: WPS600
@@ -35,13 +69,21 @@ class SortKey(str, Enum):  # noqa: WPS600
     asc: str = 'asc'
 
 
-class Balance(BaseModel):
+class StatementPeriod(str, Enum):  # noqa: WPS600
+    """Periods of account statement."""
+
+    day: str = 'day'
+    month: str = 'month'
+
+
+class Balance(MoneyModel):
     """Response model for user balance."""
 
     status_code: int = Field(status.HTTP_200_OK, ge=100, lt=600)  # noqa: WPS432
     user_id: PositiveInt
     balance: BalanceValue
     currency: str = Field(BASE_CURRENCY, min_length=3, max_length=3)
+    balances: Optional[Dict[str, BalanceValue]] = None
 
 
 class Operation(BaseModel):
@@ -62,7 +104,195 @@ class Transaction(BaseModel):
     description: Optional[str] = Field(None)
 
 
-class PageOut(BaseModel):
+class TransferPeriod(str, Enum):  # noqa: WPS600
+    """Periods of recurring transfers."""
+
+    day: str = 'day'
+    week: str = 'week'
+    month: str = 'month'
+
+
+class ScheduledTransfer(Transaction):
+    """Request model for transfer at due time, once or periodically."""
+
+    due_at: datetime = Field(..., description='time of the first run')
+    period: Optional[TransferPeriod] = Field(
+        None, description='period of recurring transfer, single run by default',
+    )
+    runs: Optional[PositiveInt] = Field(
+        None,
+        description='number of recurring transfer runs, unlimited by default',
+    )
+
+
+class ScheduledTransferOut(BaseModel):
+    """Response model for scheduled transfer."""
+
+    transfer_id: UUID
+    due_at: datetime
+
+
+class QueuedTransferOut(BaseModel):
+    """Response model for transfer accepted for execution in background."""
+
+    operation_id: UUID
+    status_url: str
+
+
+class ScheduledTransferState(MoneyModel):
+    """Response model for state of scheduled transfer."""
+
+    transfer_id: UUID
+    sender_id: PositiveInt
+    recipient_id: PositiveInt
+    total: BalanceValue
+    description: Optional[str]
+    due_at: datetime
+    period: Optional[TransferPeriod]
+    max_runs: Optional[PositiveInt]
+    runs: int
+    failed_runs: int
+    last_error: Optional[str]
+    status: str
+
+
+class Accounts(BaseModel):
+    """Request model for bulk creation or deletion of user accounts."""
+
+    user_ids: List[PositiveInt] = Field(
+        ..., min_items=1, max_items=MAX_BULK_ACCOUNTS,
+    )
+
+
+class AccountConflict(BaseModel):
+    """User account which can't be created or deleted."""
+
+    user_id: PositiveInt
+    error: str
+
+
+class AccountsOut(BaseModel):
+    """Response model for bulk creation or deletion of user accounts."""
+
+    succeeded: List[PositiveInt]
+    conflicts: List[AccountConflict]
+
+
+class HistoryFilter(BaseModel):
+    """Conditions of user account transactions history."""
+
+    date_from: Optional[date] = None
+    date_to: Optional[date] = None
+    deal_with: Optional[int] = None
+    min_total: Optional[BalanceValue] = None
+    max_total: Optional[BalanceValue] = None
+    description: Optional[str] = None
+
+
+class Hold(BaseModel):
+    """Request model for reserve user funds."""
+
+    user_id: PositiveInt
+    total: TotalValue
+    description: Optional[str] = Field(None, max_length=DESCRIPTION_MAX_LENGTH)
+    ttl: float = Field(
+        DEFAULT_HOLD_TTL,
+        gt=0,
+        le=MAX_HOLD_TTL,
+        description='hold lifetime in seconds',
+    )
+
+
+class HoldOut(BaseModel):
+    """Response model for reserved user funds."""
+
+    hold_id: UUID
+    expires_at: datetime
+
+
+class Conversion(MoneyModel):
+    """Amount to convert between currencies."""
+
+    amount: BalanceValue
+    from_currency: str = Field(..., min_length=3, max_length=3)
+    to_currency: str = Field(..., min_length=3, max_length=3)
+
+
+class Conversions(BaseModel):
+    """Request model for batch conversion between currencies."""
+
+    content: List[Conversion] = Field(..., max_items=10000)  # noqa: WPS110 WPS432 E501
+
+
+class Converted(Conversion):
+    """Amount converted between currencies."""
+
+    converted: BalanceValue
+
+
+class ConversionsOut(MoneyModel):
+    """Response model for batch conversion between currencies."""
+
+    content: List[Converted]  # noqa: WPS110
+
+
+class PageOut(MoneyModel):
     """Response model for user account transactions history request."""
 
     content: Tuple[Dict[str, Any], ...]  # noqa: WPS110
+    has_next: bool = False
+    total_count: Optional[int] = Field(
+        None, description='unknown for filtered history',
+    )
+    page_count: Optional[int] = Field(
+        None, description='unknown for filtered history',
+    )
+
+
+class StatementLine(MoneyModel):
+    """Account statement for one period."""
+
+    period_start: date
+    opening_balance: BalanceValue
+    total_in: BalanceValue
+    total_out: BalanceValue
+    closing_balance: BalanceValue
+    transactions_count: int
+
+
+class StatementOut(MoneyModel):
+    """Response model for user account statement."""
+
+    user_id: PositiveInt
+    period: StatementPeriod
+    content: List[StatementLine]  # noqa: WPS110
+
+
+class ImportRecord(Operation):
+    """Ledger import record."""
+
+    description: Optional[str] = Field(
+        None,
+        max_length=DESCRIPTION_MAX_LENGTH,
+    )
+    created_at: Optional[datetime] = Field(None)
+    # user id of counterparty as reported by history
+    deal_with: Optional[PositiveInt] = Field(None)
+
+
+class ImportLineError(BaseModel):
+    """Rejected line of ledger import."""
+
+    line: PositiveInt
+    error: str
+
+
+class ImportOut(BaseModel):
+    """Response model for ledger import progress."""
+
+    import_id: UUID
+    status: str
+    lines_count: int = 0
+    imported: int = 0
+    failed: int = 0
+    errors: List[ImportLineError] = Field(default_factory=list)
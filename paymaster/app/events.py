@@ -1,26 +1,25 @@
-"""Migrations and up/shutdown handlers."""
-import os
-import pathlib
-from typing import Any, Callable, Coroutine, Optional
+"""Up/shutdown handlers."""
+import asyncio
+from typing import Any, Callable, Coroutine
 
-from asyncpg import create_pool
 from fastapi import FastAPI
-from yoyo import get_backend, read_migrations
-
-
-def make_migration(dsn: str) -> None:
-    """Make migrations from sql directory.
-
-    Args:
-        dsn: database url
-    """
-    file_path = str(
-        pathlib.Path(__file__).parent / '..' / '..' / 'sql',
-    )
-    backend = get_backend(dsn)
-    migrations = read_migrations(file_path)
-    with backend.lock():
-        backend.apply_migrations(backend.to_apply(migrations))
+from paymaster.database.balance_cache import (
+    BalanceCache,
+    BalanceChangesListener,
+)
+from paymaster.database.currency_rates import CurrencyRates
+from paymaster.database.migrations import check_schema_version, make_migration
+from paymaster.database.sharding import (
+    create_shard_router,
+    get_direct_dsns,
+    get_shard_dsns,
+)
+from paymaster.settings import (
+    BALANCE_CACHE_MAX_AGE,
+    BALANCE_CACHE_SIZE,
+    CURRENCY_RATES_MAX_AGE,
+    MIGRATE_ON_STARTUP,
+)
 
 
 def create_start_app_handler(
@@ -35,10 +34,28 @@ def create_start_app_handler(
         started handler
     """
     async def start_app() -> None:  # noqa: WPS430
-        dsn: Optional[str] = os.getenv('DSN')
-        app.state.pool = await create_pool(dsn)
-        if dsn is not None:
-            make_migration(dsn)
+        # sessions of migrations and listeners bypass connections pooler
+        direct_dsns = get_direct_dsns()
+        if MIGRATE_ON_STARTUP:
+            loop = asyncio.get_event_loop()
+            for dsn in direct_dsns:
+                await loop.run_in_executor(None, make_migration, dsn)
+        app.state.shards = await create_shard_router(get_shard_dsns())
+        for admission in app.state.shards.admissions:
+            async with admission.pool.acquire() as conn:
+                await check_schema_version(conn)
+        app.state.currency_rates = CurrencyRates(CURRENCY_RATES_MAX_AGE)
+        app.state.balance_cache = None
+        if BALANCE_CACHE_SIZE > 0:
+            app.state.balance_cache = BalanceCache(
+                max_size=BALANCE_CACHE_SIZE,
+                max_age=BALANCE_CACHE_MAX_AGE,
+            )
+            app.state.balance_listener = BalanceChangesListener(
+                app.state.balance_cache,
+                direct_dsns,
+            )
+            app.state.balance_listener.start()
     return start_app
 
 
@@ -54,5 +71,7 @@ def create_stop_app_handler(
         shutdown handler
     """
     async def stop_app() -> None:  # noqa: WPS430
-        await app.state.pool.close()
+        if app.state.balance_cache is not None:
+            await app.state.balance_listener.close()
+        await app.state.shards.close()
     return stop_app
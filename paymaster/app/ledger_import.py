@@ -0,0 +1,235 @@
+"""Streaming import of ledger records from NDJSON."""
+from datetime import timezone
+from functools import partial
+from operator import attrgetter
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple
+from uuid import UUID
+
+from paymaster.app.data_schemas import (
+    ImportLineError,
+    ImportOut,
+    ImportRecord,
+    OperationType,
+)
+from paymaster.database.db import create_import, import_chunk, update_import
+from paymaster.database.retry import run_with_retries
+from paymaster.database.sharding import Connector
+from paymaster.settings import (
+    IMPORT_CHUNK_SIZE,
+    IMPORT_MAX_ERRORS,
+    IMPORT_MAX_LINE_LENGTH,
+)
+from pydantic import ValidationError
+
+# ledger imports bookkeeping is kept on the first shard
+IMPORTS_SHARD_KEY = 0
+StagingRecord = Tuple[int, int, int, str, object, Optional[int]]
+# line number and line or None for too long line
+NumberedLine = Tuple[int, Optional[bytes]]
+
+
+async def iter_lines(
+    stream: AsyncIterator[bytes],
+    max_line_length: int = IMPORT_MAX_LINE_LENGTH,
+) -> AsyncIterator[NumberedLine]:
+    """Split byte stream into numbered lines.
+
+    Args:
+        stream: byte chunks
+        max_line_length: maximum length of line, longer lines are skipped
+
+    Yields:
+        line number and line or None for too long line
+    """
+    buffer = bytearray()
+    line_number = 0
+    skipping = False
+    async for chunk in stream:
+        buffer.extend(chunk)
+        for line in _pop_lines(buffer):
+            line_number += 1
+            yield line_number, None if skipping else line
+            skipping = False
+        if len(buffer) > max_line_length:
+            skipping = True
+            buffer.clear()
+    if skipping or buffer.strip():
+        yield line_number + 1, None if skipping else bytes(buffer)
+
+
+def to_staging_record(line_number: int, record: ImportRecord) -> StagingRecord:
+    """Convert validated record to staging table row.
+
+    Args:
+        line_number: number of line in upload
+        record: validated record
+
+    Returns:
+        staging row without import id
+    """
+    sign = -1 if record.operation == OperationType.withdraw else 1
+    qty_change = sign * record.total.minor
+    created_at = record.created_at
+    if created_at is not None and created_at.tzinfo is not None:
+        created_at = created_at.astimezone(timezone.utc).replace(tzinfo=None)
+    description = record.description or record.operation.value
+    return (
+        line_number,
+        record.user_id,
+        qty_change,
+        description,
+        created_at,
+        record.deal_with,
+    )
+
+
+def validate_line(
+    line: Optional[bytes],
+) -> Tuple[Optional[ImportRecord], Optional[str]]:
+    """Validate line of upload.
+
+    Args:
+        line: line or None for too long line
+
+    Returns:
+        record or reason of rejection, both are None for blank line
+    """
+    if line is None:
+        return None, 'Line is too long'
+    if not line.strip():
+        return None, None
+    try:
+        return ImportRecord.parse_raw(line), None
+    except ValidationError as exc:
+        return None, '; '.join(_describe(error) for error in exc.errors())
+
+
+class LedgerImport(object):
+    """Import of ledger records validated and loaded in chunks."""
+
+    def __init__(
+        self,
+        connector: Connector,
+        import_id: UUID,
+        chunk_size: int = IMPORT_CHUNK_SIZE,
+        max_errors: int = IMPORT_MAX_ERRORS,
+    ) -> None:
+        """Init import.
+
+        Args:
+            connector: provider of shards connections
+            import_id: ledger import id
+            chunk_size: number of records loaded at once
+            max_errors: number of reported rejected lines
+        """
+        self.import_id = import_id
+        self._connector = connector
+        self._chunk_size = chunk_size
+        self._max_errors = max_errors
+        self.status = 'running'
+        self.lines_count = 0
+        self.imported = 0
+        self.failed = 0
+        self.errors: List[ImportLineError] = []
+
+    async def run(self, stream: AsyncIterator[bytes]) -> None:
+        """Import records from NDJSON byte stream.
+
+        Args:
+            stream: byte chunks of upload
+        """
+        async with self._connector.connection(IMPORTS_SHARD_KEY) as db_con:
+            await create_import(self.import_id, db_con)
+        self.status = 'failed'
+        try:  # noqa: WPS501 WPS229
+            await self._load(stream)
+            self.status = 'completed'
+        finally:
+            await self._save_progress()
+
+    def report(self) -> ImportOut:
+        """Get import progress with rejected lines.
+
+        Returns:
+            ledger import progress
+        """
+        return ImportOut(
+            import_id=self.import_id,
+            status=self.status,
+            lines_count=self.lines_count,
+            imported=self.imported,
+            failed=self.failed,
+            errors=self.errors,
+        )
+
+    async def _load(self, stream: AsyncIterator[bytes]) -> None:
+        batch: List[StagingRecord] = []
+        async for line_number, line in iter_lines(stream):
+            self.lines_count = line_number
+            record, reason = validate_line(line)
+            if reason is not None:
+                self._reject(line_number, reason)
+            elif record is not None:
+                batch.append(to_staging_record(line_number, record))
+            if len(batch) >= self._chunk_size:
+                await self._flush(batch)
+                batch = []
+        await self._flush(batch)
+
+    async def _flush(self, batch: List[StagingRecord]) -> None:
+        for records in _group_by_shard(self._connector, batch):
+            async with self._connector.connection(records[0][1]) as db_con:
+                rejected = await run_with_retries(partial(
+                    import_chunk, self.import_id, records, db_con,
+                ))
+            self.imported += len(records) - len(rejected)
+            for line_number, reason in rejected:
+                self._reject(line_number, reason)
+        if batch:
+            await self._save_progress()
+
+    async def _save_progress(self) -> None:
+        async with self._connector.connection(IMPORTS_SHARD_KEY) as db_con:
+            await update_import(
+                import_id=self.import_id,
+                lines_count=self.lines_count,
+                imported=self.imported,
+                failed=self.failed,
+                import_status=self.status,
+                db_con=db_con,
+            )
+
+    def _reject(self, line_number: int, reason: str) -> None:
+        self.failed += 1
+        # lines rejected on load precede ones rejected on validation later
+        self.errors.append(ImportLineError(line=line_number, error=reason))
+        self.errors.sort(key=attrgetter('line'))
+        del self.errors[self._max_errors:]  # noqa: WPS420
+
+
+def _pop_lines(buffer: bytearray) -> List[bytes]:
+    # complete lines are removed from buffer, the tail is kept
+    lines = []
+    start = 0
+    end = buffer.find(b'\n')
+    while end >= 0:
+        lines.append(bytes(buffer[start:end]))
+        start = end + 1
+        end = buffer.find(b'\n', start)
+    del buffer[:start]  # noqa: WPS420
+    return lines
+
+
+def _group_by_shard(
+    connector: Connector,
+    batch: List[StagingRecord],
+) -> Iterable[List[StagingRecord]]:
+    by_shard: Dict[int, List[StagingRecord]] = {}
+    for record in batch:
+        by_shard.setdefault(connector.shard_of(record[1]), []).append(record)
+    return by_shard.values()
+
+
+def _describe(error: Dict[str, Any]) -> str:
+    location = '.'.join(str(part) for part in error['loc'])
+    return '{0}: {1}'.format(location, error['msg'])
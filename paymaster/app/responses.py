@@ -0,0 +1,44 @@
+"""JSON responses rendering amounts of money exactly."""
+import functools
+import json
+from decimal import Decimal
+from typing import Any
+
+from starlette.responses import JSONResponse
+
+_dump_plain = functools.partial(
+    json.dumps, ensure_ascii=False, allow_nan=False, separators=(',', ':'),
+)
+
+
+class MoneyJSONResponse(JSONResponse):
+    """JSON response rendering decimals as exact numbers.
+
+    Standard encoder writes numbers only from floats, which would round
+    amounts to binary fractions on the way to client.
+    """
+
+    def render(self, content: Any) -> bytes:  # noqa: WPS110
+        """Render content.
+
+        Args:
+            content: JSON compatible data with decimals
+
+        Returns:
+            response body
+        """
+        return _dump(content).encode('utf-8')
+
+
+def _dump(document: Any) -> str:
+    if isinstance(document, Decimal):
+        return str(document)
+    if isinstance(document, dict):
+        members = ','.join(
+            '{0}:{1}'.format(_dump_plain(str(key)), _dump(member))
+            for key, member in document.items()
+        )
+        return '{{{0}}}'.format(members)
+    if isinstance(document, (list, tuple)):
+        return '[{0}]'.format(','.join(_dump(element) for element in document))
+    return _dump_plain(document)
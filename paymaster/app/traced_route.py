@@ -0,0 +1,85 @@
+"""Route recording spans of traced requests."""
+import asyncio
+import functools
+import time
+from typing import Any, Callable, Coroutine
+
+from fastapi.routing import APIRoute
+from paymaster.tracing import current_trace
+from starlette.requests import Request
+from starlette.responses import Response
+
+RouteHandler = Callable[[Request], Coroutine[Any, Any, Response]]
+
+
+class TracedRoute(APIRoute):
+    """Route splitting traced request into validation, endpoint and output."""
+
+    def __init__(
+        self,
+        path: str,
+        endpoint: Callable[..., Any],
+        **kwargs: Any,
+    ) -> None:
+        """Init route.
+
+        Args:
+            path: route path
+            endpoint: route handler
+            kwargs: route options
+        """
+        # route is copied with already wrapped endpoint on router inclusion
+        is_traced = getattr(endpoint, 'is_traced', False)
+        if asyncio.iscoroutinefunction(endpoint) and not is_traced:
+            endpoint = _traced_endpoint(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+    def get_route_handler(self) -> RouteHandler:
+        """Get handler recording spans around endpoint.
+
+        Returns:
+            route handler
+        """
+        route_handler = super().get_route_handler()
+
+        async def traced_handler(request: Request) -> Response:  # noqa: WPS430
+            trace = current_trace()
+            if trace is None:
+                return await route_handler(request)
+            started_at = time.perf_counter()
+            response = await route_handler(request)
+            finished_at = time.perf_counter()
+            if trace.endpoint_started is not None:
+                trace.add(
+                    'request.validation', started_at, trace.endpoint_started,
+                )
+            if trace.endpoint_finished is not None:
+                trace.add(
+                    'response.serialization',
+                    trace.endpoint_finished,
+                    finished_at,
+                )
+            return response
+        return traced_handler
+
+
+def _traced_endpoint(
+    endpoint: Callable[..., Coroutine[Any, Any, Any]],
+) -> Callable[..., Coroutine[Any, Any, Any]]:
+    @functools.wraps(endpoint)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:  # noqa: WPS430
+        trace = current_trace()
+        if trace is None:
+            return await endpoint(*args, **kwargs)
+        trace.endpoint_started = time.perf_counter()
+        try:  # noqa: WPS501
+            return await endpoint(*args, **kwargs)
+        finally:
+            trace.endpoint_finished = time.perf_counter()
+            trace.add(
+                f'endpoint {endpoint.__name__}',
+                trace.endpoint_started,
+                trace.endpoint_finished,
+            )
+    wrapper.is_traced = True  # type: ignore
+    return wrapper
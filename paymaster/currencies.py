@@ -1,9 +1,12 @@
 """Currencies module."""
+import hashlib
 import logging
-from typing import List, Optional, Tuple
+import time
+from decimal import Decimal
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
 
-import httpx
 from paymaster.exceptions import CurrencyError
+from paymaster.money import Money
 
 BASE_CURRENCY = 'rub'
 LOGGER = logging.getLogger(__name__)
@@ -25,6 +28,9 @@ async def get_currencies_rates(  # noqa: WPS234
     Raises:
         CurrencyError: currency rates source unavailable
     """
+    # httpx is needed only by background jobs, not on the request path
+    import httpx  # noqa: WPS433
+
     url = f'https://v6.exchangerate-api.com/v6/{api_key}/latest/{base_currency}'
     async with httpx.AsyncClient() as client:
         resp = await client.get(url)
@@ -37,3 +43,88 @@ async def get_currencies_rates(  # noqa: WPS234
         return [
             (currency, cur_rates[currency]) for currency in cur_rates
         ]
+
+
+class CrossRates(object):
+    """Exchange rates between any pair of currencies."""
+
+    def __init__(self, rates_to_base: Mapping[str, Decimal]) -> None:
+        """Init cross rates.
+
+        Args:
+            rates_to_base: rates of currencies to base currency
+        """
+        self._rates = {
+            currency.upper(): Decimal(rate)
+            for currency, rate in rates_to_base.items()
+        }
+        self._rates[BASE_CURRENCY.upper()] = Decimal(1)
+        self._cross_rates: Dict[Tuple[str, str], Decimal] = {}
+        self.loaded_at = time.monotonic()
+        # the same on every worker loaded the same rates
+        self.tag = hashlib.blake2b(
+            repr(sorted(self._rates.items())).encode(),
+            digest_size=8,
+        ).hexdigest()
+
+    def rate(self, from_currency: str, to_currency: str) -> Decimal:
+        """Get exchange rate of currencies pair.
+
+        Args:
+            from_currency: source currency
+            to_currency: target currency
+
+        Returns:
+            exchange rate
+        """
+        pair = (from_currency.upper(), to_currency.upper())
+        cross_rate = self._cross_rates.get(pair)
+        if cross_rate is None:
+            from_rate = self._rate_to_base(pair[0])
+            cross_rate = self._rate_to_base(pair[1]) / from_rate
+            self._cross_rates[pair] = cross_rate
+        return cross_rate
+
+    def convert(
+        self,
+        amount: Money,
+        from_currency: str,
+        to_currency: str,
+    ) -> Money:
+        """Convert amount between currencies.
+
+        Args:
+            amount: amount in source currency
+            from_currency: source currency
+            to_currency: target currency
+
+        Returns:
+            amount in target currency rounded to cents
+        """
+        return amount.convert(self.rate(from_currency, to_currency))
+
+    def convert_batch(
+        self,
+        amounts: Sequence[Money],
+        pairs: Sequence[Tuple[str, str]],
+    ) -> List[Money]:
+        """Convert batch of amounts between currencies pairs.
+
+        Rate of each pair is looked up before conversion and cached, the
+        amounts are then converted one by one with exact decimal rounding.
+
+        Args:
+            amounts: amounts in source currencies
+            pairs: source and target currencies of each amount
+
+        Returns:
+            amounts in target currencies rounded to cents
+        """
+        rates = [self.rate(*pair) for pair in pairs]
+        return [amount.convert(rate) for amount, rate in zip(amounts, rates)]
+
+    def _rate_to_base(self, currency: str) -> Decimal:
+        rate_to_base = self._rates.get(currency)
+        if rate_to_base is None:
+            raise CurrencyError(f'Unsupported currency type: {currency}')
+        return rate_to_base
@@ -0,0 +1,155 @@
+"""Admission control for database connections pool."""
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from enum import Enum
+from typing import AsyncIterator, Dict
+
+from asyncpg import Connection, Pool
+from paymaster.exceptions import PoolOverloadError
+from paymaster.tracing import span
+
+
+class Lane(str, Enum):  # noqa: WPS600
+    """Priority lanes of connections pool consumers."""
+
+    write: str = 'write'
+    read: str = 'read'
+    bulk: str = 'bulk'
+
+
+class AdmissionController(object):
+    """Bounded admission of requests to database connections pool.
+
+    Reads and bulk loads may hold at most ``pool_size - write_reserve``
+    connections at once, so bursts of history reads or imports can't starve
+    transfers and balance changes. Writes are protected by this reservation
+    only, not by ordering: they skip the read slots but still wait for a
+    connection in pool's FIFO queue together with admitted reads.
+    Each lane has its own queue depth limit, waiting for a connection is
+    limited by acquire timeout.
+    """
+
+    def __init__(  # noqa: WPS211
+        self,
+        pool: Pool,
+        pool_size: int,
+        acquire_timeout: float,
+        max_queue: int,
+        write_reserve: int,
+        retry_after: int,
+    ) -> None:
+        """Init admission controller.
+
+        Args:
+            pool: database connections pool
+            pool_size: maximum number of connections in pool
+            acquire_timeout: seconds to wait for free connection
+            max_queue: maximum number of waiting requests per lane
+            write_reserve: number of connections reserved for writes
+            retry_after: seconds to suggest client before retry
+
+        Raises:
+            ValueError: write reserve leaves no connections for reads
+        """
+        if write_reserve < 0 or write_reserve >= pool_size:
+            raise ValueError(
+                f'Invalid write reserve {write_reserve} for pool {pool_size}',
+            )
+        self.pool = pool
+        self.retry_after = retry_after
+        self._acquire_timeout = acquire_timeout
+        self._max_queue = max_queue
+        self._read_slots = asyncio.Semaphore(pool_size - write_reserve)
+        self._waiting: Dict[Lane, int] = dict.fromkeys(Lane, 0)
+        self._acquired_at: Dict[int, float] = {}
+        self.acquired = 0
+        self.held_seconds: float = 0
+
+    def waiting(self, lane: Lane) -> int:
+        """Get number of requests waiting for connection.
+
+        Args:
+            lane: priority lane
+
+        Returns:
+            queue depth
+        """
+        return self._waiting[lane]
+
+    async def acquire(self, lane: Lane) -> Connection:
+        """Acquire connection from pool or fail fast.
+
+        Args:
+            lane: priority lane
+
+        Returns:
+            database connection
+
+        Raises:
+            PoolOverloadError: lane queue is full or acquire timed out
+        """
+        if self._waiting[lane] >= self._max_queue:
+            raise PoolOverloadError(f'Queue of {lane.value} lane is full')
+        self._waiting[lane] += 1
+        try:
+            with span('pool.acquire', lane=lane.value):
+                connection = await self._enter(lane)
+        except asyncio.TimeoutError as exc:
+            raise PoolOverloadError(
+                f'Connection acquire timed out in {lane.value} lane',
+            ) from exc
+        finally:
+            self._waiting[lane] -= 1
+        self.acquired += 1
+        self._acquired_at[id(connection)] = time.monotonic()
+        return connection
+
+    async def release(self, connection: Connection, lane: Lane) -> None:
+        """Release connection back to pool.
+
+        Args:
+            connection: acquired database connection
+            lane: priority lane connection was acquired in
+        """
+        acquired_at = self._acquired_at.pop(id(connection), None)
+        if acquired_at is not None:
+            self.held_seconds += time.monotonic() - acquired_at
+        try:  # noqa: WPS501
+            await self.pool.release(connection)
+        finally:
+            if lane != Lane.write:
+                self._read_slots.release()
+
+    @asynccontextmanager
+    async def connection(self, lane: Lane) -> AsyncIterator[Connection]:
+        """Hold connection from pool within context.
+
+        Args:
+            lane: priority lane
+
+        Yields:
+            database connection
+        """
+        conn = await self.acquire(lane)
+        try:
+            yield conn
+        finally:
+            await self.release(conn, lane)
+
+    async def _enter(self, lane: Lane) -> Connection:
+        loop = asyncio.get_event_loop()
+        deadline = loop.time() + self._acquire_timeout
+        if lane != Lane.write:
+            await asyncio.wait_for(
+                self._read_slots.acquire(),
+                timeout=self._acquire_timeout,
+            )
+        try:
+            return await self.pool.acquire(
+                timeout=max(deadline - loop.time(), 0),
+            )
+        except BaseException:  # noqa: WPS424
+            if lane != Lane.write:
+                self._read_slots.release()
+            raise
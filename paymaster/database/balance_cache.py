@@ -0,0 +1,253 @@
+"""In-process cache of accounts balances."""
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+from asyncpg import Connection, connect
+from paymaster.database.db import convert_balance, get_balance
+from paymaster.database.sharding import Connector
+from paymaster.money import Money
+
+BALANCE_CHANNEL = 'balance_changes'
+LOGGER = logging.getLogger(__name__)
+# balance value or None for invalidated entry, and time of reading
+CacheEntry = Tuple[Optional[Money], float]
+
+
+class BalanceCache(object):
+    """LRU cache of balances in base currency keyed by user id.
+
+    Invalidated entries are kept as tombstones, so balance read before
+    invalidation can't be stored after it. Evicted tombstone moves the
+    time of clearing to its invalidation instead. The cache serves nothing
+    while any of balance changes listeners is disconnected.
+    """
+
+    def __init__(self, max_size: int, max_age: float) -> None:
+        """Init cache.
+
+        Args:
+            max_size: maximum number of entries
+            max_age: maximum age of served entry, seconds
+        """
+        self._max_size = max_size
+        self._max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.last_seq = 0
+        self.suspended = False
+        self._entries: 'OrderedDict[int, CacheEntry]' = OrderedDict()
+        self._cleared_at = time.monotonic()
+
+    def get(self, user_id: int, max_staleness: float) -> Optional[Money]:
+        """Get cached balance.
+
+        Args:
+            user_id: user id
+            max_staleness: maximum age of entry acceptable by caller, seconds
+
+        Returns:
+            balance in base currency or None on miss
+        """
+        entry = self._entries.get(user_id)
+        if entry is None or entry[0] is None or self.suspended:
+            self.misses += 1
+            return None
+        balance, read_at = entry
+        if time.monotonic() - read_at > min(max_staleness, self._max_age):
+            self.misses += 1
+            return None
+        self._entries.move_to_end(user_id)
+        self.hits += 1
+        return balance
+
+    def put(self, user_id: int, balance: Money, read_at: float) -> None:
+        """Store balance unless it was changed since reading.
+
+        Args:
+            user_id: user id
+            balance: balance in base currency
+            read_at: monotonic time when reading of balance started
+        """
+        if self.suspended or read_at <= self._cleared_at:
+            return
+        entry = self._entries.get(user_id)
+        if entry is not None and entry[1] >= read_at:
+            return
+        self._store(user_id, (balance, read_at))
+
+    def invalidate(self, user_id: int, seq: int = 0) -> None:
+        """Drop cached balance of changed account.
+
+        Args:
+            user_id: user id
+            seq: ledger sequence number of change
+        """
+        self.invalidations += 1
+        self.last_seq = max(self.last_seq, seq)
+        self._store(user_id, (None, time.monotonic()))
+
+    def clear(self) -> None:
+        """Drop all cached balances."""
+        self._entries.clear()
+        self._cleared_at = time.monotonic()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cache statistics.
+
+        Returns:
+            hit and miss counters
+        """
+        requests = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / requests if requests else 0,
+            'invalidations': self.invalidations,
+            'last_seq': self.last_seq,
+            'suspended': self.suspended,
+        }
+
+    def _store(self, user_id: int, entry: CacheEntry) -> None:
+        self._entries[user_id] = entry
+        self._entries.move_to_end(user_id)
+        if len(self._entries) > self._max_size:
+            _, (evicted, changed_at) = self._entries.popitem(last=False)
+            if evicted is None:
+                # balances read before evicted invalidation aren't stored
+                self._cleared_at = max(self._cleared_at, changed_at)
+
+
+class BalanceChangesListener(object):
+    """Listener of balance changes notifications from every shard."""
+
+    def __init__(
+        self,
+        cache: BalanceCache,
+        dsns: Sequence[str],
+        reconnect_delay: float = 1,
+    ) -> None:
+        """Init listener.
+
+        Args:
+            cache: balance cache to invalidate
+            dsns: urls of shards databases
+            reconnect_delay: pause before reconnect, seconds
+        """
+        self.cache = cache
+        self.dsns = dsns
+        self.reconnect_delay = reconnect_delay
+        self._tasks: List['asyncio.Future[None]'] = []
+        self._connected: Set[int] = set()
+
+    def start(self) -> None:
+        """Start listening on direct connections to shards."""
+        for shard, dsn in enumerate(self.dsns):
+            self._set_connected(shard, connected=False)
+            self._tasks.append(
+                asyncio.ensure_future(self._listen(shard, dsn)),
+            )
+
+    async def close(self) -> None:
+        """Stop listening."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def _listen(self, shard: int, dsn: str) -> None:
+        # listener is reconnected after any failure, not only termination
+        while True:  # noqa: WPS457
+            try:
+                await self._serve(shard, dsn)
+            except Exception as exc:
+                LOGGER.warning(exc)
+            else:
+                LOGGER.warning('Balance changes listener disconnected')
+            await asyncio.sleep(self.reconnect_delay)
+
+    async def _serve(self, shard: int, dsn: str) -> None:
+        conn = await connect(dsn)
+        terminated = asyncio.Event()
+        conn.add_termination_listener(lambda _: terminated.set())
+        try:  # noqa: WPS501 WPS229
+            await conn.add_listener(BALANCE_CHANNEL, self._on_change)
+            self._set_connected(shard, connected=True)
+            await terminated.wait()
+        finally:
+            self._set_connected(shard, connected=False)
+            await conn.close()
+
+    def _set_connected(self, shard: int, connected: bool) -> None:
+        # cache serves nothing while any of shards listeners is down
+        if connected:
+            self._connected.add(shard)
+        else:
+            self._connected.discard(shard)
+        self.cache.suspended = len(self._connected) < len(self.dsns)
+        self.cache.clear()
+
+    def _on_change(
+        self,
+        conn: Connection,
+        pid: int,
+        channel: str,
+        payload: str,
+    ) -> None:
+        user_id, seq = payload.split(':')
+        self.cache.invalidate(int(user_id), int(seq))
+
+
+async def read_balance(  # noqa: WPS211
+    connector: Connector,
+    user_id: int,
+    convert_to: Optional[str] = None,
+    cache: Optional[BalanceCache] = None,
+    max_staleness: float = 0,
+) -> Money:
+    """Get user account balance from cache or database.
+
+    Args:
+        connector: provider of shards connections
+        user_id: user id
+        convert_to: currency for convertation
+        cache: balance cache
+        max_staleness: maximum age of cached balance, seconds
+
+    Returns:
+        balance value
+    """
+    if cache is None:
+        async with connector.connection(user_id) as db_con:
+            return await get_balance(user_id, db_con, convert_to)
+    balance = cache.get(user_id, max_staleness) if max_staleness else None
+    # connection is acquired only on cache miss or conversion
+    async with connector.connection(user_id) as shard_con:
+        if balance is None:
+            balance = await fetch_balance(user_id, shard_con, cache)
+        return await convert_balance(balance, shard_con, convert_to)
+
+
+async def fetch_balance(
+    user_id: int,
+    db_con: Connection,
+    cache: Optional[BalanceCache] = None,
+) -> Money:
+    """Get authoritative user account balance, store it in cache.
+
+    Args:
+        user_id: user id
+        db_con: connection to database
+        cache: balance cache
+
+    Returns:
+        balance value
+    """
+    read_at = time.monotonic()
+    balance = await get_balance(user_id, db_con)
+    if cache is not None:
+        cache.put(user_id, balance, read_at)
+    return balance
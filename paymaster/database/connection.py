@@ -0,0 +1,201 @@
+"""Database connection with slow queries logging."""
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Coroutine, Optional, Tuple
+
+from asyncpg import Connection, exceptions
+from paymaster.settings import SLOW_QUERY_THRESHOLD
+from paymaster.tracing import span
+
+LOGGER = logging.getLogger('paymaster.slow_query')
+
+
+class LoggingConnection(Connection):  # noqa: WPS214
+    """Connection reporting slow and timed out queries with their plans.
+
+    Plan is explained inline on the same connection, so reporting adds one
+    EXPLAIN (without ANALYZE) to the request that ran the slow query.
+    Timed out queries inside a transaction are reported without a plan:
+    the transaction is already aborted and can't run EXPLAIN.
+    """
+
+    _query_timeout: Optional[float] = None
+
+    async def set_statement_timeout(self, timeout: int) -> None:
+        """Limit duration of each query until release to pool.
+
+        Args:
+            timeout: time budget of each query, milliseconds
+        """
+        # session setting is cleared by RESET ALL on release to pool
+        await self.execute(
+            "SELECT set_config('statement_timeout', $1, false);",
+            str(timeout),
+        )
+
+    async def execute(self, query: str, *args, **kwargs) -> Any:
+        """Execute query.
+
+        Args:
+            query: query text
+            args: query arguments
+            kwargs: asyncpg execute options
+
+        Returns:
+            status of last executed command
+        """
+        return await self._logged(super().execute, query, args, kwargs)
+
+    async def fetch(self, query: str, *args, **kwargs) -> Any:
+        """Fetch query rows.
+
+        Args:
+            query: query text
+            args: query arguments
+            kwargs: asyncpg fetch options
+
+        Returns:
+            query rows
+        """
+        return await self._logged(super().fetch, query, args, kwargs)
+
+    async def fetchrow(self, query: str, *args, **kwargs) -> Any:
+        """Fetch first query row.
+
+        Args:
+            query: query text
+            args: query arguments
+            kwargs: asyncpg fetchrow options
+
+        Returns:
+            first query row
+        """
+        return await self._logged(super().fetchrow, query, args, kwargs)
+
+    async def fetchval(self, query: str, *args, **kwargs) -> Any:
+        """Fetch value of first query row.
+
+        Args:
+            query: query text
+            args: query arguments
+            kwargs: asyncpg fetchval options
+
+        Returns:
+            value of first query row
+        """
+        return await self._logged(super().fetchval, query, args, kwargs)
+
+    async def _logged(
+        self,
+        method: Callable[..., Coroutine[Any, Any, Any]],
+        query: str,
+        args: Tuple[Any, ...],
+        kwargs: Any,
+    ) -> Any:
+        started_at = time.monotonic()
+        try:
+            with span('db.query', query=' '.join(query.split())):
+                query_result = await self._call(method, query, args, kwargs)
+        except exceptions.QueryCanceledError:
+            # plan of failed query can't be explained in aborted transaction
+            explain = not self.is_in_transaction()
+            await self._report(query, args, started_at, 'timed out', explain)
+            raise
+        duration = (time.monotonic() - started_at) * 1000
+        if duration >= SLOW_QUERY_THRESHOLD:
+            await self._report(query, args, started_at, 'slow', explain=True)
+        return query_result
+
+    async def _call(
+        self,
+        method: Callable[..., Coroutine[Any, Any, Any]],
+        query: str,
+        args: Tuple[Any, ...],
+        kwargs: Any,
+    ) -> Any:
+        if self._query_timeout is None or 'timeout' in kwargs:
+            return await method(query, *args, **kwargs)
+        try:
+            return await method(
+                query, *args, timeout=self._query_timeout, **kwargs,
+            )
+        except asyncio.TimeoutError as exc:
+            # asyncpg cancels query on the server before raising
+            raise exceptions.QueryCanceledError(
+                'canceling statement due to client timeout',
+            ) from exc
+
+    async def _report(  # noqa: WPS211
+        self,
+        query: str,
+        args: Tuple[Any, ...],
+        started_at: float,
+        reason: str,
+        explain: bool,
+    ) -> None:
+        plan = await self._explain(query, args) if explain else None
+        duration = (time.monotonic() - started_at) * 1000
+        LOGGER.warning(
+            'Query %s after %.1f ms: %s; args: %r; plan:\n%s',  # noqa: WPS323
+            reason,
+            duration,
+            ' '.join(query.split()),
+            args,
+            plan,
+        )
+
+    async def _explain(
+        self,
+        query: str,
+        args: Tuple[Any, ...],
+    ) -> Optional[str]:
+        is_explainable = query.lstrip().upper().startswith(
+            ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH'),
+        )
+        if not is_explainable:
+            return None
+        try:
+            plan = await super().fetch(  # noqa: WPS613
+                f'EXPLAIN {query}', *args,
+            )
+        except exceptions.PostgresError:
+            return None
+        return '\n'.join(row[0] for row in plan)
+
+
+class PoolerConnection(LoggingConnection):
+    """Connection to shard through pooler in transaction mode.
+
+    Server connection may change after every transaction, so no session
+    state is set: statement timeout is enforced by the client, which
+    cancels overrunning query, and nothing is reset on release to pool.
+    """
+
+    async def set_statement_timeout(self, timeout: int) -> None:
+        """Limit duration of each query until release to pool.
+
+        Args:
+            timeout: time budget of each query, milliseconds
+        """
+        self._query_timeout = timeout / 1000
+
+    async def reset(self, *, timeout: Optional[float] = None) -> None:
+        """Reset connection on release to pool.
+
+        Args:
+            timeout: time budget of reset, seconds
+        """
+        self._query_timeout = None
+        await super().reset(timeout=timeout)
+
+    def get_reset_query(self) -> str:
+        """Get query resetting session state.
+
+        Returns:
+            empty query as there is no session state
+        """
+        return ''
+
+    # name of the method before asyncpg 0.30
+    _get_reset_query = get_reset_query
@@ -0,0 +1,87 @@
+"""Cross rates of currencies loaded from database."""
+import asyncio
+import time
+from typing import List, Optional, Tuple
+
+from paymaster.currencies import CrossRates
+from paymaster.database.admission import Lane
+from paymaster.database.db import fetch_currency_rates, update_currencies
+from paymaster.database.sharding import Connector, ShardRouter
+
+# currencies rates are updated on every shard, the first one is read
+RATES_SHARD_KEY = 0
+
+
+class CurrencyRates(object):
+    """Cross rates reloaded when they become older than max age.
+
+    Rates are updated in database by background job of another process,
+    so loaded rates aren't invalidated on update: they may be stale for up
+    to max age after it.
+    """
+
+    def __init__(self, max_age: float) -> None:
+        """Init rates.
+
+        Args:
+            max_age: maximum age of loaded rates, seconds
+        """
+        self.max_age = max_age
+        self._cross_rates: Optional[CrossRates] = None
+        self._lock = asyncio.Lock()
+
+    async def get(self, connector: Connector) -> CrossRates:
+        """Get actual cross rates.
+
+        Args:
+            connector: provider of shards connections
+
+        Returns:
+            cross rates
+        """
+        cross_rates = self._fresh_rates()
+        if cross_rates is not None:
+            return cross_rates
+        async with self._lock:
+            # rates could be loaded while waiting for lock
+            cross_rates = self._fresh_rates()
+            if cross_rates is None:
+                async with connector.connection(RATES_SHARD_KEY) as db_con:
+                    cross_rates = CrossRates(
+                        await fetch_currency_rates(db_con),
+                    )
+                self._cross_rates = cross_rates
+        return cross_rates
+
+    def _fresh_rates(self) -> Optional[CrossRates]:
+        cross_rates = self._cross_rates
+        if cross_rates is None:
+            return None
+        if time.monotonic() - cross_rates.loaded_at >= self.max_age:
+            return None
+        return cross_rates
+
+
+async def update_rates(
+    router: ShardRouter,
+    cur_rates: List[Tuple[str, float]],
+) -> None:
+    """Update currencies rates on every shard.
+
+    Shard the rates are read from is updated last, so read rates are
+    already on every shard, and rates stay unchanged for readers until all
+    other shards are updated.
+
+    Args:
+        router: shard router
+        cur_rates: rates of currencies
+    """
+    rates_shard = router.admission_for(RATES_SHARD_KEY)
+    admissions = [
+        admission
+        for admission in router.admissions
+        if admission is not rates_shard
+    ]
+    for admission in (*admissions, rates_shard):
+        async with admission.connection(Lane.bulk) as db_con:
+            await update_currencies(cur_rates, db_con)
@@ -1,12 +1,60 @@
 """Database module."""
+import itertools
+import re
+from datetime import date, datetime
 from decimal import Decimal
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Set, Tuple
+from uuid import UUID
 
 from asyncpg import Connection, exceptions
-from paymaster.app.data_schemas import OperationType, SortKey
-from paymaster.exceptions import AccountError, BalanceValueError, CurrencyError
+from paymaster.app.data_schemas import (
+    HistoryFilter,
+    OperationType,
+    SortKey,
+    StatementPeriod,
+)
+from paymaster.currencies import BASE_CURRENCY
+from paymaster.exceptions import (
+    AccountError,
+    BalanceValueError,
+    CurrencyError,
+    HoldError,
+    ImportNotFoundError,
+    ScheduledTransferError,
+)
+from paymaster.money import Money
 
-FRACTIONAL_VALUE = Decimal(100)
+MAX_STRIPES = 64
+# credit attempts racing with shrinking of account stripes
+CREDIT_ATTEMPTS = 3
+_STATEMENT_AMOUNTS = (
+    'opening_balance', 'total_in', 'total_out', 'closing_balance',
+)
+# active holds of deleted accounts are released with them
+_DELETE_ACCS_QUERY = """ WITH account AS (
+                            UPDATE accounts
+                                SET current_status = 'deleted',
+                                    deleted_at = CURRENT_TIMESTAMP(2)
+                                WHERE user_id = ANY($1::INTEGER[])
+                                AND current_status = 'active'
+                                RETURNING id, user_id
+                        ), released AS (
+                            UPDATE holds
+                                SET current_status = 'released'
+                                FROM account
+                                WHERE holds.account_id = account.id
+                                AND holds.current_status = 'active'
+                        ), unheld AS (
+                            UPDATE account_stripes
+                                SET held = 0
+                                FROM account
+                                WHERE account_stripes.account_id = account.id
+                                AND account_stripes.stripe = 0
+                        )
+                        SELECT user_id
+                        FROM account;"""
+# round-robin keys for choosing stripe of credited account
+_stripe_keys = itertools.count()
 
 
 async def create_acc(user_id: int, db_con: Connection) -> None:
@@ -19,8 +67,14 @@ async def create_acc(user_id: int, db_con: Connection) -> None:
     Raises:
         AccountError: conflict with existiong account
     """
-    query = """ INSERT INTO accounts (user_id)
-                VALUES ($1);"""
+    query = """ WITH account AS (
+                    INSERT INTO accounts (user_id)
+                    VALUES ($1)
+                    RETURNING id
+                )
+                INSERT INTO account_stripes (account_id, stripe)
+                SELECT id, 0
+                FROM account;"""
     try:
         await db_con.execute(query, user_id)
     except exceptions.UniqueViolationError:
@@ -28,7 +82,7 @@ async def create_acc(user_id: int, db_con: Connection) -> None:
 
 
 async def delete_acc(user_id: int, db_con: Connection) -> None:
-    """Delete user account.
+    """Delete user account, release its active holds.
 
     Args:
         user_id: user id
@@ -37,19 +91,85 @@ async def delete_acc(user_id: int, db_con: Connection) -> None:
     Raises:
         AccountError: conflict with non existiong account
     """
-    acc_query = """ UPDATE accounts
-                        SET current_status = 'deleted'
-                        WHERE user_id = ($1)
-                        AND current_status = 'active';"""
-    executing_status = await db_con.execute(acc_query, user_id)
-    changed_row_num = int(executing_status.split()[-1])
-    if changed_row_num == 0:
+    deleted = await db_con.fetch(_DELETE_ACCS_QUERY, [user_id])
+    if not deleted:
         raise AccountError(f"Account with id <{user_id}> doesn't exists")
 
 
+async def create_accs(user_ids: Sequence[int], db_con: Connection) -> List[int]:
+    """Create user accounts by a single statement.
+
+    Args:
+        user_ids: users ids
+        db_con: connection to database
+
+    Returns:
+        ids of users whose accounts are created, the rest already have one
+    """
+    query = """ WITH account AS (
+                    INSERT INTO accounts (user_id)
+                    SELECT DISTINCT unnest($1::INTEGER[])
+                    ON CONFLICT (user_id) WHERE current_status = 'active'
+                    DO NOTHING
+                    RETURNING id, user_id
+                ), stripe AS (
+                    INSERT INTO account_stripes (account_id, stripe)
+                    SELECT id, 0
+                    FROM account
+                )
+                SELECT user_id
+                FROM account;"""
+    created = await db_con.fetch(query, list(user_ids))
+    return [row['user_id'] for row in created]
+
+
+async def delete_accs(user_ids: Sequence[int], db_con: Connection) -> List[int]:
+    """Delete user accounts by a single statement, release their holds.
+
+    Args:
+        user_ids: users ids
+        db_con: connection to database
+
+    Returns:
+        ids of users whose accounts are deleted, the rest have no account
+    """
+    deleted = await db_con.fetch(_DELETE_ACCS_QUERY, list(user_ids))
+    return [row['user_id'] for row in deleted]
+
+
+async def set_acc_stripes(
+    user_id: int,
+    stripes_count: int,
+    db_con: Connection,
+) -> None:
+    """Spread incoming credits of user account across sub-ledgers.
+
+    Balance of removed stripes is moved to the first stripe.
+
+    Args:
+        user_id: user id
+        stripes_count: number of account sub-ledgers
+        db_con: connection to database
+
+    Raises:
+        AccountError: user account isn't registered
+    """
+    acc_query = """ SELECT id
+                    FROM accounts
+                    WHERE user_id = $1
+                    AND current_status = 'active'
+                    FOR UPDATE;"""
+    async with db_con.transaction():
+        account_id: Optional[int] = await db_con.fetchval(acc_query, user_id)
+        if account_id is None:
+            raise AccountError(f'Has no registered account with id: {user_id}')
+        await _lock_stripes(account_id, db_con)
+        await _resize_stripes(account_id, stripes_count, db_con)
+
+
 async def change_balance(
     user_id: int,
-    qty_value: Decimal,
+    qty_value: Money,
     operation_type: str,
     db_con: Connection,
     description: Optional[str] = None,
@@ -82,7 +202,7 @@ async def change_balance(
 async def transfer_between_accs(
     sender_id: int,
     recipient_id: int,
-    qty_value: Decimal,
+    qty_value: Money,
     db_con: Connection,
     description: Optional[str] = None,
 ) -> None:
@@ -116,7 +236,7 @@ async def get_balance(
     user_id: int,
     db_con: Connection,
     convert_to: Optional[str] = None,
-) -> Decimal:
+) -> Money:
     """Get user account balance.
 
     Args:
@@ -127,13 +247,38 @@ async def get_balance(
     Returns:
         balance value
     """
-    async with db_con.transaction():
-        balance: Decimal = await _compute_balance(user_id, db_con) / FRACTIONAL_VALUE  # noqa: E501
-        cur_rate: Decimal = Decimal(1) if convert_to is None else await _fetch_currency_rate(  # noqa: E501
-            cur_name=convert_to,
-            db_con=db_con,
-        )
-    return Decimal(round(balance * cur_rate, 2))
+    balance = Money(await _compute_balance(user_id, db_con))
+    return await convert_balance(balance, db_con, convert_to)
+
+
+async def convert_balance(
+    balance: Money,
+    db_con: Connection,
+    convert_to: Optional[str] = None,
+) -> Money:
+    """Convert balance value from base currency.
+
+    Args:
+        balance: balance value in base currency
+        db_con: database connection
+        convert_to: currency for convertation
+
+    Returns:
+        converted balance value
+    """
+    if convert_to is None or convert_to.lower() == BASE_CURRENCY:
+        return balance
+    cur_rate = await _fetch_currency_rate(cur_name=convert_to, db_con=db_con)
+    return balance.convert(cur_rate)
+
+
+class HistoryPage(NamedTuple):
+    """Page of account transactions history."""
+
+    records: Tuple[Dict[str, Any], ...]
+    has_next: bool
+    # unknown for filtered history
+    total_count: Optional[int] = None
 
 
 async def fetch_acc_history(  # noqa: WPS210 WPS211
@@ -143,9 +288,15 @@ async def fetch_acc_history(  # noqa: WPS210 WPS211
     page_size: int = 20,
     order_by_date: Optional[SortKey] = None,
     order_by_total: Optional[SortKey] = None,
-) -> Tuple[Dict[Any, Any], ...]:
+    history_filter: Optional[HistoryFilter] = None,
+) -> HistoryPage:
     """Fetch user account transactions history.
 
+    Number of all account transactions is taken from the counter of
+    transactions maintained on write. Filtered history can't be counted
+    without a scan, so only presence of the next page is checked by
+    fetching one extra record.
+
     Args:
         user_id: user id
         db_con: database connection
@@ -153,9 +304,10 @@ async def fetch_acc_history(  # noqa: WPS210 WPS211
         page_size: number of records per page
         order_by_date: sort order by transaction date
         order_by_total: sort order by transaction total value
+        history_filter: conditions transactions have to match
 
     Returns:
-        transactions history
+        transactions history page
 
     Raises:
         AccountError: user account isn't registered
@@ -166,11 +318,18 @@ async def fetch_acc_history(  # noqa: WPS210 WPS211
         'total': order_by_total,
     }
     sort_keys = await _get_sort_keys(order_by)  # noqa: E501
+    history_filter = history_filter or HistoryFilter()
+    conditions, filter_args = _get_history_conditions(
+        history_filter, first_arg=4,
+    )
     query: str = f"""   SELECT
                             DATE(created_at) AS date,
-                            (SELECT user_id
-                                FROM accounts
-                                WHERE id = deal_with) AS deal_with,
+                            COALESCE(
+                                counterparty_user_id,
+                                (SELECT user_id
+                                    FROM accounts
+                                    WHERE id = deal_with)
+                            ) AS deal_with,
                             description,
                             qty_change AS total
                             FROM transactions
@@ -179,15 +338,187 @@ async def fetch_acc_history(  # noqa: WPS210 WPS211
                                 FROM accounts
                                 WHERE user_id = $1
                                 AND current_status = 'active'
-                            )
+                            ){conditions}
                             ORDER BY {sort_keys}
                             OFFSET $2 LIMIT $3;"""
-    history = await db_con.fetch(query, user_id, offset, page_size)
-    if history:
-        return tuple(map(dict, history))
+    total_count = None
+    if not history_filter.dict(exclude_none=True):
+        total_count = await fetch_acc_transactions_count(user_id, db_con)
+    if total_count is not None and offset >= total_count:
+        return HistoryPage(records=(), has_next=False, total_count=total_count)
+    # one extra record tells whether there is next page
+    history = await db_con.fetch(
+        query, user_id, offset, page_size + 1, *filter_args,
+    )
+    is_registered = history or total_count is not None or (
+        await has_account(user_id, db_con)
+    )
+    if is_registered:
+        return HistoryPage(
+            records=tuple(
+                dict(record, total=Money(record['total']))
+                for record in history[:page_size]
+            ),
+            has_next=len(history) > page_size,
+            total_count=total_count,
+        )
     raise AccountError(f'Has no registered account with id: {user_id}')
 
 
+async def fetch_acc_transactions_count(
+    user_id: int,
+    db_con: Connection,
+) -> Optional[int]:
+    """Get number of user account transactions.
+
+    Hash chain of each account stripe is gap-free, so its sequence number
+    is the counter of stripe transactions maintained by every insert.
+
+    Args:
+        user_id: user id
+        db_con: database connection
+
+    Returns:
+        number of transactions, None if account isn't registered
+    """
+    query = """ SELECT COALESCE(sum(ledger_chains.seq), 0)::BIGINT
+                FROM accounts
+                LEFT JOIN ledger_chains
+                    ON ledger_chains.account_id = accounts.id
+                WHERE accounts.user_id = $1
+                AND accounts.current_status = 'active'
+                GROUP BY accounts.id;"""
+    return await db_con.fetchval(query, user_id)
+
+
+class LedgerVersion(NamedTuple):
+    """Version of account ledger."""
+
+    # account re-created for the same user starts its ledger over
+    account_id: int
+    # number of account transactions
+    version: int
+    # funds held by active holds, they change balance without transactions
+    held: int
+
+
+async def fetch_acc_version(
+    user_id: int,
+    db_con: Connection,
+) -> Optional[LedgerVersion]:
+    """Get version of user account ledger.
+
+    Sequence numbers of stripes hash chains are incremented by every
+    insert of account transaction, their sum is read from primary keys of
+    account chains without touching the ledger.
+
+    Args:
+        user_id: user id
+        db_con: database connection
+
+    Returns:
+        version of ledger, None if user account isn't registered
+    """
+    query = """ SELECT accounts.id AS account_id,
+                    COALESCE(sum(ledger_chains.seq), 0)::BIGINT AS version,
+                    account_stripes.held
+                FROM accounts
+                JOIN account_stripes
+                    ON account_stripes.account_id = accounts.id
+                    AND account_stripes.stripe = 0
+                LEFT JOIN ledger_chains
+                    ON ledger_chains.account_id = accounts.id
+                WHERE accounts.user_id = $1
+                AND accounts.current_status = 'active'
+                GROUP BY accounts.id, account_stripes.held;"""
+    version = await db_con.fetchrow(query, user_id)
+    if version is None:
+        return None
+    return LedgerVersion(**version)
+
+
+async def fetch_acc_statement(
+    user_id: int,
+    period: StatementPeriod,
+    date_from: date,
+    date_to: date,
+    db_con: Connection,
+) -> Tuple[Dict[str, Any], ...]:
+    """Fetch user account statement from rollups.
+
+    Opening balance is summed from monthly rollups before the first period,
+    so cost of statement doesn't depend on number of transactions.
+
+    Args:
+        user_id: user id
+        period: statement period
+        date_from: first date of statement
+        date_to: last date of statement
+        db_con: database connection
+
+    Returns:
+        statement lines of periods with transactions
+
+    Raises:
+        AccountError: user account isn't registered
+    """
+    acc_query = """ SELECT id
+                    FROM accounts
+                    WHERE user_id = $1
+                    AND current_status = 'active';"""
+    query = """ WITH opening AS (
+                    SELECT COALESCE(sum(total_in - total_out), 0) AS balance
+                    FROM account_rollups
+                    WHERE account_id = $1
+                    AND (
+                        period = 'month'
+                        AND period_start < date_trunc('month', $3::DATE)
+                        OR period = 'day'
+                        AND period_start >= date_trunc('month', $3::DATE)
+                        AND period_start < $3::DATE
+                    )
+                ), periods AS (
+                    SELECT period_start,
+                        sum(total_in) AS total_in,
+                        sum(total_out) AS total_out,
+                        sum(entries) AS entries
+                    FROM account_rollups
+                    WHERE account_id = $1
+                    AND period = $2
+                    AND period_start >= $3::DATE
+                    AND period_start <= $4::DATE
+                    GROUP BY period_start
+                )
+                SELECT period_start,
+                    (opening.balance + sum(total_in - total_out) OVER (
+                        ORDER BY period_start
+                    ) - total_in + total_out)::BIGINT AS opening_balance,
+                    total_in::BIGINT,
+                    total_out::BIGINT,
+                    (opening.balance + sum(total_in - total_out) OVER (
+                        ORDER BY period_start
+                    ))::BIGINT AS closing_balance,
+                    entries AS transactions_count
+                FROM periods, opening
+                ORDER BY period_start;"""
+    account_id: Optional[int] = await db_con.fetchval(acc_query, user_id)
+    if account_id is None:
+        raise AccountError(f'Has no registered account with id: {user_id}')
+    period_from = date_from
+    if period == StatementPeriod.month:
+        period_from = date_from.replace(day=1)
+    statement = await db_con.fetch(
+        query, account_id, period.value, period_from, date_to,
+    )
+    return tuple(
+        dict(
+            line,
+            **{key: Money(line[key]) for key in _STATEMENT_AMOUNTS},
+        )
+        for line in statement
+    )
+
+
 async def update_currencies(
     cur_rates: List[Tuple[str, float]],
     db_con: Connection,
@@ -206,62 +537,953 @@ async def update_currencies(
     await db_con.executemany(query, cur_rates)
 
 
-async def _make_replenishment(
+async def fetch_currency_rates(db_con: Connection) -> Dict[str, Decimal]:
+    """Fetch rates of all currencies to base currency.
+
+    Args:
+        db_con: database connection
+
+    Returns:
+        rates by currency name
+    """
+    query = """ SELECT cur_name, rate_to_base
+                FROM currencies;"""
+    return {
+        row['cur_name']: Decimal(row['rate_to_base'])
+        for row in await db_con.fetch(query)
+    }
+
+
+async def hold_funds(  # noqa: WPS211
+    hold_id: UUID,
     user_id: int,
-    qty_value: Decimal,
+    qty_value: Money,
+    ttl: float,
+    db_con: Connection,
+    description: Optional[str] = None,
+) -> datetime:
+    """Reserve funds of user account until capture, release or expiry.
+
+    Args:
+        hold_id: hold id
+        user_id: user id
+        qty_value: quantity of held value
+        ttl: hold lifetime, seconds
+        db_con: connection to database
+        description: description of hold aim
+
+    Returns:
+        hold expiry time
+
+    Raises:
+        AccountError: user account isn't registered
+        BalanceValueError: insufficient funds on the account
+    """
+    acc_query = """ SELECT id
+                    FROM accounts
+                    WHERE user_id = $1
+                    AND current_status = 'active';"""
+    hold_query = """    WITH stripe AS (
+                            UPDATE account_stripes
+                                SET held = held + $3
+                                WHERE account_id = $2
+                                AND stripe = 0
+                                RETURNING account_id
+                        )
+                        INSERT INTO holds (
+                            id, account_id, qty_held, description, expires_at
+                        )
+                        SELECT $1, account_id, $3, $4,
+                            LOCALTIMESTAMP + make_interval(secs => $5)
+                        FROM stripe
+                        RETURNING expires_at;"""
+    async with db_con.transaction():
+        account_id: Optional[int] = await db_con.fetchval(acc_query, user_id)
+        if account_id is None:
+            raise AccountError(f'Has no registered account with id: {user_id}')
+        available = await _lock_stripes(account_id, db_con)
+        if available - qty_value.minor < 0:
+            raise BalanceValueError(
+                f'Insufficient funds on the account: {user_id}',
+            )
+        return await db_con.fetchval(
+            hold_query,
+            hold_id,
+            account_id,
+            qty_value.minor,
+            'hold' if description is None else description,
+            ttl,
+        )
+
+
+async def capture_hold(
+    hold_id: UUID,
+    user_id: int,
+    db_con: Connection,
+    qty_value: Optional[Money] = None,
+) -> None:
+    """Withdraw held funds, remainder of partial capture is released.
+
+    Args:
+        hold_id: hold id
+        user_id: user id
+        db_con: connection to database
+        qty_value: captured quantity, whole hold by default
+
+    Raises:
+        HoldError: user account has no such active hold
+        BalanceValueError: captured quantity exceeds held one
+    """
+    capture_query = """ UPDATE holds
+                            SET current_status = 'captured'
+                            FROM accounts
+                            WHERE holds.id = $1
+                            AND accounts.id = holds.account_id
+                            AND accounts.user_id = $2
+                            AND holds.current_status = 'active'
+                            AND holds.expires_at > LOCALTIMESTAMP
+                            RETURNING holds.account_id, holds.qty_held,
+                                holds.description;"""
+    async with db_con.transaction():
+        hold = await db_con.fetchrow(capture_query, hold_id, user_id)
+        if hold is None:
+            raise HoldError(f'Has no active hold with id: {hold_id}')
+        captured = hold['qty_held']
+        if qty_value is not None:
+            captured = qty_value.minor
+        if captured > hold['qty_held']:
+            raise BalanceValueError(
+                f'Capture exceeds funds held by hold: {hold_id}',
+            )
+        await _unhold(hold['account_id'], hold['qty_held'], db_con)
+        await _make_replenishment(
+            user_id=user_id,
+            qty_value=-Money(captured),
+            db_con=db_con,
+            description=hold['description'],
+            stripe_key=0,
+        )
+
+
+async def release_hold(
+    hold_id: UUID,
+    user_id: int,
+    db_con: Connection,
+    hold_status: str = 'released',
+) -> None:
+    """Return held funds to available balance.
+
+    Args:
+        hold_id: hold id
+        user_id: user id
+        db_con: connection to database
+        hold_status: final status of hold
+
+    Raises:
+        HoldError: user account has no such active hold
+    """
+    release_query = """ UPDATE holds
+                            SET current_status = $3
+                            FROM accounts
+                            WHERE holds.id = $1
+                            AND accounts.id = holds.account_id
+                            AND accounts.user_id = $2
+                            AND holds.current_status = 'active'
+                            RETURNING holds.account_id, holds.qty_held;"""
+    async with db_con.transaction():
+        hold = await db_con.fetchrow(
+            release_query, hold_id, user_id, hold_status,
+        )
+        if hold is None:
+            raise HoldError(f'Has no active hold with id: {hold_id}')
+        await _unhold(hold['account_id'], hold['qty_held'], db_con)
+
+
+async def fetch_expired_holds(
+    limit: int,
+    db_con: Connection,
+) -> Tuple[Dict[str, Any], ...]:
+    """Fetch active holds past their expiry time.
+
+    Args:
+        limit: maximum number of holds
+        db_con: connection to shard database
+
+    Returns:
+        expired holds ids with user ids
+    """
+    query = """ SELECT holds.id, accounts.user_id
+                FROM holds
+                JOIN accounts ON accounts.id = holds.account_id
+                WHERE holds.current_status = 'active'
+                AND holds.expires_at <= LOCALTIMESTAMP
+                ORDER BY holds.expires_at
+                LIMIT $1;"""
+    holds = await db_con.fetch(query, limit)
+    return tuple(map(dict, holds))
+
+
+async def debit_saga(  # noqa: WPS211
+    saga_id: UUID,
+    sender_id: int,
+    recipient_id: int,
+    qty_value: Money,
     db_con: Connection,
-    deal_with: Optional[int] = None,
     description: Optional[str] = None,
 ) -> None:
-    deal_with = user_id if deal_with is None else deal_with
-    description = 'replenishment' if description is None else description
-    fractional_qty_value = int(qty_value * FRACTIONAL_VALUE)
-    query = """ INSERT INTO transactions (
-                    account_id, deal_with, description, qty_change
+    """Withdraw funds of cross-shard transfer and register its saga.
+
+    Args:
+        saga_id: transfer saga id
+        sender_id: sender user id
+        recipient_id: recipient user id from another shard
+        qty_value: quantity of transaction value
+        db_con: connection to sender shard database
+        description: description of transaction aim
+    """
+    query = """ INSERT INTO transfer_sagas (
+                    id, sender_id, recipient_id, qty_change, description
                 )
-                VALUES (
-                    (SELECT id
-                        FROM accounts
-                        WHERE user_id = $1
-                        AND current_status = 'active'),
-                    (SELECT id
-                        FROM accounts
-                        WHERE user_id = $2
-                        AND current_status = 'active'),
-                    $3, $4
-                );"""
-    try:
+                VALUES ($1, $2, $3, $4, $5);"""
+    async with db_con.transaction():
+        await _make_withdrawal(
+            user_id=sender_id,
+            qty_value=qty_value,
+            description='outcoming payment' if description is None else description,  # noqa: E501
+            db_con=db_con,
+            counterparty_user_id=recipient_id,
+        )
         await db_con.execute(
             query,
-            user_id,
-            deal_with,
+            saga_id,
+            sender_id,
+            recipient_id,
+            qty_value.minor,
             description,
-            fractional_qty_value,
         )
-    except exceptions.NotNullViolationError as exc:
-        raise AccountError(
-            f'Has no registered account with id: {user_id}',
-        ) from exc
 
 
-async def _make_withdrawal(
+async def credit_saga(  # noqa: WPS211
+    saga_id: UUID,
+    sender_id: int,
+    recipient_id: int,
+    qty_value: Money,
+    db_con: Connection,
+    description: Optional[str] = None,
+) -> None:
+    """Replenish funds of cross-shard transfer once.
+
+    Args:
+        saga_id: transfer saga id
+        sender_id: sender user id from another shard
+        recipient_id: recipient user id
+        qty_value: quantity of transaction value
+        db_con: connection to recipient shard database
+        description: description of transaction aim
+    """
+    query = """ INSERT INTO saga_credits (saga_id)
+                VALUES ($1)
+                ON CONFLICT (saga_id) DO NOTHING;"""
+    async with db_con.transaction():
+        executing_status = await db_con.execute(query, saga_id)
+        if int(executing_status.split()[-1]) == 0:
+            return
+        await _make_replenishment(
+            user_id=recipient_id,
+            qty_value=qty_value,
+            description='incoming payment' if description is None else description,  # noqa: E501
+            db_con=db_con,
+            counterparty_user_id=sender_id,
+        )
+
+
+async def complete_saga(saga_id: UUID, db_con: Connection) -> None:
+    """Mark cross-shard transfer saga completed.
+
+    Args:
+        saga_id: transfer saga id
+        db_con: connection to sender shard database
+    """
+    query = """ UPDATE transfer_sagas
+                    SET current_status = 'completed'
+                    WHERE id = $1
+                    AND current_status = 'debited';"""
+    await db_con.execute(query, saga_id)
+
+
+async def compensate_saga(
+    saga_id: UUID,
+    sender_id: int,
+    recipient_id: int,
+    qty_value: Money,
+    db_con: Connection,
+) -> None:
+    """Refund sender of cross-shard transfer which can't be credited.
+
+    Args:
+        saga_id: transfer saga id
+        sender_id: sender user id
+        recipient_id: recipient user id from another shard
+        qty_value: quantity of transaction value
+        db_con: connection to sender shard database
+    """
+    query = """ UPDATE transfer_sagas
+                    SET current_status = 'compensated'
+                    WHERE id = $1
+                    AND current_status = 'debited';"""
+    async with db_con.transaction():
+        executing_status = await db_con.execute(query, saga_id)
+        if int(executing_status.split()[-1]) == 0:
+            return
+        await _make_replenishment(
+            user_id=sender_id,
+            qty_value=qty_value,
+            description='transfer refund',
+            db_con=db_con,
+            counterparty_user_id=recipient_id,
+        )
+
+
+async def fetch_pending_sagas(
+    older_than: float,
+    db_con: Connection,
+) -> Tuple[Dict[str, Any], ...]:
+    """Fetch cross-shard transfer sagas stuck after debit.
+
+    Age is compared at precision of creation time, which is rounded to
+    hundredths of second and may be ahead of the current time.
+
+    Args:
+        older_than: minimum saga age, seconds
+        db_con: connection to shard database
+
+    Returns:
+        pending sagas
+    """
+    query = """ SELECT id, sender_id, recipient_id, qty_change, description
+                FROM transfer_sagas
+                WHERE current_status = 'debited'
+                AND created_at <= LOCALTIMESTAMP(2) - make_interval(
+                    secs => $1
+                )
+                ORDER BY created_at;"""
+    sagas = await db_con.fetch(query, older_than)
+    return tuple(map(dict, sagas))
+
+
+async def schedule_transfer(  # noqa: WPS211
+    transfer_id: UUID,
+    sender_id: int,
+    recipient_id: int,
+    qty_value: Money,
+    due_at: Optional[datetime],
+    db_con: Connection,
+    period: Optional[str] = None,
+    max_runs: Optional[int] = None,
+    description: Optional[str] = None,
+) -> None:
+    """Register transfer run at due time, once or periodically.
+
+    Args:
+        transfer_id: scheduled transfer id
+        sender_id: sender user id
+        recipient_id: recipient user id
+        qty_value: quantity of transaction value
+        due_at: time of the first run, now if None
+        db_con: connection to sender shard database
+        period: period of recurring transfer, single run if None
+        max_runs: number of runs of recurring transfer, unlimited if None
+        description: description of transaction aim
+
+    Raises:
+        AccountError: sender account isn't registered
+    """
+    query = """ INSERT INTO scheduled_transfers (
+                    id, sender_id, recipient_id, qty_value, description,
+                    first_due_at, due_at, period, max_runs
+                )
+                SELECT $1, $2, $3, $4, $5,
+                    COALESCE($6, LOCALTIMESTAMP), COALESCE($6, LOCALTIMESTAMP),
+                    $7, $8
+                WHERE EXISTS (
+                    SELECT 1
+                    FROM accounts
+                    WHERE user_id = $2
+                    AND current_status = 'active'
+                );"""
+    executing_status = await db_con.execute(
+        query,
+        transfer_id,
+        sender_id,
+        recipient_id,
+        qty_value.minor,
+        description,
+        due_at,
+        period,
+        max_runs,
+    )
+    if int(executing_status.split()[-1]) == 0:
+        raise AccountError(f'Has no registered account with id: {sender_id}')
+
+
+async def fetch_scheduled_transfer(
+    transfer_id: UUID,
+    sender_id: int,
+    db_con: Connection,
+) -> Dict[str, Any]:
+    """Get state of scheduled transfer.
+
+    Args:
+        transfer_id: scheduled transfer id
+        sender_id: sender user id
+        db_con: connection to sender shard database
+
+    Returns:
+        scheduled transfer state
+
+    Raises:
+        ScheduledTransferError: sender has no such scheduled transfer
+    """
+    query = """ SELECT id AS transfer_id, sender_id, recipient_id,
+                    qty_value, description, due_at, period::TEXT, max_runs,
+                    runs, failed_runs, last_error,
+                    current_status::TEXT AS status
+                FROM scheduled_transfers
+                WHERE id = $1
+                AND sender_id = $2;"""
+    scheduled = await db_con.fetchrow(query, transfer_id, sender_id)
+    if scheduled is None:
+        raise ScheduledTransferError(
+            f'Has no scheduled transfer with id: {transfer_id}',
+        )
+    return dict(scheduled, total=Money(scheduled['qty_value']))
+
+
+async def cancel_scheduled_transfer(
+    transfer_id: UUID,
+    sender_id: int,
+    db_con: Connection,
+) -> None:
+    """Cancel future runs of scheduled transfer.
+
+    Args:
+        transfer_id: scheduled transfer id
+        sender_id: sender user id
+        db_con: connection to sender shard database
+
+    Raises:
+        ScheduledTransferError: sender has no such scheduled transfer
+    """
+    query = """ UPDATE scheduled_transfers
+                    SET current_status = 'canceled'
+                    WHERE id = $1
+                    AND sender_id = $2
+                    AND current_status = 'scheduled';"""
+    executing_status = await db_con.execute(query, transfer_id, sender_id)
+    if int(executing_status.split()[-1]) == 0:
+        raise ScheduledTransferError(
+            f'Has no scheduled transfer with id: {transfer_id}',
+        )
+
+
+async def claim_scheduled_transfers(
+    limit: int,
+    lease: float,
+    db_con: Connection,
+) -> Tuple[Dict[str, Any], ...]:
+    """Claim due scheduled transfers for a while.
+
+    Transfers locked or claimed by other workers are skipped, claim of
+    crashed worker expires with lease.
+
+    Args:
+        limit: maximum number of transfers
+        lease: time of claim, seconds
+        db_con: database connection
+
+    Returns:
+        claimed transfers with number of their completed runs
+    """
+    query = """ UPDATE scheduled_transfers
+                    SET claimed_until = LOCALTIMESTAMP
+                        + make_interval(secs => $2)
+                    WHERE id IN (
+                        SELECT id
+                        FROM scheduled_transfers
+                        WHERE current_status = 'scheduled'
+                        AND due_at <= LOCALTIMESTAMP
+                        AND (
+                            claimed_until IS NULL
+                            OR claimed_until < LOCALTIMESTAMP
+                        )
+                        ORDER BY due_at
+                        LIMIT $1
+                        FOR UPDATE SKIP LOCKED
+                    )
+                    RETURNING id, sender_id, recipient_id, qty_value,
+                        description, runs;"""
+    scheduled = await db_con.fetch(query, limit, lease)
+    return tuple(map(dict, scheduled))
+
+
+async def lock_scheduled_run(
+    transfer_id: UUID,
+    runs: int,
+    db_con: Connection,
+) -> bool:
+    """Lock scheduled transfer for run unless the run is done already.
+
+    Args:
+        transfer_id: scheduled transfer id
+        runs: number of runs completed when transfer was claimed
+        db_con: connection to sender shard database within transaction
+
+    Returns:
+        the run is still due
+    """
+    query = """ SELECT id
+                FROM scheduled_transfers
+                WHERE id = $1
+                AND runs = $2
+                AND current_status = 'scheduled'
+                FOR UPDATE;"""
+    return await db_con.fetchval(query, transfer_id, runs) is not None
+
+
+async def finish_scheduled_run(
+    transfer_id: UUID,
+    error: Optional[str],
+    db_con: Connection,
+) -> None:
+    """Count run of scheduled transfer and set time of the next one.
+
+    Runs of recurring transfer are due at multiples of period from the
+    first run, so months keep their day and late runs don't shift later
+    ones.
+
+    Args:
+        transfer_id: scheduled transfer id
+        error: reason of failed run, None for successful one
+        db_con: connection to sender shard database within transaction
+    """
+    query = """ UPDATE scheduled_transfers
+                    SET runs = runs + 1,
+                        failed_runs = failed_runs
+                            + ($2::VARCHAR IS NOT NULL)::INTEGER,
+                        last_error = $2,
+                        claimed_until = NULL,
+                        due_at = COALESCE(
+                            first_due_at
+                                + ('1 ' || period::TEXT)::INTERVAL
+                                * (runs + 1),
+                            due_at
+                        ),
+                        current_status = CASE
+                            WHEN period IS NOT NULL
+                                AND (max_runs IS NULL OR runs + 1 < max_runs)
+                                THEN 'scheduled'
+                            WHEN $2 IS NULL THEN 'completed'
+                            ELSE 'failed'
+                        END::scheduled_transfer_status
+                    WHERE id = $1;"""
+    await db_con.execute(query, transfer_id, error)
+
+
+async def create_import(import_id: UUID, db_con: Connection) -> None:
+    """Register ledger import.
+
+    Args:
+        import_id: ledger import id
+        db_con: database connection
+    """
+    query = """ INSERT INTO ledger_imports (id)
+                VALUES ($1);"""
+    await db_con.execute(query, import_id)
+
+
+async def update_import(  # noqa: WPS211
+    import_id: UUID,
+    lines_count: int,
+    imported: int,
+    failed: int,
+    db_con: Connection,
+    import_status: str = 'running',
+) -> None:
+    """Save progress of ledger import.
+
+    Args:
+        import_id: ledger import id
+        lines_count: number of processed lines
+        imported: number of imported records
+        failed: number of rejected lines
+        db_con: database connection
+        import_status: status of ledger import
+    """
+    query = """ UPDATE ledger_imports
+                    SET lines_count = $2,
+                        imported = $3,
+                        failed = $4,
+                        current_status = $5,
+                        updated_at = CURRENT_TIMESTAMP(2)
+                    WHERE id = $1;"""
+    await db_con.execute(
+        query,
+        import_id,
+        lines_count,
+        imported,
+        failed,
+        import_status,
+    )
+
+
+async def fetch_import(import_id: UUID, db_con: Connection) -> Dict[str, Any]:
+    """Fetch progress of ledger import.
+
+    Args:
+        import_id: ledger import id
+        db_con: database connection
+
+    Returns:
+        ledger import progress
+
+    Raises:
+        ImportNotFoundError: ledger import isn't registered
+    """
+    query = """ SELECT id, current_status AS status, lines_count, imported,
+                    failed, created_at, updated_at
+                FROM ledger_imports
+                WHERE id = $1;"""
+    ledger_import = await db_con.fetchrow(query, import_id)
+    if ledger_import is None:
+        raise ImportNotFoundError(f'Has no ledger import with id: {import_id}')
+    return dict(ledger_import)
+
+
+async def import_chunk(
+    import_id: UUID,
+    records: Sequence[Tuple[Any, ...]],
+    db_con: Connection,
+) -> List[Tuple[int, str]]:
+    """Load chunk of ledger records through staging table.
+
+    Records of missing accounts and of accounts which balance would become
+    negative are rejected, others are merged into transactions.
+
+    Args:
+        import_id: ledger import id
+        records: staging rows with quantity in fractional units
+        db_con: database connection
+
+    Returns:
+        line numbers and reasons of rejected records
+    """
+    async with db_con.transaction():
+        rejected = await _stage_import(import_id, records, db_con)
+        deltas = await _fetch_import_deltas(import_id, db_con)
+        overdrawn = await _find_overdrawn(deltas, db_con)
+        if overdrawn:
+            rejected.extend(
+                await _reject_overdrafts(import_id, overdrawn, db_con),
+            )
+        await _merge_import(import_id, deltas, overdrawn, db_con)
+    return sorted(rejected)
+
+
+async def fetch_unverified_chains(
+    db_con: Connection,
+) -> Tuple[Dict[str, Any], ...]:
+    """Fetch ledger hash chains grown since last verification.
+
+    Args:
+        db_con: connection to shard database
+
+    Returns:
+        chains heads with last verified positions
+    """
+    query = """ SELECT ledger_chains.account_id, ledger_chains.stripe,
+                    ledger_chains.seq,
+                    COALESCE(chain_verifications.seq, 0) AS verified_seq,
+                    chain_verifications.head AS verified_head
+                FROM ledger_chains
+                LEFT JOIN chain_verifications
+                    ON chain_verifications.account_id = ledger_chains.account_id
+                    AND chain_verifications.stripe = ledger_chains.stripe
+                WHERE ledger_chains.seq > COALESCE(chain_verifications.seq, 0)
+                AND chain_verifications.broken_seq IS NULL
+                ORDER BY ledger_chains.account_id, ledger_chains.stripe;"""
+    chains = await db_con.fetch(query)
+    return tuple(map(dict, chains))
+
+
+async def fetch_chain_entries(  # noqa: WPS211
+    account_id: int,
+    stripe: int,
+    after_seq: int,
+    up_to_seq: int,
+    limit: int,
+    db_con: Connection,
+) -> Tuple[Dict[str, Any], ...]:
+    """Fetch transactions of ledger hash chain in chain order.
+
+    Args:
+        account_id: account id
+        stripe: account stripe
+        after_seq: last verified position
+        up_to_seq: chain head position
+        limit: maximum number of transactions
+        db_con: connection to shard database
+
+    Returns:
+        chained transactions
+    """
+    query = """ SELECT id, account_id, stripe, chain_seq, deal_with,
+                    counterparty_user_id, qty_change, created_at, description,
+                    chain_hash
+                FROM transactions
+                WHERE account_id = $1
+                AND stripe = $2
+                AND chain_seq > $3
+                AND chain_seq <= $4
+                ORDER BY chain_seq
+                LIMIT $5;"""
+    entries = await db_con.fetch(
+        query, account_id, stripe, after_seq, up_to_seq, limit,
+    )
+    return tuple(map(dict, entries))
+
+
+async def save_chain_verification(  # noqa: WPS211
+    account_id: int,
+    stripe: int,
+    seq: int,
+    head: bytes,
+    db_con: Connection,
+    broken_seq: Optional[int] = None,
+) -> None:
+    """Save verified position of ledger hash chain.
+
+    Args:
+        account_id: account id
+        stripe: account stripe
+        seq: last verified position
+        head: hash of last verified transaction
+        db_con: connection to shard database
+        broken_seq: position of first transaction failed verification
+    """
+    query = """ INSERT INTO chain_verifications (
+                    account_id, stripe, seq, head, broken_seq
+                )
+                VALUES ($1, $2, $3, $4, $5)
+                ON CONFLICT (account_id, stripe) DO UPDATE
+                    SET seq = EXCLUDED.seq,
+                        head = EXCLUDED.head,
+                        broken_seq = EXCLUDED.broken_seq,
+                        verified_at = CURRENT_TIMESTAMP(2);"""
+    await db_con.execute(query, account_id, stripe, seq, head, broken_seq)
+
+
+async def fetch_reclaimable_accounts(
+    retention: float,
+    limit: int,
+    db_con: Connection,
+) -> List[int]:
+    """Fetch accounts deleted longer than retention period ago.
+
+    Accounts with hash chains not verified up to the end are skipped, so
+    only verified ledgers are archived.
+
+    Args:
+        retention: retention period of deleted account ledger, seconds
+        limit: maximum number of accounts
+        db_con: connection to shard database
+
+    Returns:
+        accounts ids
+    """
+    query = """ SELECT id
+                FROM accounts
+                WHERE current_status = 'deleted'
+                AND reclaimed_at IS NULL
+                AND deleted_at < LOCALTIMESTAMP - make_interval(secs => $1)
+                AND NOT EXISTS (
+                    SELECT 1
+                    FROM ledger_chains AS chains
+                    LEFT JOIN chain_verifications AS verified
+                        ON verified.account_id = chains.account_id
+                        AND verified.stripe = chains.stripe
+                    WHERE chains.account_id = accounts.id
+                    AND (
+                        verified.seq IS DISTINCT FROM chains.seq
+                        OR verified.broken_seq IS NOT NULL
+                    )
+                )
+                ORDER BY deleted_at
+                LIMIT $2;"""
+    return [row['id'] for row in await db_con.fetch(query, retention, limit)]
+
+
+async def archive_transactions(
+    account_id: int,
+    limit: int,
+    db_con: Connection,
+) -> int:
+    """Move batch of account transactions to archive.
+
+    Account is marked as reclaimed once it has no transactions left.
+
+    Args:
+        account_id: account id
+        limit: maximum number of moved transactions
+        db_con: connection to shard database
+
+    Returns:
+        number of moved transactions
+    """
+    move_query = """    WITH moved AS (
+                            DELETE FROM transactions
+                                WHERE id IN (
+                                    SELECT id
+                                    FROM transactions
+                                    WHERE account_id = $1
+                                    ORDER BY id
+                                    LIMIT $2
+                                )
+                                RETURNING id, account_id, created_at,
+                                    deal_with, description, qty_change,
+                                    counterparty_user_id, stripe, chain_seq,
+                                    chain_hash
+                        )
+                        INSERT INTO transactions_archive (
+                            id, account_id, created_at, deal_with,
+                            description, qty_change, counterparty_user_id,
+                            stripe, chain_seq, chain_hash
+                        )
+                        SELECT *
+                        FROM moved;"""
+    reclaimed_query = """   UPDATE accounts
+                                SET reclaimed_at = CURRENT_TIMESTAMP(2)
+                                WHERE id = $1;"""
+    executing_status = await db_con.execute(move_query, account_id, limit)
+    moved = int(executing_status.split()[-1])
+    if moved < limit:
+        await db_con.execute(reclaimed_query, account_id)
+    return moved
+
+
+async def has_account(user_id: int, db_con: Connection) -> bool:
+    """Check user account is registered.
+
+    Args:
+        user_id: user id
+        db_con: database connection
+
+    Returns:
+        account existence
+    """
+    query = """ SELECT user_id
+                FROM accounts
+                WHERE user_id = $1
+                AND current_status = 'active';"""
+    return user_id == await db_con.fetchval(query, user_id)
+
+
+async def _make_replenishment(  # noqa: WPS211
     user_id: int,
-    qty_value: Decimal,
+    qty_value: Money,
     db_con: Connection,
     deal_with: Optional[int] = None,
     description: Optional[str] = None,
+    counterparty_user_id: Optional[int] = None,
+    stripe_key: Optional[int] = None,
+) -> None:
+    # counterparty from another shard has no account in this database
+    if deal_with is None or counterparty_user_id is not None:
+        deal_with = user_id
+    description = 'replenishment' if description is None else description
+    stripe_key = next(_stripe_keys) if stripe_key is None else stripe_key
+    query = """ WITH stripe AS (
+                    UPDATE account_stripes
+                        SET balance = balance + $4
+                        FROM accounts
+                        WHERE accounts.user_id = $1
+                        AND accounts.current_status = 'active'
+                        AND account_stripes.account_id = accounts.id
+                        AND account_stripes.stripe = (
+                            $6::BIGINT % accounts.stripes
+                        )
+                        RETURNING account_stripes.account_id,
+                            account_stripes.stripe
+                )
+                INSERT INTO transactions (
+                    account_id, stripe, deal_with, description, qty_change,
+                    counterparty_user_id
+                )
+                SELECT stripe.account_id, stripe.stripe, (
+                        SELECT id
+                        FROM accounts
+                        WHERE user_id = $2
+                        AND current_status = 'active'
+                    ), $3, $4, $5
+                FROM stripe;"""
+    await _credit_stripe(query, db_con, (
+        user_id,
+        deal_with,
+        description,
+        qty_value.minor,
+        counterparty_user_id,
+        stripe_key,
+    ))
+
+
+async def _credit_stripe(
+    query: str,
+    db_con: Connection,
+    query_args: Tuple[Any, ...],
+) -> None:
+    user_id = query_args[0]
+    # concurrent shrink may remove chosen stripe, next statement sees
+    # resized account and picks remaining one
+    for _ in range(CREDIT_ATTEMPTS):
+        try:
+            executing_status = await db_con.execute(query, *query_args)
+        except exceptions.NotNullViolationError:
+            break
+        if int(executing_status.split()[-1]):
+            return
+        if not await has_account(user_id, db_con):
+            break
+    raise AccountError(f'Has no registered account with id: {user_id}')
+
+
+async def _make_withdrawal(  # noqa: WPS211
+    user_id: int,
+    qty_value: Money,
+    db_con: Connection,
+    deal_with: Optional[int] = None,
+    description: Optional[str] = None,
+    counterparty_user_id: Optional[int] = None,
 ) -> None:
     description = 'withdraw' if description is None else description
-    fractional_qty_value = int(qty_value * FRACTIONAL_VALUE)
+    acc_query = """ SELECT id
+                    FROM accounts
+                    WHERE user_id = $1
+                    AND current_status = 'active';"""
     async with db_con.transaction():
-        balance = await _compute_balance(user_id, db_con)
-        if balance - fractional_qty_value >= 0:
+        account_id: Optional[int] = await db_con.fetchval(acc_query, user_id)
+        if account_id is None:
+            raise AccountError(f'Has no registered account with id: {user_id}')
+        balance = await _lock_stripes(account_id, db_con)
+        if balance - qty_value.minor >= 0:
+            # debits always go to the first stripe, total balance is checked
+            # while all stripes are locked
             await _make_replenishment(
                 user_id=user_id,
                 qty_value=-qty_value,
                 db_con=db_con,
                 deal_with=deal_with,
                 description=description,
+                counterparty_user_id=counterparty_user_id,
+                stripe_key=0,
             )
         else:
             raise BalanceValueError(
@@ -269,6 +1491,53 @@ async def _make_withdrawal(
             )
 
 
+async def _resize_stripes(
+    account_id: int,
+    stripes_count: int,
+    db_con: Connection,
+) -> None:
+    fold_query = """    UPDATE account_stripes
+                            SET balance = balance + (
+                                SELECT COALESCE(sum(balance), 0)
+                                FROM account_stripes
+                                WHERE account_id = $1
+                                AND stripe >= $2
+                            )
+                            WHERE account_id = $1
+                            AND stripe = 0;"""
+    delete_query = """  DELETE FROM account_stripes
+                            WHERE account_id = $1
+                            AND stripe >= $2;"""
+    add_query = """ INSERT INTO account_stripes (account_id, stripe)
+                    SELECT $1, generate_series(0, $2 - 1)
+                    ON CONFLICT (account_id, stripe) DO NOTHING;"""
+    count_query = """   UPDATE accounts
+                            SET stripes = $2
+                            WHERE id = $1;"""
+    for query in (fold_query, delete_query, add_query, count_query):
+        await db_con.execute(query, account_id, stripes_count)
+
+
+async def _lock_stripes(account_id: int, db_con: Connection) -> int:
+    # stripes are always locked in the same order to avoid deadlocks,
+    # funds of active holds aren't available
+    query = """ SELECT balance - held AS available
+                FROM account_stripes
+                WHERE account_id = $1
+                ORDER BY stripe
+                FOR UPDATE;"""
+    stripes = await db_con.fetch(query, account_id)
+    return sum(stripe['available'] for stripe in stripes)
+
+
+async def _unhold(account_id: int, qty_held: int, db_con: Connection) -> None:
+    query = """ UPDATE account_stripes
+                    SET held = held - $2
+                    WHERE account_id = $1
+                    AND stripe = 0;"""
+    await db_con.execute(query, account_id, qty_held)
+
+
 async def _fetch_currency_rate(cur_name: str, db_con: Connection) -> Decimal:
     query = """ SELECT rate_to_base
                 FROM currencies
@@ -279,19 +1548,19 @@ async def _fetch_currency_rate(cur_name: str, db_con: Connection) -> Decimal:
     return Decimal(rate)
 
 
-async def _compute_balance(user_id: int, db_con: Connection) -> Decimal:
-    balance_query = """ SELECT sum(qty_change)
-                            FROM transactions
+async def _compute_balance(user_id: int, db_con: Connection) -> int:
+    balance_query = """ SELECT sum(balance - held)::BIGINT
+                            FROM account_stripes
                             WHERE account_id = (
                                 SELECT id
                                 FROM accounts
                                 WHERE user_id = $1
                                 AND current_status = 'active'
                             );"""
-    balance: Optional[float] = await db_con.fetchval(balance_query, user_id)
+    balance: Optional[int] = await db_con.fetchval(balance_query, user_id)
     if balance is None:
         raise AccountError(f'Has no registered account with id: {user_id}')
-    return Decimal(balance)
+    return balance
 
 
 async def _get_sort_keys(
@@ -307,9 +1576,179 @@ async def _get_sort_keys(
     return 'date DESC'
 
 
-async def _has_account(user_id: int, db_con: Connection) -> bool:
-    query = """ SELECT user_id
-                FROM accounts
-                WHERE user_id = $1
-                AND current_status = 'active';"""
-    return user_id == await db_con.fetchval(query, user_id)
+async def _stage_import(
+    import_id: UUID,
+    records: Sequence[Tuple[Any, ...]],
+    db_con: Connection,
+) -> List[Tuple[int, str]]:
+    query = """ DELETE FROM import_staging
+                    WHERE import_id = $1
+                    AND NOT EXISTS (
+                        SELECT 1
+                        FROM accounts
+                        WHERE accounts.user_id = import_staging.user_id
+                        AND current_status = 'active'
+                    )
+                    RETURNING line;"""
+    await db_con.copy_records_to_table(
+        'import_staging',
+        records=[(import_id, *record) for record in records],
+        columns=(
+            'import_id',
+            'line',
+            'user_id',
+            'qty_change',
+            'description',
+            'created_at',
+            'counterparty_user_id',
+        ),
+    )
+    return [
+        (row['line'], 'Account not found')
+        for row in await db_con.fetch(query, import_id)
+    ]
+
+
+async def _fetch_import_deltas(
+    import_id: UUID,
+    db_con: Connection,
+) -> Dict[int, int]:
+    query = """ SELECT accounts.id AS account_id, sum(qty_change) AS delta
+                FROM import_staging
+                JOIN accounts
+                    ON accounts.user_id = import_staging.user_id
+                    AND accounts.current_status = 'active'
+                WHERE import_id = $1
+                GROUP BY accounts.id
+                ORDER BY accounts.id;"""
+    return {
+        row['account_id']: row['delta']
+        for row in await db_con.fetch(query, import_id)
+    }
+
+
+async def _find_overdrawn(
+    deltas: Dict[int, int],
+    db_con: Connection,
+) -> Set[int]:
+    query = """ SELECT account_id, balance - held AS balance
+                FROM account_stripes
+                WHERE account_id = ANY($1::INTEGER[])
+                ORDER BY account_id, stripe
+                FOR UPDATE;"""
+    balances: Dict[int, int] = dict.fromkeys(deltas, 0)
+    for stripe in await db_con.fetch(query, list(deltas)):
+        balances[stripe['account_id']] += stripe['balance']
+    return {
+        account_id
+        for account_id, delta in deltas.items()
+        if balances[account_id] + delta < 0
+    }
+
+
+async def _reject_overdrafts(
+    import_id: UUID,
+    overdrawn: Set[int],
+    db_con: Connection,
+) -> List[Tuple[int, str]]:
+    query = """ DELETE FROM import_staging
+                    USING accounts
+                    WHERE import_id = $1
+                    AND accounts.user_id = import_staging.user_id
+                    AND accounts.current_status = 'active'
+                    AND accounts.id = ANY($2::INTEGER[])
+                    RETURNING line;"""
+    return [
+        (row['line'], 'Insufficient funds on the account')
+        for row in await db_con.fetch(query, import_id, list(overdrawn))
+    ]
+
+
+async def _merge_import(
+    import_id: UUID,
+    deltas: Dict[int, int],
+    overdrawn: Set[int],
+    db_con: Connection,
+) -> None:
+    # counterparty is kept by user id as of cross-shard transfer, it may
+    # have no account on shard
+    merge_query = """   INSERT INTO transactions (
+                            account_id, deal_with, description, qty_change,
+                            created_at, counterparty_user_id
+                        )
+                        SELECT accounts.id, accounts.id, description,
+                            qty_change,
+                            COALESCE(
+                                import_staging.created_at,
+                                CURRENT_TIMESTAMP(2)
+                            ),
+                            import_staging.counterparty_user_id
+                        FROM import_staging
+                        JOIN accounts
+                            ON accounts.user_id = import_staging.user_id
+                            AND accounts.current_status = 'active'
+                        WHERE import_id = $1
+                        ORDER BY line;"""
+    balance_query = """ UPDATE account_stripes
+                            SET balance = balance + $2
+                            WHERE account_id = $1
+                            AND stripe = 0;"""
+    cleanup_query = """ DELETE FROM import_staging
+                            WHERE import_id = $1;"""
+    await db_con.execute(merge_query, import_id)
+    await db_con.executemany(balance_query, [
+        (account_id, delta)
+        for account_id, delta in deltas.items()
+        if account_id not in overdrawn
+    ])
+    await db_con.execute(cleanup_query, import_id)
+
+
+def _get_history_conditions(
+    history_filter: HistoryFilter,
+    first_arg: int,
+) -> Tuple[str, List[Any]]:
+    conditions: List[str] = []
+    args: List[Any] = []
+    for condition, filter_arg in _get_filter_args(history_filter):
+        if filter_arg is not None:
+            args.append(filter_arg)
+            placeholder = '${0}'.format(first_arg + len(args) - 1)
+            conditions.append(condition.format(placeholder))
+    return ''.join(
+        '\n                            AND {0}'.format(sql_condition)
+        for sql_condition in conditions
+    ), args
+
+
+def _get_filter_args(
+    history_filter: HistoryFilter,
+) -> Tuple[Tuple[str, Any], ...]:
+    deal_with_condition = """(
+                                counterparty_user_id = {0}
+                                OR counterparty_user_id IS NULL
+                                AND deal_with IN (
+                                    SELECT id
+                                    FROM accounts
+                                    WHERE user_id = {0}
+                                )
+                            )"""
+    description = history_filter.description
+    return (
+        ('created_at >= {0}::DATE', history_filter.date_from),
+        ('created_at < {0}::DATE + 1', history_filter.date_to),
+        (deal_with_condition, history_filter.deal_with),
+        ('qty_change >= {0}', _to_minor(history_filter.min_total)),
+        ('qty_change <= {0}', _to_minor(history_filter.max_total)),
+        ('description LIKE {0}', None if description is None else (
+            '{0}%'.format(_escape_like(description))
+        )),
+    )
+
+
+def _to_minor(total: Optional[Money]) -> Optional[int]:
+    return None if total is None else total.minor
+
+
+def _escape_like(pattern: str) -> str:
+    return re.sub(r'([\\%_])', r'\\\1', pattern)
@@ -1,30 +1,185 @@
 """Database dependencies for app."""
-from asyncpg import Connection, Pool
-from fastapi import Depends, Request
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional, cast
 
+from asyncpg import Connection
+from fastapi import Depends, HTTPException, Request, status
+from paymaster.database.admission import AdmissionController, Lane
+from paymaster.database.balance_cache import BalanceCache
+from paymaster.database.currency_rates import CurrencyRates
+from paymaster.database.lazy import LazyConnection
+from paymaster.database.sharding import ShardRouter
+from paymaster.exceptions import PoolOverloadError
+from paymaster.settings import (
+    BALANCE_STATEMENT_TIMEOUT,
+    HISTORY_STATEMENT_TIMEOUT,
+    IMPORT_STATEMENT_TIMEOUT,
+    WRITE_STATEMENT_TIMEOUT,
+)
 
-def get_db_pool(request: Request) -> Pool:
-    """Extract database connections pool from app.
+LOGGER = logging.getLogger(__name__)
+
+
+def get_shard_router(request: Request) -> ShardRouter:
+    """Extract shard router with database connections pools from app.
+
+    Args:
+        request: request containing application instance
+
+    Returns:
+        shard router
+    """
+    return request.app.state.shards
+
+
+def get_balance_cache(request: Request) -> Optional[BalanceCache]:
+    """Extract balance cache from app.
+
+    Args:
+        request: request containing application instance
+
+    Returns:
+        balance cache or None when caching is disabled
+    """
+    return request.app.state.balance_cache
+
+
+def get_currency_rates(request: Request) -> CurrencyRates:
+    """Extract currencies cross rates from app.
 
     Args:
         request: request containing application instance
 
     Returns:
-        database connections pool
+        currencies cross rates
+    """
+    return request.app.state.currency_rates
+
+
+class ShardConnector(object):
+    """Provider of connections to shards in priority lane."""
+
+    def __init__(
+        self,
+        router: ShardRouter,
+        lane: Lane,
+        statement_timeout: Optional[int] = None,
+    ) -> None:
+        """Init connector.
+
+        Args:
+            router: shard router
+            lane: priority lane of requests
+            statement_timeout: time budget of each query, milliseconds
+        """
+        self.router = router
+        self.lane = lane
+        self.statement_timeout = statement_timeout
+
+    def shard_of(self, user_id: int) -> int:
+        """Get shard number of user account.
+
+        Args:
+            user_id: user id
+
+        Returns:
+            shard number
+        """
+        return self.router.shard_of(user_id)
+
+    @asynccontextmanager
+    async def connection(self, user_id: int) -> AsyncIterator[Connection]:
+        """Hold connection to shard of user account within context.
+
+        Connection is acquired from pool by the first query only and is
+        released as soon as context is left.
+
+        Args:
+            user_id: user id
+
+        Yields:
+            database connection
+        """
+        admission = self.router.admission_for(user_id)
+        lazy = LazyConnection(lambda: self._acquire(admission))
+        try:
+            # the proxy supports connection interface used by database module
+            yield cast(Connection, lazy)
+        finally:
+            if lazy.connection is not None:
+                await admission.release(lazy.connection, self.lane)
+
+    async def _acquire(self, admission: AdmissionController) -> Connection:
+        try:
+            conn = await admission.acquire(self.lane)
+        except PoolOverloadError as exc:
+            LOGGER.warning(exc)
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail='Service is overloaded, try again later',
+                headers={'Retry-After': str(admission.retry_after)},
+            )
+        if self.statement_timeout is not None:
+            try:
+                await conn.set_statement_timeout(self.statement_timeout)
+            except BaseException:  # noqa: WPS424
+                await admission.release(conn, self.lane)
+                raise
+        return conn
+
+
+def get_write_connector(
+    router: ShardRouter = Depends(get_shard_router),  # noqa: WPS404
+) -> ShardConnector:
+    """Get connector for account changing requests.
+
+    Args:
+        router: shard router
+
+    Returns:
+        shards connector
+    """
+    return ShardConnector(router, Lane.write, WRITE_STATEMENT_TIMEOUT)
+
+
+def get_balance_connector(
+    router: ShardRouter = Depends(get_shard_router),  # noqa: WPS404
+) -> ShardConnector:
+    """Get connector for balance requests.
+
+    Args:
+        router: shard router
+
+    Returns:
+        shards connector
     """
-    return request.app.state.pool
+    return ShardConnector(router, Lane.read, BALANCE_STATEMENT_TIMEOUT)
 
 
-async def get_connection_from_pool(
-    pool: Pool = Depends(get_db_pool),  # noqa: WPS404
-) -> Connection:
-    """Get connection from database connections pool.
+def get_history_connector(
+    router: ShardRouter = Depends(get_shard_router),  # noqa: WPS404
+) -> ShardConnector:
+    """Get connector for transactions history requests.
 
     Args:
-        pool: database connections pool
+        router: shard router
 
-    Yields:
-        database connection
+    Returns:
+        shards connector
+    """
+    return ShardConnector(router, Lane.read, HISTORY_STATEMENT_TIMEOUT)
+
+
+def get_import_connector(
+    router: ShardRouter = Depends(get_shard_router),  # noqa: WPS404
+) -> ShardConnector:
+    """Get connector for bulk ledger imports and accounts changes.
+
+    Args:
+        router: shard router
+
+    Returns:
+        shards connector
     """
-    async with pool.acquire() as conn:
-        yield conn
+    return ShardConnector(router, Lane.bulk, IMPORT_STATEMENT_TIMEOUT)
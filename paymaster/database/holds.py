@@ -0,0 +1,39 @@
+"""Expiry of authorization holds."""
+import logging
+
+from paymaster.database.admission import Lane
+from paymaster.database.db import fetch_expired_holds, release_hold
+from paymaster.database.sharding import ShardRouter
+from paymaster.exceptions import HoldError
+
+LOGGER = logging.getLogger(__name__)
+
+
+async def expire_holds(router: ShardRouter, batch_size: int) -> int:
+    """Return funds of expired holds to available balance.
+
+    Args:
+        router: shard router
+        batch_size: maximum number of holds expired on shard per run
+
+    Returns:
+        number of expired holds
+    """
+    expired = 0
+    for admission in router.admissions:
+        async with admission.connection(Lane.bulk) as db_con:
+            holds = await fetch_expired_holds(batch_size, db_con)
+            for hold in holds:
+                try:
+                    await release_hold(
+                        hold_id=hold['id'],
+                        user_id=hold['user_id'],
+                        db_con=db_con,
+                        hold_status='expired',
+                    )
+                except HoldError as exc:
+                    # hold is captured or released meanwhile
+                    LOGGER.info(exc)
+                    continue
+                expired += 1
+    return expired
@@ -0,0 +1,150 @@
+"""Connection proxy acquiring pooled connection on first query."""
+from typing import Any, Awaitable, Callable, Optional
+
+from asyncpg import Connection
+from asyncpg.transaction import Transaction
+
+
+class LazyConnection(object):  # noqa: WPS214
+    """Proxy of database connection acquired on the first query.
+
+    Supports the subset of connection interface used by database module.
+    """
+
+    def __init__(self, acquire: Callable[[], Awaitable[Connection]]) -> None:
+        """Init proxy.
+
+        Args:
+            acquire: coroutine function acquiring connection from pool
+        """
+        self._acquire = acquire
+        self.connection: Optional[Connection] = None
+
+    async def acquire(self) -> Connection:
+        """Get underlying connection, acquire it if needed.
+
+        Returns:
+            database connection
+        """
+        if self.connection is None:
+            self.connection = await self._acquire()
+        return self.connection
+
+    async def execute(self, query: str, *args, **kwargs) -> Any:
+        """Execute query on acquired connection.
+
+        Args:
+            query: query text
+            args: query arguments
+            kwargs: asyncpg execute options
+
+        Returns:
+            status of last executed command
+        """
+        conn = await self.acquire()
+        return await conn.execute(query, *args, **kwargs)
+
+    async def executemany(self, command: str, args, **kwargs) -> Any:
+        """Execute command for each sequence of arguments.
+
+        Args:
+            command: command text
+            args: sequence of command arguments
+            kwargs: asyncpg executemany options
+
+        Returns:
+            None
+        """
+        conn = await self.acquire()
+        return await conn.executemany(command, args, **kwargs)
+
+    async def fetch(self, query: str, *args, **kwargs) -> Any:
+        """Fetch query rows on acquired connection.
+
+        Args:
+            query: query text
+            args: query arguments
+            kwargs: asyncpg fetch options
+
+        Returns:
+            query rows
+        """
+        conn = await self.acquire()
+        return await conn.fetch(query, *args, **kwargs)
+
+    async def fetchrow(self, query: str, *args, **kwargs) -> Any:
+        """Fetch first query row on acquired connection.
+
+        Args:
+            query: query text
+            args: query arguments
+            kwargs: asyncpg fetchrow options
+
+        Returns:
+            first query row
+        """
+        conn = await self.acquire()
+        return await conn.fetchrow(query, *args, **kwargs)
+
+    async def fetchval(self, query: str, *args, **kwargs) -> Any:
+        """Fetch value of first query row on acquired connection.
+
+        Args:
+            query: query text
+            args: query arguments
+            kwargs: asyncpg fetchval options
+
+        Returns:
+            value of first query row
+        """
+        conn = await self.acquire()
+        return await conn.fetchval(query, *args, **kwargs)
+
+    async def copy_records_to_table(
+        self,
+        table_name: str,
+        **kwargs,
+    ) -> Any:
+        """Copy records to table on acquired connection.
+
+        Args:
+            table_name: name of table
+            kwargs: asyncpg copy_records_to_table options
+
+        Returns:
+            status of COPY command
+        """
+        conn = await self.acquire()
+        return await conn.copy_records_to_table(table_name, **kwargs)
+
+    def transaction(self, **kwargs) -> '_LazyTransaction':
+        """Create transaction acquiring connection on start.
+
+        Args:
+            kwargs: asyncpg transaction options
+
+        Returns:
+            transaction context manager
+        """
+        return _LazyTransaction(self, kwargs)
+
+
+class _LazyTransaction(object):
+    def __init__(self, lazy: LazyConnection, options: Any) -> None:
+        self._lazy = lazy
+        self._options = options
+        self._transaction: Optional[Transaction] = None
+
+    async def __aenter__(self) -> Transaction:
+        conn = await self._lazy.acquire()
+        self._transaction = conn.transaction(**self._options)
+        await self._transaction.start()
+        return self._transaction
+
+    async def __aexit__(self, exc_type, *exc_info) -> None:
+        if self._transaction is None:
+            return
+        if exc_type is None:
+            await self._transaction.commit()
+        else:
+            await self._transaction.rollback()
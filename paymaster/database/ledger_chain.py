@@ -0,0 +1,176 @@
+"""Incremental verification of ledger hash chains."""
+import asyncio
+import hashlib
+import logging
+from typing import Any, List, Mapping, NamedTuple, Optional, Tuple
+
+from asyncpg import Connection
+from paymaster.database.admission import AdmissionController, Lane
+from paymaster.database.db import (
+    fetch_chain_entries,
+    fetch_unverified_chains,
+    save_chain_verification,
+)
+from paymaster.database.sharding import ShardRouter
+
+LOGGER = logging.getLogger(__name__)
+
+GENESIS_HASH = bytes(32)  # noqa: WPS432
+# ledger_chains row or transaction
+ChainRecord = Mapping[str, Any]
+
+
+class Verification(NamedTuple):
+    """Result of ledger verification run."""
+
+    verified: int
+    broken: int
+
+
+def chain_digest(previous: bytes, entry: ChainRecord) -> bytes:
+    """Compute hash of transaction linked to previous one.
+
+    Mirrors transaction_digest database function.
+
+    Args:
+        previous: hash of previous transaction of chain
+        entry: transaction
+
+    Returns:
+        transaction hash
+    """
+    created_at = entry['created_at']
+    counterparty = entry['counterparty_user_id']
+    fields = (
+        entry['id'],
+        entry['account_id'],
+        entry['stripe'],
+        entry['chain_seq'],
+        entry['deal_with'],
+        '' if counterparty is None else counterparty,
+        entry['qty_change'],
+        '' if created_at is None else created_at.strftime('%Y-%m-%dT%H:%M:%S.%f'),  # noqa: E501
+        len(entry['description']),
+        entry['description'],
+    )
+    payload = '|'.join(map(str, fields)).encode()
+    return hashlib.sha256(previous + payload).digest()
+
+
+async def verify_ledger(
+    router: ShardRouter,
+    concurrency: int,
+    batch_size: int,
+) -> Verification:
+    """Verify transactions appended to ledger since previous run.
+
+    Chains are verified concurrently from their last verified positions.
+    A broken chain is reported and skipped by next runs.
+
+    Args:
+        router: shard router
+        concurrency: number of chains verified at once
+        batch_size: number of transactions fetched at once
+
+    Returns:
+        numbers of verified transactions and of broken chains
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def verify(  # noqa: WPS430
+        admission: AdmissionController,
+        chain: ChainRecord,
+    ) -> Verification:
+        async with semaphore:
+            return await _verify_chain(admission, chain, batch_size)
+
+    chains = await _list_unverified_chains(router)
+    verifications = await asyncio.gather(*(
+        verify(admission, chain) for admission, chain in chains
+    ))
+    return Verification(
+        verified=sum(
+            verification.verified for verification in verifications
+        ),
+        broken=sum(verification.broken for verification in verifications),
+    )
+
+
+async def _list_unverified_chains(
+    router: ShardRouter,
+) -> List[Tuple[AdmissionController, ChainRecord]]:
+    chains: List[Tuple[AdmissionController, ChainRecord]] = []
+    for admission in router.admissions:
+        async with admission.connection(Lane.bulk) as db_con:
+            chains.extend(
+                (admission, chain)
+                for chain in await fetch_unverified_chains(db_con)
+            )
+    return chains
+
+
+async def _verify_chain(
+    admission: AdmissionController,
+    chain: ChainRecord,
+    batch_size: int,
+) -> Verification:
+    seq = chain['verified_seq']
+    head = chain['verified_head'] or GENESIS_HASH
+    async with admission.connection(Lane.bulk) as db_con:
+        while seq < chain['seq']:
+            entries = await fetch_chain_entries(
+                chain['account_id'],
+                chain['stripe'],
+                seq,
+                chain['seq'],
+                batch_size,
+                db_con,
+            )
+            intact_seq, head = _check_entries(seq, head, entries)
+            if not entries or intact_seq < seq + len(entries):
+                await _save_verification(
+                    chain, intact_seq, head, db_con, broken_seq=intact_seq + 1,
+                )
+                return Verification(
+                    verified=intact_seq - chain['verified_seq'],
+                    broken=1,
+                )
+            seq = intact_seq
+            await _save_verification(chain, seq, head, db_con)
+    return Verification(verified=seq - chain['verified_seq'], broken=0)
+
+
+def _check_entries(
+    seq: int,
+    head: bytes,
+    entries: List[ChainRecord],
+) -> Tuple[int, bytes]:
+    # position and hash of the last intact transaction
+    for entry in entries:
+        if entry['chain_seq'] != seq + 1:
+            break
+        if chain_digest(head, entry) != entry['chain_hash']:
+            break
+        seq, head = seq + 1, entry['chain_hash']
+    return seq, head
+
+
+async def _save_verification(
+    chain: ChainRecord,
+    seq: int,
+    head: bytes,
+    db_con: Connection,
+    broken_seq: Optional[int] = None,
+) -> None:
+    account_id, stripe = chain['account_id'], chain['stripe']
+    if broken_seq is not None:
+        # transaction is altered or removed from the chain
+        LOGGER.error(
+            'Ledger chain of account %d stripe %d is broken at position %d',  # noqa: WPS323 E501
+            account_id,
+            stripe,
+            broken_seq,
+        )
+    await save_chain_verification(
+        account_id, stripe, seq, head, db_con, broken_seq=broken_seq,
+    )
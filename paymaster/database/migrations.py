@@ -0,0 +1,60 @@
+"""Database schema migrations."""
+import pathlib
+from typing import Set
+
+from asyncpg import Connection, exceptions
+from paymaster.exceptions import MigrationError
+
+MIGRATIONS_DIR = pathlib.Path(__file__).parent / '..' / '..' / 'sql'
+
+
+def make_migration(dsn: str) -> None:
+    """Make migrations from sql directory.
+
+    Args:
+        dsn: database url
+    """
+    # yoyo is heavy to import and isn't needed on the request path
+    from yoyo import get_backend, read_migrations  # noqa: WPS433
+
+    backend = get_backend(dsn)
+    migrations = read_migrations(str(MIGRATIONS_DIR))
+    with backend.lock():
+        backend.apply_migrations(backend.to_apply(migrations))
+
+
+def get_migration_ids() -> Set[str]:
+    """Get ids of migrations from sql directory.
+
+    Returns:
+        migrations ids
+    """
+    return {
+        path.stem
+        for path in MIGRATIONS_DIR.glob('*.sql')
+        if not path.name.endswith('.rollback.sql')
+    }
+
+
+async def check_schema_version(db_con: Connection) -> None:
+    """Check that all migrations are applied to database.
+
+    Args:
+        db_con: database connection
+
+    Raises:
+        MigrationError: database schema is outdated
+    """
+    query = """ SELECT migration_id
+                FROM _yoyo_migration;"""
+    try:
+        applied = await db_con.fetch(query)
+    except exceptions.UndefinedTableError:
+        applied = []
+    missing = get_migration_ids() - {row['migration_id'] for row in applied}
+    if missing:
+        raise MigrationError(
+            'Database schema is outdated, missing migrations: {0}'.format(
+                ', '.join(sorted(missing)),
+            ),
+        )
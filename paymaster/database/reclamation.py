@@ -0,0 +1,101 @@
+"""Reclamation of deleted accounts ledgers."""
+import asyncio
+import logging
+import time
+from typing import List, NamedTuple
+
+from asyncpg import Connection
+from paymaster.database.admission import Lane
+from paymaster.database.db import (
+    archive_transactions,
+    fetch_reclaimable_accounts,
+)
+from paymaster.database.sharding import ShardRouter
+
+LOGGER = logging.getLogger(__name__)
+
+
+class Reclamation(NamedTuple):
+    """Result of reclamation run."""
+
+    accounts: int
+    transactions: int
+
+
+async def reclaim_accounts(  # noqa: WPS211
+    router: ShardRouter,
+    retention: float,
+    batch_size: int,
+    duty_cycle: float,
+    max_accounts: int,
+) -> Reclamation:
+    """Move ledgers of long deleted accounts to archive.
+
+    Every batch is moved by its own short transaction. The job pauses after
+    each batch in proportion to its duration: batches slow down under live
+    load, so the job backs off by itself.
+
+    Args:
+        router: shard router
+        retention: retention period of deleted account ledger, seconds
+        batch_size: number of transactions moved at once
+        duty_cycle: share of time spent on moving transactions
+        max_accounts: maximum number of accounts reclaimed on shard per run
+
+    Returns:
+        numbers of reclaimed accounts and archived transactions
+    """
+    pause_ratio = 1 / duty_cycle - 1
+    reclaimed = []
+    for admission in router.admissions:
+        async with admission.connection(Lane.bulk) as db_con:
+            account_ids = await fetch_reclaimable_accounts(
+                retention, max_accounts, db_con,
+            )
+            reclaimed.append(await _reclaim_shard(
+                account_ids, batch_size, pause_ratio, db_con,
+            ))
+    return Reclamation(
+        accounts=sum(shard.accounts for shard in reclaimed),
+        transactions=sum(shard.transactions for shard in reclaimed),
+    )
+
+
+async def _reclaim_shard(
+    account_ids: List[int],
+    batch_size: int,
+    pause_ratio: float,
+    db_con: Connection,
+) -> Reclamation:
+    transactions_count = 0
+    for done, account_id in enumerate(account_ids, start=1):
+        archived = await _reclaim_account(
+            account_id, batch_size, pause_ratio, db_con,
+        )
+        transactions_count += archived
+        LOGGER.info(
+            'Reclaimed account %d: %d transactions archived, %d of %d done',  # noqa: WPS323 E501
+            account_id,
+            archived,
+            done,
+            len(account_ids),
+        )
+    return Reclamation(
+        accounts=len(account_ids), transactions=transactions_count,
+    )
+
+
+async def _reclaim_account(
+    account_id: int,
+    batch_size: int,
+    pause_ratio: float,
+    db_con: Connection,
+) -> int:
+    moved = batch_size
+    archived = 0
+    while moved == batch_size:
+        started_at = time.monotonic()
+        moved = await archive_transactions(account_id, batch_size, db_con)
+        archived += moved
+        await asyncio.sleep((time.monotonic() - started_at) * pause_ratio)
+    return archived
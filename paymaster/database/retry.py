@@ -0,0 +1,124 @@
+"""Retries of transactions aborted by conflicts with concurrent ones."""
+import asyncio
+import logging
+import random
+import time
+from typing import Any, Awaitable, Callable, Counter, Dict, Iterator, TypeVar
+
+from asyncpg import exceptions
+from paymaster.exceptions import TransactionConflictError
+from paymaster.settings import (
+    TX_RETRY_BASE_DELAY,
+    TX_RETRY_BUDGET,
+    TX_RETRY_MAX_ATTEMPTS,
+    TX_RETRY_MAX_DELAY,
+)
+
+LOGGER = logging.getLogger(__name__)
+RETRYABLE_ERRORS = (
+    exceptions.SerializationError,
+    exceptions.DeadlockDetectedError,
+)
+ResultType = TypeVar('ResultType')
+
+
+class RetryStats(object):
+    """Counters of transactions retries."""
+
+    def __init__(self) -> None:
+        """Init counters."""
+        self.retries: Counter[str] = Counter()
+        self.recovered = 0
+        self.exhausted = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Get retries statistics.
+
+        Returns:
+            retries by error, transactions succeeded after retries and
+            transactions failed after all attempts
+        """
+        return {
+            'retries': dict(self.retries),
+            'recovered': self.recovered,
+            'exhausted': self.exhausted,
+        }
+
+
+retry_stats = RetryStats()
+
+
+async def run_with_retries(  # noqa: WPS211
+    transaction: Callable[[], Awaitable[ResultType]],
+    max_attempts: int = TX_RETRY_MAX_ATTEMPTS,
+    base_delay: float = TX_RETRY_BASE_DELAY,
+    max_delay: float = TX_RETRY_MAX_DELAY,
+    time_budget: float = TX_RETRY_BUDGET,
+    stats: RetryStats = retry_stats,
+) -> ResultType:
+    """Run transaction, rerun it on serialization failure or deadlock.
+
+    Whole transaction is run again, so the callable has to own its
+    transaction rather than run within an outer one. Pauses between
+    attempts grow exponentially with full jitter, so conflicting
+    transactions don't collide again.
+
+    Args:
+        transaction: callable running transaction
+        max_attempts: maximum number of attempts
+        base_delay: pause before the first retry, seconds
+        max_delay: maximum pause between attempts, seconds
+        time_budget: time of all attempts and pauses, seconds
+        stats: retries counters
+
+    Returns:
+        result of transaction
+
+    Raises:
+        TransactionConflictError: transaction failed after all attempts
+    """
+    delays = _delays(
+        time.monotonic() + time_budget, max_attempts, base_delay, max_delay,
+    )
+    attempt = 1
+    while True:  # noqa: WPS457
+        try:
+            return await _run_attempt(transaction, attempt, stats)
+        except RETRYABLE_ERRORS as exc:
+            delay = next(delays, None)
+            if delay is None:
+                stats.exhausted += 1
+                raise TransactionConflictError(
+                    f'Transaction failed after {attempt} attempts: {exc}',
+                ) from exc
+            stats.retries[type(exc).__name__] += 1
+            LOGGER.info('Transaction retried after %r', exc)  # noqa: WPS323
+            await asyncio.sleep(delay)
+            attempt += 1
+
+
+async def _run_attempt(
+    transaction: Callable[[], Awaitable[ResultType]],
+    attempt: int,
+    stats: RetryStats,
+) -> ResultType:
+    transaction_result = await transaction()
+    if attempt > 1:
+        stats.recovered += 1
+    return transaction_result
+
+
+def _delays(
+    deadline: float,
+    max_attempts: int,
+    base_delay: float,
+    max_delay: float,
+) -> Iterator[float]:
+    # full jitter: random pause up to exponentially growing limit
+    for attempt in range(1, max_attempts):
+        delay = random.uniform(  # noqa: S311
+            0, min(max_delay, base_delay * 2 ** (attempt - 1)),
+        )
+        if time.monotonic() + delay > deadline:
+            return
+        yield delay
@@ -0,0 +1,145 @@
+"""Transfers between accounts on the same or different shards."""
+import logging
+import uuid
+from functools import partial
+from typing import Any, Dict, Optional
+
+from paymaster.database.admission import Lane
+from paymaster.database.db import (
+    compensate_saga,
+    complete_saga,
+    credit_saga,
+    debit_saga,
+    fetch_pending_sagas,
+    has_account,
+    transfer_between_accs,
+)
+from paymaster.database.retry import run_with_retries
+from paymaster.database.sharding import Connector, ShardRouter
+from paymaster.exceptions import AccountError
+from paymaster.money import Money
+
+LOGGER = logging.getLogger(__name__)
+
+
+async def transfer(
+    connector: Connector,
+    sender_id: int,
+    recipient_id: int,
+    qty_value: Money,
+    description: Optional[str] = None,
+) -> None:
+    """Send funds from one account to another on any shards.
+
+    Accounts on the same shard are served by a single transaction.
+    Cross-shard transfer is a saga: the debit and the saga record are
+    committed on sender shard, the credit is applied once on recipient
+    shard and the saga is completed, or compensated by refund when
+    recipient account disappeared. Sagas interrupted by a crash are
+    finished by ``recover_sagas``. Each step is retried separately on
+    conflicts, completed steps are never run again.
+
+    Args:
+        connector: provider of shards connections
+        sender_id: sender user id
+        recipient_id: recipient user id
+        qty_value: quantity of transaction value
+        description: description of transaction aim
+
+    Raises:
+        AccountError: recipient account isn't registered
+    """
+    if connector.shard_of(sender_id) == connector.shard_of(recipient_id):
+        async with connector.connection(sender_id) as db_con:
+            await run_with_retries(partial(
+                transfer_between_accs,
+                sender_id=sender_id,
+                recipient_id=recipient_id,
+                qty_value=qty_value,
+                description=description,
+                db_con=db_con,
+            ))
+        return
+    async with connector.connection(recipient_id) as recipient_con:
+        if not await has_account(recipient_id, recipient_con):
+            raise AccountError(
+                f'Has no registered account with id: {recipient_id}',
+            )
+    saga = {
+        'id': uuid.uuid4(),
+        'sender_id': sender_id,
+        'recipient_id': recipient_id,
+        'qty_value': qty_value,
+        'description': description,
+    }
+    async with connector.connection(sender_id) as sender_con:
+        await run_with_retries(partial(
+            debit_saga,
+            saga_id=saga['id'],
+            sender_id=sender_id,
+            recipient_id=recipient_id,
+            qty_value=qty_value,
+            description=description,
+            db_con=sender_con,
+        ))
+    await finish_saga(connector, saga)
+
+
+async def recover_sagas(router: ShardRouter, older_than: float) -> int:
+    """Finish cross-shard transfers interrupted after debit.
+
+    Args:
+        router: shard router
+        older_than: minimum age of saga to recover, seconds
+
+    Returns:
+        number of recovered sagas
+    """
+    recovered = 0
+    for admission in router.admissions:
+        async with admission.connection(Lane.bulk) as db_con:
+            pending = await fetch_pending_sagas(older_than, db_con)
+        for saga in pending:
+            saga['qty_value'] = Money(saga['qty_change'])
+            try:
+                await finish_saga(router, saga)
+            except AccountError as exc:
+                LOGGER.warning(exc)
+            recovered += 1
+    return recovered
+
+
+async def finish_saga(connector: Connector, saga: Dict[str, Any]) -> None:
+    """Credit recipient of debited cross-shard transfer.
+
+    Args:
+        connector: provider of shards connections
+        saga: transfer saga
+
+    Raises:
+        AccountError: recipient account isn't registered, sender is refunded
+    """
+    try:
+        async with connector.connection(saga['recipient_id']) as credit_con:
+            await run_with_retries(partial(
+                credit_saga,
+                saga_id=saga['id'],
+                sender_id=saga['sender_id'],
+                recipient_id=saga['recipient_id'],
+                qty_value=saga['qty_value'],
+                description=saga['description'],
+                db_con=credit_con,
+            ))
+    except AccountError:
+        async with connector.connection(saga['sender_id']) as refund_con:
+            await run_with_retries(partial(
+                compensate_saga,
+                saga_id=saga['id'],
+                sender_id=saga['sender_id'],
+                recipient_id=saga['recipient_id'],
+                qty_value=saga['qty_value'],
+                db_con=refund_con,
+            ))
+        raise
+    async with connector.connection(saga['sender_id']) as db_con:
+        await complete_saga(saga['id'], db_con)
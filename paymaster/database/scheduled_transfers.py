@@ -0,0 +1,185 @@
+"""Runs of scheduled and recurring transfers."""
+import asyncio
+import logging
+import uuid
+from functools import partial
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from asyncpg import Connection
+from paymaster.database.admission import Lane
+from paymaster.database.db import (
+    claim_scheduled_transfers,
+    debit_saga,
+    finish_scheduled_run,
+    lock_scheduled_run,
+    transfer_between_accs,
+)
+from paymaster.database.retry import run_with_retries
+from paymaster.database.sagas import finish_saga
+from paymaster.database.sharding import ShardRouter
+from paymaster.exceptions import AccountError, BalanceValueError
+from paymaster.money import Money
+
+LOGGER = logging.getLogger(__name__)
+MAX_ERROR_LENGTH = 255
+TRANSFER_FIELDS = ('sender_id', 'recipient_id', 'qty_value', 'description')
+
+
+class TransfersRun(NamedTuple):
+    """Result of scheduled transfers run."""
+
+    executed: int
+    failed: int
+
+
+class _ScheduledRun(NamedTuple):
+    scheduled_id: uuid.UUID
+    runs: int
+    transfer: Dict[str, Any]
+    # set for transfer between shards
+    saga_id: Optional[uuid.UUID]
+
+
+async def run_scheduled_transfers(
+    router: ShardRouter,
+    batch_size: int,
+    concurrency: int,
+    lease: float,
+) -> TransfersRun:
+    """Execute due scheduled transfers.
+
+    Every worker claims at most a batch of due transfers on each shard
+    per run, so backlog of transfers due at the same time is drained at
+    steady pace instead of all at once. Each transfer run is a transaction
+    on sender shard which debits sender and counts the run only if it
+    isn't counted yet, so a run is executed once even when claim expires
+    and another worker takes the transfer.
+
+    Args:
+        router: shard router
+        batch_size: maximum number of transfers claimed on shard per run
+        concurrency: maximum number of transfers executed at once on shard
+        lease: time of claim, seconds
+
+    Returns:
+        numbers of executed and failed transfers
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    outcomes: List[Optional[bool]] = []
+    for admission in router.admissions:
+        async with admission.connection(Lane.bulk) as db_con:
+            claimed = await claim_scheduled_transfers(batch_size, lease, db_con)
+        outcomes.extend(await asyncio.gather(*[
+            _run_transfer(router, _prepare_run(router, scheduled), semaphore)
+            for scheduled in claimed
+        ]))
+    return TransfersRun(outcomes.count(True), outcomes.count(False))
+
+
+def _prepare_run(
+    router: ShardRouter,
+    scheduled: Dict[str, Any],
+) -> _ScheduledRun:
+    transfer = {field: scheduled[field] for field in TRANSFER_FIELDS}
+    transfer['qty_value'] = Money(transfer['qty_value'])
+    sender_shard = router.shard_of(transfer['sender_id'])
+    saga_id = None
+    if sender_shard != router.shard_of(transfer['recipient_id']):
+        # the same for every attempt of the run
+        saga_id = uuid.uuid5(scheduled['id'], str(scheduled['runs']))
+    return _ScheduledRun(scheduled['id'], scheduled['runs'], transfer, saga_id)
+
+
+async def drain_scheduled_transfers(  # noqa: WPS211
+    router: ShardRouter,
+    poll_interval: float,
+    batch_size: int,
+    concurrency: int,
+    lease: float,
+) -> None:
+    """Execute due transfers without pauses, poll when none are due.
+
+    Runs follow one another while transfers are due, failed run is logged
+    and retried after poll interval.
+
+    Args:
+        router: shard router
+        poll_interval: pause when no transfers are due, seconds
+        batch_size: maximum number of transfers claimed on shard per run
+        concurrency: maximum number of transfers executed at once on shard
+        lease: time of claim, seconds
+    """
+    while True:  # noqa: WPS457
+        try:
+            transfers_run = await run_scheduled_transfers(
+                router, batch_size, concurrency, lease,
+            )
+        except Exception:
+            LOGGER.exception('Scheduled transfers run failed')
+            transfers_run = TransfersRun(executed=0, failed=0)
+        if transfers_run.executed or transfers_run.failed:
+            LOGGER.info(
+                'Executed %d scheduled transfers, %d failed',  # noqa: WPS323
+                transfers_run.executed,
+                transfers_run.failed,
+            )
+        else:
+            await asyncio.sleep(poll_interval)
+
+
+async def _run_transfer(
+    router: ShardRouter,
+    scheduled_run: _ScheduledRun,
+    semaphore: asyncio.Semaphore,
+) -> Optional[bool]:
+    admission = router.admission_for(scheduled_run.transfer['sender_id'])
+    async with semaphore:
+        async with admission.connection(Lane.bulk) as db_con:
+            succeeded = await run_with_retries(
+                partial(_execute_run, scheduled_run, db_con),
+            )
+        if succeeded and scheduled_run.saga_id is not None:
+            saga = {'id': scheduled_run.saga_id, **scheduled_run.transfer}
+            try:
+                await finish_saga(router, saga)
+            except AccountError as exc:
+                LOGGER.warning(exc)
+    return succeeded
+
+
+async def _execute_run(
+    scheduled_run: _ScheduledRun,
+    db_con: Connection,
+) -> Optional[bool]:
+    scheduled_id = scheduled_run.scheduled_id
+    async with db_con.transaction():
+        is_locked = await lock_scheduled_run(
+            scheduled_id, scheduled_run.runs, db_con,
+        )
+        if not is_locked:
+            return None
+        error = await _debit(scheduled_run, db_con)
+        await finish_scheduled_run(scheduled_id, error, db_con)
+    return error is None
+
+
+async def _debit(
+    scheduled_run: _ScheduledRun,
+    db_con: Connection,
+) -> Optional[str]:
+    # nested transactions are savepoints, failed debit keeps run counted
+    try:
+        if scheduled_run.saga_id is None:
+            await transfer_between_accs(
+                **scheduled_run.transfer, db_con=db_con,
+            )
+        else:
+            await debit_saga(
+                saga_id=scheduled_run.saga_id,
+                **scheduled_run.transfer,
+                db_con=db_con,
+            )
+    except (AccountError, BalanceValueError) as exc:
+        LOGGER.warning(exc)
+        return str(exc)[:MAX_ERROR_LENGTH]
+    return None
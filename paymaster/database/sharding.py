@@ -0,0 +1,184 @@
+"""Accounts sharding across several databases."""
+import os
+from typing import (
+    Any,
+    AsyncContextManager,
+    Dict,
+    List,
+    Optional,
+    Protocol,
+    Sequence,
+)
+
+from asyncpg import Connection, create_pool
+from paymaster.database.admission import AdmissionController, Lane
+from paymaster.database.connection import LoggingConnection, PoolerConnection
+from paymaster.settings import (
+    POOL_ACQUIRE_TIMEOUT,
+    POOL_MAX_QUEUE,
+    POOL_MAX_SIZE,
+    POOL_MIN_SIZE,
+    POOL_WRITE_RESERVE,
+    POOLER_MODE,
+    RETRY_AFTER,
+)
+
+TRANSACTION_POOLER_MODE = 'transaction'
+# naive timestamps of app and of LOCALTIMESTAMP are UTC whatever time zone
+# of database server is
+SESSION_TIMEZONE = 'UTC'
+
+
+class Connector(Protocol):
+    """Provider of connections to shard of user account."""
+
+    def shard_of(self, user_id: int) -> int:
+        """Get shard number of user account.
+
+        Args:
+            user_id: user id
+        """
+
+    def connection(self, user_id: int) -> AsyncContextManager[Connection]:
+        """Hold connection to shard of user account within context.
+
+        Args:
+            user_id: user id
+        """
+
+
+def get_shard_dsns() -> List[str]:
+    """Get urls of shards databases.
+
+    Returns:
+        comma separated SHARD_DSNS or single DSN
+    """
+    return _split_dsns(os.getenv('SHARD_DSNS'), os.getenv('DSN', ''))
+
+
+def get_direct_dsns() -> List[str]:
+    """Get urls of shards databases bypassing connections pooler.
+
+    LISTEN and migrations need session of their own, which isn't kept by
+    pooler in transaction mode.
+
+    Returns:
+        comma separated DIRECT_SHARD_DSNS or single DIRECT_DSN, shards
+        databases urls when direct ones aren't set
+    """
+    direct_dsns = _split_dsns(
+        os.getenv('DIRECT_SHARD_DSNS'), os.getenv('DIRECT_DSN', ''),
+    )
+    if any(direct_dsns):
+        return direct_dsns
+    return get_shard_dsns()
+
+
+def _split_dsns(dsns: Optional[str], dsn: str) -> List[str]:
+    if dsns:
+        return [url.strip() for url in dsns.split(',') if url.strip()]
+    return [dsn]
+
+
+class ShardRouter(object):
+    """Router of user accounts to shards with own connections pool each."""
+
+    def __init__(self, admissions: Sequence[AdmissionController]) -> None:
+        """Init router.
+
+        Args:
+            admissions: admission controllers of shards pools
+        """
+        self.admissions = tuple(admissions)
+
+    @property
+    def shards_count(self) -> int:
+        """Get number of shards.
+
+        Returns:
+            shards count
+        """
+        return len(self.admissions)
+
+    def shard_of(self, user_id: int) -> int:
+        """Get shard number of user account.
+
+        Args:
+            user_id: user id
+
+        Returns:
+            shard number
+        """
+        return user_id % self.shards_count
+
+    def admission_for(self, user_id: int) -> AdmissionController:
+        """Get admission controller of user account shard.
+
+        Args:
+            user_id: user id
+
+        Returns:
+            admission controller
+        """
+        return self.admissions[self.shard_of(user_id)]
+
+    def connection(self, user_id: int) -> AsyncContextManager[Connection]:
+        """Hold connection to shard of user account within context.
+
+        Args:
+            user_id: user id
+
+        Returns:
+            connection context manager
+        """
+        return self.admission_for(user_id).connection(Lane.write)
+
+    async def close(self) -> None:
+        """Close connections pools of all shards."""
+        for admission in self.admissions:
+            await admission.pool.close()
+
+
+async def create_shard_router(
+    dsns: Sequence[str],
+    pooler_mode: str = POOLER_MODE,
+) -> ShardRouter:
+    """Create connections pools of shards.
+
+    Behind pooler in transaction mode statements aren't cached, so asyncpg
+    uses unnamed ones, and connections keep no session state.
+
+    Args:
+        dsns: urls of shards databases
+        pooler_mode: pooling mode of connections pooler in front of shards
+
+    Returns:
+        shard router
+    """
+    connection_options: Dict[str, Any] = {
+        'connection_class': LoggingConnection,
+        'server_settings': {'timezone': SESSION_TIMEZONE},
+    }
+    if pooler_mode == TRANSACTION_POOLER_MODE:
+        connection_options = {
+            'connection_class': PoolerConnection,
+            'statement_cache_size': 0,
+            'server_settings': {'timezone': SESSION_TIMEZONE},
+        }
+    admissions: List[AdmissionController] = []
+    for dsn in dsns:
+        pool = await create_pool(
+            dsn,
+            min_size=min(POOL_MIN_SIZE, POOL_MAX_SIZE),
+            max_size=POOL_MAX_SIZE,
+            **connection_options,
+        )
+        admissions.append(AdmissionController(
+            pool=pool,
+            pool_size=POOL_MAX_SIZE,
+            acquire_timeout=POOL_ACQUIRE_TIMEOUT,
+            max_queue=POOL_MAX_QUEUE,
+            write_reserve=POOL_WRITE_RESERVE,
+            retry_after=RETRY_AFTER,
+        ))
+    return ShardRouter(admissions)
@@ -23,3 +23,39 @@ class BalanceValueError(PaymasterException):
     """Exception of negative account balance."""
 
     pass
+
+
+class PoolOverloadError(PaymasterException):
+    """Exception of database connections pool saturation."""
+
+    pass
+
+
+class MigrationError(PaymasterException):
+    """Exception of outdated database schema."""
+
+    pass
+
+
+class ImportNotFoundError(PaymasterException):
+    """Exception of no ledger import in database."""
+
+    pass
+
+
+class HoldError(PaymasterException):
+    """Exception of no active hold in database."""
+
+    pass
+
+
+class ScheduledTransferError(PaymasterException):
+    """Exception of no scheduled transfer in database."""
+
+    pass
+
+
+class TransactionConflictError(PaymasterException):
+    """Exception of transaction aborted by concurrent ones on every attempt."""
+
+    pass
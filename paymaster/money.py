@@ -0,0 +1,197 @@
+"""Fixed-point money in minor units."""
+import functools
+from decimal import Decimal, InvalidOperation
+from typing import Any, Callable, Dict, Iterator, Union
+
+MINOR_UNITS = 100
+
+MoneyInput = Union['Money', Decimal, int, float, str]
+
+
+@functools.total_ordering
+class Money(object):  # noqa: WPS214
+    """Amount of money as integer number of minor units (cents).
+
+    Amounts are kept as int from request validation to database and back,
+    Decimal is used only for conversion between currencies and rendering.
+    """
+
+    __slots__ = ('minor',)
+
+    def __init__(self, minor: int) -> None:
+        """Init amount.
+
+        Args:
+            minor: number of minor units
+        """
+        self.minor = minor
+
+    @classmethod
+    def from_major(cls, amount: Union[Decimal, int, float, str]) -> 'Money':
+        """Make amount from value in major units.
+
+        Args:
+            amount: value in major units with no more than two decimal places
+
+        Returns:
+            amount of money
+
+        Raises:
+            ValueError: value isn't a number or has fractions of minor unit
+        """
+        if type(amount) is int:  # noqa: WPS516
+            return cls(amount * MINOR_UNITS)
+        try:
+            scaled = Decimal(str(amount)).scaleb(2)
+        except InvalidOperation as exc:
+            raise ValueError(f'Invalid money amount: {amount}') from exc
+        if not scaled.is_finite():
+            raise ValueError(f'Invalid money amount: {amount}')
+        minor = int(scaled)
+        if minor != scaled:
+            raise ValueError('Money amount has more than 2 decimal places')
+        return cls(minor)
+
+    @property
+    def major(self) -> Decimal:
+        """Get value in major units.
+
+        Returns:
+            value with two decimal places
+        """
+        return Decimal(self.minor).scaleb(-2)
+
+    def convert(self, rate: Decimal) -> 'Money':
+        """Convert amount to another currency.
+
+        Args:
+            rate: exchange rate
+
+        Returns:
+            amount rounded half to even to minor units
+        """
+        return Money(round(self.minor * rate))
+
+    @classmethod
+    def __get_validators__(cls) -> Iterator[Callable[[Any], 'Money']]:
+        """Get pydantic validators.
+
+        Yields:
+            validator
+        """
+        yield cls.validate
+
+    @classmethod
+    def validate(cls, amount: MoneyInput) -> 'Money':
+        """Validate value in major units.
+
+        Args:
+            amount: money or value in major units
+
+        Returns:
+            amount of money
+        """
+        if isinstance(amount, Money):
+            return cls(amount.minor)
+        return cls.from_major(amount)
+
+    @classmethod
+    def __modify_schema__(cls, field_schema: Dict[str, Any]) -> None:
+        """Describe amount in OpenAPI schema.
+
+        Args:
+            field_schema: schema of field
+        """
+        field_schema.update(type='number', multipleOf=0.01)  # noqa: WPS432
+
+    def __add__(self, other: 'Money') -> 'Money':
+        """Add amounts.
+
+        Args:
+            other: amount to add
+
+        Returns:
+            sum of amounts
+        """
+        return Money(self.minor + other.minor)
+
+    def __sub__(self, other: 'Money') -> 'Money':
+        """Subtract amounts.
+
+        Args:
+            other: amount to subtract
+
+        Returns:
+            difference of amounts
+        """
+        return Money(self.minor - other.minor)
+
+    def __neg__(self) -> 'Money':
+        """Negate amount.
+
+        Returns:
+            amount with opposite sign
+        """
+        return Money(-self.minor)
+
+    def __eq__(self, other: object) -> bool:
+        """Compare amounts for equality.
+
+        Args:
+            other: compared value
+
+        Returns:
+            whether amounts are equal
+        """
+        if isinstance(other, Money):
+            return self.minor == other.minor
+        return NotImplemented
+
+    def __lt__(self, other: object) -> bool:
+        """Compare amounts.
+
+        Args:
+            other: compared value
+
+        Returns:
+            whether amount is less than other
+        """
+        if isinstance(other, Money):
+            return self.minor < other.minor
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        """Hash amount.
+
+        Returns:
+            hash of minor units
+        """
+        return hash(self.minor)
+
+    def __bool__(self) -> bool:
+        """Check amount is not zero.
+
+        Returns:
+            whether amount is not zero
+        """
+        return bool(self.minor)
+
+    def __repr__(self) -> str:
+        """Show amount.
+
+        Returns:
+            amount in major units
+        """
+        return f'Money({self.major})'
+
+
+def render_money(amount: Money) -> Decimal:
+    """Render amount for JSON response.
+
+    Args:
+        amount: amount of money
+
+    Returns:
+        exact value in major units
+    """
+    return amount.major
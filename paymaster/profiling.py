@@ -0,0 +1,77 @@
+"""Sampling profiler of event loop thread."""
+import sys
+import threading
+import time
+from types import FrameType
+from typing import Counter, Optional
+
+
+class SamplingProfiler(object):
+    """Profiler sampling stack of event loop thread from background thread."""
+
+    def __init__(self, thread_id: int, interval: float) -> None:
+        """Init profiler.
+
+        Args:
+            thread_id: id of sampled thread
+            interval: sampling interval, seconds
+        """
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples: Counter[str] = Counter()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def start(self) -> None:
+        """Start sampling."""
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop sampling."""
+        self._stopped.set()
+        self._thread.join()
+
+    def dump(self, path: str) -> None:
+        """Write samples in collapsed stacks format of flame graphs.
+
+        Args:
+            path: profile file path
+        """
+        with open(path, 'w') as profile:
+            for stack, count in self.samples.most_common():
+                profile.write(f'{stack} {count}\n')
+
+    def _sample(self) -> None:
+        while not self._stopped.wait(self.interval):
+            frames = sys._current_frames()  # noqa: WPS437
+            stack = _collapse_stack(frames.get(self.thread_id))
+            if stack:
+                self.samples[stack] += 1
+
+
+def profile_file_name(method: str, path: str, duration: float) -> str:
+    """Make name of profile file of request.
+
+    Args:
+        method: request method
+        path: request path
+        duration: request duration, ms
+
+    Returns:
+        file name with request and its duration
+    """
+    name = '-'.join(part for part in path.split('/') if part)
+    return '{0:.3f}-{1}-{2}-{3:.0f}ms.folded'.format(
+        time.time(), method, name, duration,
+    )
+
+
+def _collapse_stack(frame: Optional[FrameType]) -> str:
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append('{0} ({1}:{2})'.format(
+            code.co_name, code.co_filename, frame.f_lineno,
+        ))
+        frame = frame.f_back
+    return ';'.join(reversed(stack))
@@ -1,17 +1,43 @@
 """Background tasks module."""
 import asyncio
-import functools
 import logging
 import os
-import time
-from typing import Any, Callable, Optional
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Optional
 
-import schedule
-from asyncpg import Connection, connect
+from asyncpg import Connection
 from dotenv import load_dotenv
 from paymaster.currencies import get_currencies_rates
+from paymaster.database.currency_rates import update_rates
 from paymaster.database.db import update_currencies
-from paymaster.exceptions import CurrencyError
+from paymaster.database.holds import expire_holds
+from paymaster.database.ledger_chain import verify_ledger
+from paymaster.database.reclamation import reclaim_accounts
+from paymaster.database.sagas import recover_sagas
+from paymaster.database.scheduled_transfers import drain_scheduled_transfers
+from paymaster.database.sharding import (
+    ShardRouter,
+    create_shard_router,
+    get_shard_dsns,
+)
+from paymaster.settings import (
+    HOLD_SWEEP_BATCH_SIZE,
+    HOLD_SWEEP_INTERVAL,
+    LEDGER_VERIFY_BATCH_SIZE,
+    LEDGER_VERIFY_CONCURRENCY,
+    LEDGER_VERIFY_INTERVAL,
+    RECLAIM_BATCH_SIZE,
+    RECLAIM_DUTY_CYCLE,
+    RECLAIM_INTERVAL,
+    RECLAIM_MAX_ACCOUNTS,
+    RECLAIM_RETENTION,
+    SAGA_RECOVERY_DELAY,
+    SAGA_RECOVERY_INTERVAL,
+    SCHEDULED_TRANSFERS_BATCH_SIZE,
+    SCHEDULED_TRANSFERS_CONCURRENCY,
+    SCHEDULED_TRANSFERS_INTERVAL,
+    SCHEDULED_TRANSFERS_LEASE,
+)
 
 LOGGER = logging.getLogger('schedule')
 LOGGER.setLevel(level=logging.DEBUG)
@@ -19,57 +45,166 @@ LOGGER.setLevel(level=logging.DEBUG)
 load_dotenv()
 
 API_KEY: Optional[str] = os.getenv('API_KEY')
-DSN: Optional[str] = os.getenv('DSN')
+Job = Callable[..., Awaitable[None]]
+TRIGGER_TIME_FORMAT = '%H:%M'
 
 
-def catch_exceptions(  # noqa: WPS234
-    cancel_on_failure: bool = False,
-) -> Callable[[Callable[[], Any]], Any]:  # noqa: WPS221 E501
-    """Make decorator for cathing exceptions in background scheduler.
+async def run_job(job: Job, *args: Any) -> None:
+    """Run background job, log its failure.
+
+    Failure of a run stops neither the job nor the other ones.
+
+    Args:
+        job: coroutine function of job
+        args: job arguments
+    """
+    try:
+        await job(*args)
+    except Exception:
+        LOGGER.exception(
+            'Background job %s failed', job.__name__,  # noqa: WPS323
+        )
+
+
+async def run_periodically(
+    job: Job,
+    router: ShardRouter,
+    interval: float,
+) -> None:
+    """Run background job with pauses between runs.
 
     Args:
-        cancel_on_failure: flag of finishing on failure scheduler work
+        job: coroutine function of job taking shard router
+        router: shard router shared by jobs
+        interval: pause after each run, seconds
+    """
+    while True:  # noqa: WPS457
+        await asyncio.sleep(interval)
+        await run_job(job, router)
+
+
+async def run_daily(
+    job: Job,
+    router: ShardRouter,
+    trigger_time: str,
+) -> None:
+    """Run background job every day at trigger time.
+
+    Args:
+        job: coroutine function of job taking shard router
+        router: shard router shared by jobs
+        trigger_time: local time of the day, HH:MM
+    """
+    while True:  # noqa: WPS457
+        await asyncio.sleep(seconds_until(trigger_time, datetime.now()))
+        await run_job(job, router)
+
+
+def seconds_until(trigger_time: str, now: datetime) -> float:
+    """Get time left until the next trigger time.
+
+    Args:
+        trigger_time: time of the day, HH:MM
+        now: current time
 
     Returns:
-        catch exceptions decorator
+        seconds until the nearest trigger time after now
     """
-    def catch_exceptions_decorator(  # noqa: WPS430
-        job_func: Callable[[], Any],  # noqa: WPS221 E501
-    ):
-        @functools.wraps(job_func)
-        def wrapper():
-            try:
-                return job_func()
-            except (CurrencyError, RuntimeError) as exc:
-                LOGGER.warning(exc)
-                if cancel_on_failure:
-                    return schedule.CancelJob
-        return wrapper
-    return catch_exceptions_decorator
-
-
-async def update_currency_rates_job(db_conn: Connection) -> None:  # noqa: D103 E501
+    triggered_at = datetime.strptime(trigger_time, TRIGGER_TIME_FORMAT)
+    next_run = now.replace(
+        hour=triggered_at.hour,
+        minute=triggered_at.minute,
+        second=0,
+        microsecond=0,
+    )
+    if next_run <= now:
+        next_run += timedelta(days=1)
+    return (next_run - now).total_seconds()
+
+
+async def update_currency_rates_job(db_conn: Connection) -> None:
     cur_rates = await get_currencies_rates(API_KEY)
     await update_currencies(cur_rates, db_conn)
 
 
-async def _run_background_job() -> None:
-    db_conn = await connect(DSN)
-    await update_currency_rates_job(db_conn)
+async def recover_sagas_job(router: ShardRouter) -> None:
+    recovered = await recover_sagas(router, SAGA_RECOVERY_DELAY)
+    if recovered:
+        LOGGER.info(
+            'Recovered %d cross-shard transfers', recovered,  # noqa: WPS323
+        )
 
 
-@catch_exceptions(cancel_on_failure=True)
-def _set_task() -> None:
-    trigger_time = os.getenv('TRIGGER_TIME')
-    schedule.every().day.at(trigger_time).do(
-        asyncio.run,
-        _run_background_job(),
+async def verify_ledger_job(router: ShardRouter) -> None:
+    verification = await verify_ledger(
+        router, LEDGER_VERIFY_CONCURRENCY, LEDGER_VERIFY_BATCH_SIZE,
     )
-    while True:  # noqa: WPS457
-        schedule.run_pending()
-        time.sleep(1)
+    LOGGER.info(
+        'Verified %d ledger transactions, %d broken chains found',  # noqa: WPS323 E501
+        verification.verified,
+        verification.broken,
+    )
+
+
+async def expire_holds_job(router: ShardRouter) -> None:
+    expired = await expire_holds(router, HOLD_SWEEP_BATCH_SIZE)
+    if expired:
+        LOGGER.info('Expired %d holds', expired)  # noqa: WPS323
+
+
+async def reclaim_accounts_job(router: ShardRouter) -> None:
+    reclamation = await reclaim_accounts(
+        router,
+        retention=RECLAIM_RETENTION,
+        batch_size=RECLAIM_BATCH_SIZE,
+        duty_cycle=RECLAIM_DUTY_CYCLE,
+        max_accounts=RECLAIM_MAX_ACCOUNTS,
+    )
+    if reclamation.accounts:
+        LOGGER.info(
+            'Reclaimed %d deleted accounts, %d transactions archived',  # noqa: WPS323 E501
+            reclamation.accounts,
+            reclamation.transactions,
+        )
+
+
+async def update_shards_currencies_job(router: ShardRouter) -> None:
+    cur_rates = await get_currencies_rates(API_KEY)
+    await update_rates(router, cur_rates)
+
+
+async def run_background_jobs() -> None:
+    """Run background jobs as independent tasks of one event loop.
+
+    Jobs share one shard router for the whole process life, a slow or
+    failed run of one job doesn't delay or stop the other ones.
+    """
+    router = await create_shard_router(get_shard_dsns())
+    jobs = [
+        run_periodically(recover_sagas_job, router, SAGA_RECOVERY_INTERVAL),
+        run_periodically(verify_ledger_job, router, LEDGER_VERIFY_INTERVAL),
+        run_periodically(expire_holds_job, router, HOLD_SWEEP_INTERVAL),
+        run_periodically(reclaim_accounts_job, router, RECLAIM_INTERVAL),
+        # due transfers aren't delayed by runs of the other jobs
+        drain_scheduled_transfers(
+            router,
+            poll_interval=SCHEDULED_TRANSFERS_INTERVAL,
+            batch_size=SCHEDULED_TRANSFERS_BATCH_SIZE,
+            concurrency=SCHEDULED_TRANSFERS_CONCURRENCY,
+            lease=SCHEDULED_TRANSFERS_LEASE,
+        ),
+    ]
+    trigger_time = os.getenv('TRIGGER_TIME')
+    if trigger_time:
+        jobs.append(
+            run_daily(update_shards_currencies_job, router, trigger_time),
+        )
+    try:  # noqa: WPS501 WPS229
+        await run_job(update_shards_currencies_job, router)
+        await asyncio.gather(*jobs)
+    finally:
+        await router.close()
 
 
 if __name__ == '__main__':
-    asyncio.run(_run_background_job())
-    _set_task()
+    asyncio.run(run_background_jobs())
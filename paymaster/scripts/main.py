@@ -6,6 +6,15 @@ from paymaster.app.events import (
     create_start_app_handler,
     create_stop_app_handler,
 )
+from paymaster.settings import (
+    PROFILE_DIR,
+    PROFILE_INTERVAL,
+    PROFILE_SAMPLE_RATE,
+    PROFILE_SLOW_THRESHOLD,
+    TRACE_DIR,
+    TRACE_SAMPLE_RATE,
+)
+from paymaster.tracing import TracingMiddleware
 
 load_dotenv()
 
@@ -26,6 +35,17 @@ def get_application() -> FastAPI:
         create_stop_app_handler(application),
     )
     application.include_router(router)
+    # middleware isn't installed at all unless tracing or profiling is on
+    if TRACE_DIR or PROFILE_DIR:
+        application.add_middleware(
+            TracingMiddleware,
+            trace_dir=TRACE_DIR,
+            trace_sample_rate=TRACE_SAMPLE_RATE,
+            profile_dir=PROFILE_DIR,
+            profile_sample_rate=PROFILE_SAMPLE_RATE,
+            profile_threshold=PROFILE_SLOW_THRESHOLD,
+            profile_interval=PROFILE_INTERVAL,
+        )
     return application
 
 
@@ -0,0 +1,13 @@
+"""Database migrations applying script."""
+from dotenv import load_dotenv
+from paymaster.database.migrations import make_migration
+from paymaster.database.sharding import get_direct_dsns
+
+load_dotenv()
+
+if __name__ == '__main__':
+    dsns = [dsn for dsn in get_direct_dsns() if dsn]
+    if not dsns:
+        raise SystemExit('DSN environment variable is not set')
+    for dsn in dsns:
+        make_migration(dsn)
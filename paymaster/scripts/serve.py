@@ -0,0 +1,67 @@
+"""Production server launcher."""
+import logging
+from importlib.util import find_spec
+
+import uvicorn
+from paymaster import settings
+
+LOGGER = logging.getLogger(__name__)
+APP = 'paymaster.scripts.main:app'
+
+
+def _is_installed(module: str) -> bool:
+    return find_spec(module) is not None
+
+
+def _check_budget() -> int:
+    pool_size = settings.POOL_MAX_SIZE
+    if pool_size <= settings.POOL_WRITE_RESERVE:
+        reserve = settings.POOL_WRITE_RESERVE
+        raise SystemExit(
+            f'Pool size {pool_size} must exceed write reserve {reserve}',
+        )
+    needed = pool_size * settings.POOL_PROCESSES + settings.EXTRA_CONNECTIONS
+    budget = settings.DB_CONNECTIONS_BUDGET
+    if budget and budget < needed:
+        raise SystemExit(
+            f'Connections budget {budget} is less than {needed} needed',
+        )
+    return pool_size + settings.WORKER_LISTENERS
+
+
+def serve() -> None:
+    """Run app workers.
+
+    uvloop and httptools are used when installed. Pools of app workers,
+    background process and transfer workers are sized by connections
+    budget, so that together they never open more connections to a shard
+    than the budget. Launcher exits when the budget is less than they need
+    or pools are too small for write reserve.
+    """
+    connections_per_worker = _check_budget()
+    loop = 'uvloop' if _is_installed('uvloop') else 'asyncio'
+    http = 'httptools' if _is_installed('httptools') else 'h11'
+    LOGGER.info(
+        'Starting %d workers with %s loop and %s parser, %d connections to each shard per worker',  # noqa: WPS323 E501
+        settings.WEB_WORKERS,
+        loop,
+        http,
+        connections_per_worker,
+    )
+    uvicorn.run(
+        APP,
+        host=settings.HOST,
+        port=settings.PORT,
+        workers=settings.WEB_WORKERS,
+        loop=loop,
+        http=http,
+        backlog=settings.BACKLOG,
+        timeout_keep_alive=settings.KEEP_ALIVE_TIMEOUT,
+        access_log=settings.ACCESS_LOG,
+    )
+
+
+if __name__ == '__main__':
+    LOGGER.addHandler(logging.StreamHandler())
+    LOGGER.setLevel(level=logging.INFO)
+    serve()
@@ -0,0 +1,40 @@
+"""Worker executing queued and due scheduled transfers without pauses."""
+import asyncio
+import logging
+
+from dotenv import load_dotenv
+from paymaster.database.scheduled_transfers import drain_scheduled_transfers
+from paymaster.database.sharding import create_shard_router, get_shard_dsns
+from paymaster.settings import (
+    SCHEDULED_TRANSFERS_BATCH_SIZE,
+    SCHEDULED_TRANSFERS_CONCURRENCY,
+    SCHEDULED_TRANSFERS_LEASE,
+    TRANSFER_WORKER_POLL_INTERVAL,
+)
+
+LOGGER = logging.getLogger(__name__)
+
+load_dotenv()
+
+
+async def drain_transfers() -> None:
+    """Execute due transfers, poll queue when it's drained.
+
+    Workers claim transfers with ``SKIP LOCKED``, so any number of them
+    can run along with background scheduled transfers job.
+    """
+    router = await create_shard_router(get_shard_dsns())
+    try:  # noqa: WPS501
+        await drain_scheduled_transfers(
+            router,
+            poll_interval=TRANSFER_WORKER_POLL_INTERVAL,
+            batch_size=SCHEDULED_TRANSFERS_BATCH_SIZE,
+            concurrency=SCHEDULED_TRANSFERS_CONCURRENCY,
+            lease=SCHEDULED_TRANSFERS_LEASE,
+        )
+    finally:
+        await router.close()
+
+
+if __name__ == '__main__':
+    asyncio.run(drain_transfers())
@@ -0,0 +1,108 @@
+"""Application settings from environment."""
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+ONE_MINUTE = '60'
+DEFAULT_BATCH_SIZE = '1000'
+DISABLED = '0'
+
+HOST = os.getenv('HOST', '0.0.0.0')  # noqa: S104
+PORT = int(os.getenv('PORT', '5000'))
+WEB_WORKERS = int(os.getenv('WEB_WORKERS') or os.cpu_count() or 1)
+KEEP_ALIVE_TIMEOUT = int(os.getenv('KEEP_ALIVE_TIMEOUT', '5'))
+BACKLOG = int(os.getenv('BACKLOG', '2048'))
+ACCESS_LOG = os.getenv('ACCESS_LOG', '') == 'true'
+# connections of all app processes to each shard, 0 to size pools by
+# POOL_MAX_SIZE
+DB_CONNECTIONS_BUDGET = int(os.getenv('DB_CONNECTIONS_BUDGET', DISABLED))
+
+BALANCE_CACHE_SIZE = int(os.getenv('BALANCE_CACHE_SIZE', DISABLED))
+BALANCE_CACHE_MAX_AGE = float(os.getenv('BALANCE_CACHE_MAX_AGE', ONE_MINUTE))
+
+POOL_MIN_SIZE = int(os.getenv('POOL_MIN_SIZE', '1'))
+POOL_MAX_SIZE = int(os.getenv('POOL_MAX_SIZE', '10'))
+# every worker also keeps a listening connection when balance cache is on
+WORKER_LISTENERS = int(BALANCE_CACHE_SIZE > 0)
+# transfer worker processes run along with app, counted in the budget
+TRANSFER_WORKERS = int(os.getenv('TRANSFER_WORKERS', '1'))
+# app workers, background process and transfer workers have equal pools
+POOL_PROCESSES = WEB_WORKERS + 1 + TRANSFER_WORKERS
+# listening connections of app workers
+EXTRA_CONNECTIONS = WEB_WORKERS * WORKER_LISTENERS
+if DB_CONNECTIONS_BUDGET:
+    POOL_MAX_SIZE = max(
+        (DB_CONNECTIONS_BUDGET - EXTRA_CONNECTIONS) // POOL_PROCESSES, 1,
+    )
+POOL_ACQUIRE_TIMEOUT = float(os.getenv('POOL_ACQUIRE_TIMEOUT', '5'))
+POOL_MAX_QUEUE = int(os.getenv('POOL_MAX_QUEUE', '100'))
+POOL_WRITE_RESERVE = int(os.getenv('POOL_WRITE_RESERVE', '2'))
+RETRY_AFTER = int(os.getenv('RETRY_AFTER', '1'))
+# 'transaction' for pools behind PgBouncer in transaction pooling mode
+POOLER_MODE = os.getenv('POOLER_MODE', 'session')
+
+WRITE_STATEMENT_TIMEOUT = int(os.getenv('WRITE_STATEMENT_TIMEOUT', '2000'))
+BALANCE_STATEMENT_TIMEOUT = int(os.getenv('BALANCE_STATEMENT_TIMEOUT', '1000'))
+HISTORY_STATEMENT_TIMEOUT = int(os.getenv('HISTORY_STATEMENT_TIMEOUT', '3000'))
+SLOW_QUERY_THRESHOLD = float(os.getenv('SLOW_QUERY_THRESHOLD', '500'))
+
+TX_RETRY_MAX_ATTEMPTS = int(os.getenv('TX_RETRY_MAX_ATTEMPTS', '5'))
+TX_RETRY_BASE_DELAY = float(os.getenv('TX_RETRY_BASE_DELAY', '0.01'))
+TX_RETRY_MAX_DELAY = float(os.getenv('TX_RETRY_MAX_DELAY', '0.2'))
+TX_RETRY_BUDGET = float(os.getenv('TX_RETRY_BUDGET', '1'))
+
+MIGRATE_ON_STARTUP = os.getenv('MIGRATE_ON_STARTUP', '') == 'true'
+
+SAGA_RECOVERY_INTERVAL = int(os.getenv('SAGA_RECOVERY_INTERVAL', ONE_MINUTE))
+SAGA_RECOVERY_DELAY = float(os.getenv('SAGA_RECOVERY_DELAY', '30'))
+
+IMPORT_CHUNK_SIZE = int(os.getenv('IMPORT_CHUNK_SIZE', '5000'))
+IMPORT_MAX_ERRORS = int(os.getenv('IMPORT_MAX_ERRORS', '100'))
+IMPORT_MAX_LINE_LENGTH = int(os.getenv('IMPORT_MAX_LINE_LENGTH', '65536'))
+IMPORT_STATEMENT_TIMEOUT = int(os.getenv('IMPORT_STATEMENT_TIMEOUT', '60000'))
+
+LEDGER_VERIFY_INTERVAL = int(os.getenv('LEDGER_VERIFY_INTERVAL', '300'))
+LEDGER_VERIFY_CONCURRENCY = int(os.getenv('LEDGER_VERIFY_CONCURRENCY', '4'))
+LEDGER_VERIFY_BATCH_SIZE = int(
+    os.getenv('LEDGER_VERIFY_BATCH_SIZE', DEFAULT_BATCH_SIZE),
+)
+
+CURRENCY_RATES_MAX_AGE = float(os.getenv('CURRENCY_RATES_MAX_AGE', ONE_MINUTE))
+
+TRACE_DIR = os.getenv('TRACE_DIR', '')
+TRACE_SAMPLE_RATE = float(os.getenv('TRACE_SAMPLE_RATE', DISABLED))
+PROFILE_DIR = os.getenv('PROFILE_DIR', '')
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', DISABLED))
+PROFILE_SLOW_THRESHOLD = float(os.getenv('PROFILE_SLOW_THRESHOLD', '500'))
+PROFILE_INTERVAL = float(os.getenv('PROFILE_INTERVAL', '0.005'))
+
+HOLD_SWEEP_INTERVAL = int(os.getenv('HOLD_SWEEP_INTERVAL', ONE_MINUTE))
+HOLD_SWEEP_BATCH_SIZE = int(
+    os.getenv('HOLD_SWEEP_BATCH_SIZE', DEFAULT_BATCH_SIZE),
+)
+
+SCHEDULED_TRANSFERS_INTERVAL = int(
+    os.getenv('SCHEDULED_TRANSFERS_INTERVAL', '5'),
+)
+SCHEDULED_TRANSFERS_BATCH_SIZE = int(
+    os.getenv('SCHEDULED_TRANSFERS_BATCH_SIZE', '500'),
+)
+SCHEDULED_TRANSFERS_CONCURRENCY = int(
+    os.getenv('SCHEDULED_TRANSFERS_CONCURRENCY', '4'),
+)
+SCHEDULED_TRANSFERS_LEASE = float(
+    os.getenv('SCHEDULED_TRANSFERS_LEASE', ONE_MINUTE),
+)
+TRANSFER_WORKER_POLL_INTERVAL = float(
+    os.getenv('TRANSFER_WORKER_POLL_INTERVAL', '0.2'),
+)
+
+RECLAIM_INTERVAL = int(os.getenv('RECLAIM_INTERVAL', '3600'))
+RECLAIM_RETENTION = float(os.getenv('RECLAIM_RETENTION', '2592000'))
+RECLAIM_BATCH_SIZE = int(
+    os.getenv('RECLAIM_BATCH_SIZE', DEFAULT_BATCH_SIZE),
+)
+RECLAIM_DUTY_CYCLE = float(os.getenv('RECLAIM_DUTY_CYCLE', '0.2'))
+RECLAIM_MAX_ACCOUNTS = int(os.getenv('RECLAIM_MAX_ACCOUNTS', '100'))
@@ -0,0 +1,277 @@
+"""Opt-in request tracing and sampling profiling."""
+import contextlib
+import json
+import os
+import random
+import threading
+import time
+from contextvars import ContextVar
+from typing import IO, Any, ContextManager, Dict, List, Optional
+
+from paymaster.profiling import SamplingProfiler, profile_file_name
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+TRACE_HEADER = b'x-trace'
+PROFILE_HEADER = b'x-profile'
+# trace event format keeps time in microseconds
+MICROSECONDS_IN_SECOND = 1000000
+MILLISECONDS_IN_SECOND = 1000
+# status of response which wasn't started before failure
+DEFAULT_STATUS_CODE = 500
+
+_NO_SPAN = contextlib.nullcontext()
+
+
+class Trace(object):
+    """Spans of single request in trace event format."""
+
+    def __init__(self, name: str, request_number: int) -> None:
+        """Init trace.
+
+        Args:
+            name: request name
+            request_number: number of request used as trace thread id
+        """
+        self.name = name
+        self.request_number = request_number
+        self.events: List[Dict[str, Any]] = []
+        self.endpoint_started: Optional[float] = None
+        self.endpoint_finished: Optional[float] = None
+
+    def add(
+        self,
+        name: str,
+        started_at: float,
+        finished_at: float,
+        **args: Any,
+    ) -> None:
+        """Add complete span.
+
+        Args:
+            name: span name
+            started_at: span start, perf counter seconds
+            finished_at: span end, perf counter seconds
+            args: span details
+        """
+        self.events.append({
+            'name': name,
+            'ph': 'X',
+            'ts': started_at * MICROSECONDS_IN_SECOND,
+            'dur': (finished_at - started_at) * MICROSECONDS_IN_SECOND,
+            'pid': os.getpid(),
+            'tid': self.request_number,
+            'args': args,
+        })
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar(
+    '_current_trace', default=None,
+)
+
+
+class _Span(object):
+    def __init__(self, trace: Trace, name: str, args: Dict[str, Any]) -> None:
+        self._trace = trace
+        self._name = name
+        self._args = args
+        self._started_at: float = 0
+
+    def __enter__(self) -> None:
+        self._started_at = time.perf_counter()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self._trace.add(
+            self._name, self._started_at, time.perf_counter(), **self._args,
+        )
+
+
+def current_trace() -> Optional[Trace]:
+    """Get trace of current request.
+
+    Returns:
+        trace or None for untraced request
+    """
+    return _current_trace.get()
+
+
+def span(name: str, **args: Any) -> ContextManager[None]:
+    """Record span of current request if it is traced.
+
+    Args:
+        name: span name
+        args: span details
+
+    Returns:
+        span context manager, no-op for untraced request
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        return _NO_SPAN
+    return _Span(trace, name, args)
+
+
+class TraceExporter(object):
+    """Writer of traces to per-process file in trace event format.
+
+    The file is a JSON array left open for appending, which is accepted by
+    chrome://tracing and Perfetto.
+    """
+
+    def __init__(self, trace_dir: str) -> None:
+        """Init exporter.
+
+        Args:
+            trace_dir: directory of trace files
+        """
+        file_name = 'trace-{0}.json'.format(os.getpid())
+        self.path = os.path.join(trace_dir, file_name)
+        self._stream: Optional[IO[str]] = None
+
+    def export(self, trace: Trace) -> None:
+        """Append trace spans to file.
+
+        Args:
+            trace: request trace
+        """
+        if self._stream is None:
+            self._stream = open(self.path, 'a')  # noqa: WPS515 SIM115
+            if not self._stream.tell():
+                self._stream.write('[\n')
+        for event in trace.events:
+            self._stream.write('{0},\n'.format(json.dumps(event)))
+        self._stream.flush()
+
+
+class _ResponseRecorder(object):
+    """Send channel remembering request start and response status."""
+
+    def __init__(self, send: Send) -> None:
+        self.started_at = time.perf_counter()
+        self.status_code = DEFAULT_STATUS_CODE
+        self._send = send
+
+    async def __call__(self, message: Message) -> None:
+        if message['type'] == 'http.response.start':
+            self.status_code = message['status']
+        await self._send(message)
+
+
+class TracingMiddleware(object):
+    """Middleware tracing and profiling requests chosen by header or rate."""
+
+    def __init__(  # noqa: WPS211
+        self,
+        app: ASGIApp,
+        trace_dir: str = '',
+        trace_sample_rate: float = 0,
+        profile_dir: str = '',
+        profile_sample_rate: float = 0,
+        profile_threshold: float = 0,
+        profile_interval: float = 0.005,
+    ) -> None:
+        """Init middleware.
+
+        Args:
+            app: ASGI application
+            trace_dir: directory of trace files, empty to disable tracing
+            trace_sample_rate: share of traced requests
+            profile_dir: directory of profiles, empty to disable profiling
+            profile_sample_rate: share of profiled requests
+            profile_threshold: minimum duration of dumped profile, ms
+            profile_interval: sampling interval of profiler, seconds
+        """
+        self.app = app
+        self._exporter = TraceExporter(trace_dir) if trace_dir else None
+        self._trace_sample_rate = trace_sample_rate
+        self._profile_dir = profile_dir
+        self._profile_sample_rate = profile_sample_rate
+        self._profile_threshold = profile_threshold
+        self._profile_interval = profile_interval
+        self._requests_count = 0
+
+    async def __call__(
+        self,
+        scope: Scope,
+        receive: Receive,
+        send: Send,
+    ) -> None:
+        """Handle request.
+
+        Args:
+            scope: connection scope
+            receive: receive channel
+            send: send channel
+        """
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        trace = self._start_trace(scope)
+        profiler = self._start_profiler(scope)
+        recorder = _ResponseRecorder(send)
+        token = _current_trace.set(trace)
+        try:  # noqa: WPS501
+            await self.app(scope, receive, recorder)
+        finally:
+            _current_trace.reset(token)
+            self._finish_request(scope, trace, profiler, recorder)
+
+    def _start_trace(self, scope: Scope) -> Optional[Trace]:
+        if self._exporter is None:
+            return None
+        if not self._is_chosen(scope, TRACE_HEADER, self._trace_sample_rate):
+            return None
+        self._requests_count += 1
+        return Trace(
+            f"{scope['method']} {scope['path']}", self._requests_count,
+        )
+
+    def _start_profiler(self, scope: Scope) -> Optional[SamplingProfiler]:
+        if not self._profile_dir:
+            return None
+        sample_rate = self._profile_sample_rate
+        if not self._is_chosen(scope, PROFILE_HEADER, sample_rate):
+            return None
+        profiler = SamplingProfiler(
+            threading.get_ident(), self._profile_interval,
+        )
+        profiler.start()
+        return profiler
+
+    def _finish_request(
+        self,
+        scope: Scope,
+        trace: Optional[Trace],
+        profiler: Optional[SamplingProfiler],
+        recorder: _ResponseRecorder,
+    ) -> None:
+        finished_at = time.perf_counter()
+        if trace is not None and self._exporter is not None:
+            trace.add(
+                trace.name,
+                recorder.started_at,
+                finished_at,
+                status=recorder.status_code,
+            )
+            self._exporter.export(trace)
+        if profiler is None:
+            return
+        profiler.stop()
+        duration = finished_at - recorder.started_at
+        duration *= MILLISECONDS_IN_SECOND
+        # samples include other requests served by event loop meanwhile
+        if duration >= self._profile_threshold:
+            profiler.dump(os.path.join(
+                self._profile_dir,
+                profile_file_name(scope['method'], scope['path'], duration),
+            ))
+
+    def _is_chosen(
+        self,
+        scope: Scope,
+        header: bytes,
+        sample_rate: float,
+    ) -> bool:
+        # requests are chosen by header or sampled at random
+        if header in dict(scope['headers']):
+            return True
+        return random.random() < sample_rate  # noqa: S311
@@ -0,0 +1,4 @@
+ALTER TABLE transactions DROP COLUMN counterparty_user_id;
+DROP TABLE saga_credits;
+DROP TABLE transfer_sagas;
+DROP TYPE saga_status;
@@ -0,0 +1,25 @@
+CREATE TYPE saga_status AS ENUM ('debited', 'completed', 'compensated');
+
+
+CREATE TABLE transfer_sagas (
+    id              UUID            PRIMARY KEY,
+    sender_id       INTEGER         NOT NULL,
+    recipient_id    INTEGER         NOT NULL,
+    qty_change      BIGINT          NOT NULL,
+    description     VARCHAR(255),
+    created_at      TIMESTAMP       DEFAULT CURRENT_TIMESTAMP(2),
+    current_status  saga_status     NOT NULL DEFAULT 'debited'
+);
+
+
+CREATE INDEX pending_sagas_index ON transfer_sagas (created_at)
+    WHERE current_status = 'debited';
+
+
+CREATE TABLE saga_credits (
+    saga_id         UUID            PRIMARY KEY,
+    created_at      TIMESTAMP       DEFAULT CURRENT_TIMESTAMP(2)
+);
+
+
+ALTER TABLE transactions ADD COLUMN counterparty_user_id INTEGER;
@@ -0,0 +1,2 @@
+DROP TABLE account_stripes;
+ALTER TABLE accounts DROP COLUMN stripes;
@@ -0,0 +1,17 @@
+ALTER TABLE accounts ADD COLUMN stripes SMALLINT NOT NULL DEFAULT 1
+    CHECK (stripes > 0);
+
+
+CREATE TABLE account_stripes (
+    account_id      INTEGER         NOT NULL REFERENCES accounts,
+    stripe          SMALLINT        NOT NULL,
+    balance         BIGINT          NOT NULL DEFAULT 0,
+    PRIMARY KEY (account_id, stripe)
+);
+
+
+INSERT INTO account_stripes (account_id, stripe, balance)
+    SELECT accounts.id, 0, COALESCE(sum(transactions.qty_change), 0)
+    FROM accounts
+    LEFT JOIN transactions ON transactions.account_id = accounts.id
+    GROUP BY accounts.id;
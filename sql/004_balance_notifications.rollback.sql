@@ -0,0 +1,4 @@
+DROP TRIGGER account_status_change_notification ON accounts;
+DROP FUNCTION notify_account_status_change();
+DROP TRIGGER balance_change_notification ON transactions;
+DROP FUNCTION notify_balance_change();
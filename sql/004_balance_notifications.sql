@@ -0,0 +1,27 @@
+CREATE FUNCTION notify_balance_change() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify(
+        'balance_changes',
+        (SELECT user_id FROM accounts WHERE id = NEW.account_id) || ':' || NEW.id
+    );
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+
+CREATE TRIGGER balance_change_notification
+    AFTER INSERT ON transactions
+    FOR EACH ROW EXECUTE PROCEDURE notify_balance_change();
+
+
+CREATE FUNCTION notify_account_status_change() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('balance_changes', NEW.user_id || ':0');
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+
+CREATE TRIGGER account_status_change_notification
+    AFTER UPDATE OF current_status ON accounts
+    FOR EACH ROW EXECUTE PROCEDURE notify_account_status_change();
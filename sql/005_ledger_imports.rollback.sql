@@ -0,0 +1,22 @@
+DROP TRIGGER balance_change_notification ON transactions;
+
+
+CREATE OR REPLACE FUNCTION notify_balance_change() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify(
+        'balance_changes',
+        (SELECT user_id FROM accounts WHERE id = NEW.account_id) || ':' || NEW.id
+    );
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+
+CREATE TRIGGER balance_change_notification
+    AFTER INSERT ON transactions
+    FOR EACH ROW EXECUTE PROCEDURE notify_balance_change();
+
+
+DROP TABLE import_staging;
+DROP TABLE ledger_imports;
+DROP TYPE import_status;
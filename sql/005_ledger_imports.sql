@@ -0,0 +1,49 @@
+CREATE TYPE import_status AS ENUM ('running', 'completed', 'failed');
+
+
+CREATE TABLE ledger_imports (
+    id              UUID            PRIMARY KEY,
+    current_status  import_status   NOT NULL DEFAULT 'running',
+    lines_count     BIGINT          NOT NULL DEFAULT 0,
+    imported        BIGINT          NOT NULL DEFAULT 0,
+    failed          BIGINT          NOT NULL DEFAULT 0,
+    created_at      TIMESTAMP       DEFAULT CURRENT_TIMESTAMP(2),
+    updated_at      TIMESTAMP       DEFAULT CURRENT_TIMESTAMP(2)
+);
+
+
+CREATE UNLOGGED TABLE import_staging (
+    import_id       UUID            NOT NULL,
+    line            INTEGER         NOT NULL,
+    user_id         INTEGER         NOT NULL,
+    qty_change      BIGINT          NOT NULL,
+    description     VARCHAR(255)    NOT NULL,
+    created_at      TIMESTAMP
+);
+
+
+CREATE INDEX import_staging_index ON import_staging (import_id);
+
+
+-- one notification per account and statement instead of per row
+CREATE OR REPLACE FUNCTION notify_balance_change() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('balance_changes', accounts.user_id || ':' || changes.seq)
+        FROM (
+            SELECT account_id, max(id) AS seq
+            FROM inserted
+            GROUP BY account_id
+        ) AS changes
+        JOIN accounts ON accounts.id = changes.account_id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+
+DROP TRIGGER balance_change_notification ON transactions;
+
+
+CREATE TRIGGER balance_change_notification
+    AFTER INSERT ON transactions
+    REFERENCING NEW TABLE AS inserted
+    FOR EACH STATEMENT EXECUTE PROCEDURE notify_balance_change();
@@ -0,0 +1,9 @@
+DROP TRIGGER transaction_chain ON transactions;
+DROP FUNCTION chain_transaction();
+DROP INDEX transaction_chain_index;
+ALTER TABLE transactions DROP COLUMN chain_hash;
+ALTER TABLE transactions DROP COLUMN chain_seq;
+DROP FUNCTION transaction_digest(BYTEA, transactions);
+ALTER TABLE transactions DROP COLUMN stripe;
+DROP TABLE chain_verifications;
+DROP TABLE ledger_chains;
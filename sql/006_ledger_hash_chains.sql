@@ -0,0 +1,124 @@
+-- transactions of each account stripe are linked into a hash chain, the
+-- stripe row is already locked by the writer so the chain head adds no
+-- contention to striped accounts
+ALTER TABLE transactions ADD COLUMN stripe SMALLINT NOT NULL DEFAULT 0;
+ALTER TABLE transactions ADD COLUMN chain_seq BIGINT;
+ALTER TABLE transactions ADD COLUMN chain_hash BYTEA;
+
+
+CREATE TABLE ledger_chains (
+    account_id      INTEGER         NOT NULL REFERENCES accounts,
+    stripe          SMALLINT        NOT NULL,
+    seq             BIGINT          NOT NULL DEFAULT 0,
+    head            BYTEA           NOT NULL DEFAULT decode(repeat('00', 32), 'hex'),
+    PRIMARY KEY (account_id, stripe)
+);
+
+
+CREATE TABLE chain_verifications (
+    account_id      INTEGER         NOT NULL,
+    stripe          SMALLINT        NOT NULL,
+    seq             BIGINT          NOT NULL,
+    head            BYTEA           NOT NULL,
+    broken_seq      BIGINT,
+    verified_at     TIMESTAMP       DEFAULT CURRENT_TIMESTAMP(2),
+    PRIMARY KEY (account_id, stripe)
+);
+
+
+CREATE FUNCTION transaction_digest(previous BYTEA, entry transactions)
+RETURNS BYTEA AS $$
+    SELECT sha256(previous || convert_to(concat_ws(
+        '|',
+        entry.id,
+        entry.account_id,
+        entry.stripe,
+        entry.chain_seq,
+        entry.deal_with,
+        COALESCE(entry.counterparty_user_id::TEXT, ''),
+        entry.qty_change,
+        COALESCE(to_char(entry.created_at, 'YYYY-MM-DD"T"HH24:MI:SS.US'), ''),
+        length(entry.description),
+        entry.description
+    ), 'UTF8'));
+$$ LANGUAGE SQL STABLE;
+
+
+CREATE FUNCTION chain_transaction() RETURNS trigger AS $$
+DECLARE
+    previous BYTEA;
+BEGIN
+    INSERT INTO ledger_chains (account_id, stripe)
+        VALUES (NEW.account_id, NEW.stripe)
+        ON CONFLICT (account_id, stripe) DO NOTHING;
+    SELECT seq + 1, head INTO NEW.chain_seq, previous
+        FROM ledger_chains
+        WHERE account_id = NEW.account_id
+        AND stripe = NEW.stripe
+        FOR UPDATE;
+    NEW.chain_hash := transaction_digest(previous, NEW);
+    UPDATE ledger_chains
+        SET seq = NEW.chain_seq,
+            head = NEW.chain_hash
+        WHERE account_id = NEW.account_id
+        AND stripe = NEW.stripe;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- chain existing history in insertion order by set-based statements:
+-- positions are numbered by a window function, then digests are chained
+-- by a recursive query advancing all chains one position per step
+UPDATE transactions
+    SET chain_seq = numbered.chain_seq
+    FROM (
+        SELECT id, row_number() OVER (
+            PARTITION BY account_id, stripe ORDER BY id
+        ) AS chain_seq
+        FROM transactions
+    ) AS numbered
+    WHERE transactions.id = numbered.id;
+
+
+ALTER TABLE transactions ALTER COLUMN chain_seq SET NOT NULL;
+
+
+CREATE UNIQUE INDEX transaction_chain_index
+    ON transactions (account_id, stripe, chain_seq);
+
+
+WITH RECURSIVE chained AS (
+        SELECT entry.id, entry.account_id, entry.stripe, entry.chain_seq,
+            transaction_digest(decode(repeat('00', 32), 'hex'), entry)
+                AS chain_hash
+        FROM transactions AS entry
+        WHERE entry.chain_seq = 1
+    UNION ALL
+        SELECT entry.id, entry.account_id, entry.stripe, entry.chain_seq,
+            transaction_digest(chained.chain_hash, entry)
+        FROM chained
+        JOIN transactions AS entry
+            ON entry.account_id = chained.account_id
+            AND entry.stripe = chained.stripe
+            AND entry.chain_seq = chained.chain_seq + 1
+)
+UPDATE transactions
+    SET chain_hash = chained.chain_hash
+    FROM chained
+    WHERE transactions.id = chained.id;
+
+
+ALTER TABLE transactions ALTER COLUMN chain_hash SET NOT NULL;
+
+
+INSERT INTO ledger_chains (account_id, stripe, seq, head)
+    SELECT DISTINCT ON (account_id, stripe)
+        account_id, stripe, chain_seq, chain_hash
+    FROM transactions
+    ORDER BY account_id, stripe, chain_seq DESC;
+
+
+CREATE TRIGGER transaction_chain
+    BEFORE INSERT ON transactions
+    FOR EACH ROW EXECUTE PROCEDURE chain_transaction();
@@ -0,0 +1,4 @@
+DROP TRIGGER transactions_rollup ON transactions;
+DROP FUNCTION rollup_transactions();
+DROP TABLE account_rollups;
+DROP TYPE rollup_period;
@@ -0,0 +1,51 @@
+CREATE TYPE rollup_period AS ENUM ('day', 'month');
+
+
+-- rollups are kept per stripe, the writer already holds the stripe row lock
+CREATE TABLE account_rollups (
+    account_id      INTEGER         NOT NULL REFERENCES accounts,
+    stripe          SMALLINT        NOT NULL,
+    period          rollup_period   NOT NULL,
+    period_start    DATE            NOT NULL,
+    total_in        BIGINT          NOT NULL DEFAULT 0,
+    total_out       BIGINT          NOT NULL DEFAULT 0,
+    entries         INTEGER         NOT NULL DEFAULT 0,
+    PRIMARY KEY (account_id, period, period_start, stripe)
+);
+
+
+CREATE FUNCTION rollup_transactions() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO account_rollups (
+        account_id, stripe, period, period_start, total_in, total_out, entries
+    )
+    SELECT account_id, stripe, periods.period,
+        date_trunc(periods.period::TEXT, created_at)::DATE,
+        sum(GREATEST(qty_change, 0)), sum(GREATEST(-qty_change, 0)), count(*)
+    FROM inserted
+    CROSS JOIN unnest(enum_range(NULL::rollup_period)) AS periods (period)
+    GROUP BY 1, 2, 3, 4
+    ON CONFLICT (account_id, period, period_start, stripe) DO UPDATE
+        SET total_in = account_rollups.total_in + EXCLUDED.total_in,
+            total_out = account_rollups.total_out + EXCLUDED.total_out,
+            entries = account_rollups.entries + EXCLUDED.entries;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+
+INSERT INTO account_rollups (
+    account_id, stripe, period, period_start, total_in, total_out, entries
+)
+SELECT account_id, stripe, periods.period,
+    date_trunc(periods.period::TEXT, created_at)::DATE,
+    sum(GREATEST(qty_change, 0)), sum(GREATEST(-qty_change, 0)), count(*)
+FROM transactions
+CROSS JOIN unnest(enum_range(NULL::rollup_period)) AS periods (period)
+GROUP BY 1, 2, 3, 4;
+
+
+CREATE TRIGGER transactions_rollup
+    AFTER INSERT ON transactions
+    REFERENCING NEW TABLE AS inserted
+    FOR EACH STATEMENT EXECUTE PROCEDURE rollup_transactions();
@@ -0,0 +1,6 @@
+DROP INDEX account_user_index;
+DROP INDEX transactions_description_index;
+DROP INDEX transactions_total_index;
+DROP INDEX transactions_counterparty_index;
+DROP INDEX transactions_deal_with_index;
+DROP INDEX transactions_date_index;
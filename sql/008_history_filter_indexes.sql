@@ -0,0 +1,23 @@
+CREATE INDEX transactions_date_index
+    ON transactions (account_id, created_at);
+
+
+CREATE INDEX transactions_deal_with_index
+    ON transactions (account_id, deal_with, created_at);
+
+
+CREATE INDEX transactions_counterparty_index
+    ON transactions (account_id, counterparty_user_id, created_at)
+    WHERE counterparty_user_id IS NOT NULL;
+
+
+CREATE INDEX transactions_total_index
+    ON transactions (account_id, qty_change);
+
+
+CREATE INDEX transactions_description_index
+    ON transactions (account_id, description varchar_pattern_ops);
+
+
+-- counterparty accounts may be already deleted
+CREATE INDEX account_user_index ON accounts (user_id);
@@ -0,0 +1,5 @@
+DROP TRIGGER hold_change_notification ON holds;
+DROP FUNCTION notify_hold_change();
+DROP TABLE holds;
+ALTER TABLE account_stripes DROP COLUMN held;
+DROP TYPE hold_status;
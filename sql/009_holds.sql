@@ -0,0 +1,37 @@
+CREATE TYPE hold_status AS ENUM ('active', 'captured', 'released', 'expired');
+
+
+-- funds held by active holds are materialized on the first stripe, so
+-- available balance is read from stripes only
+ALTER TABLE account_stripes ADD COLUMN held BIGINT NOT NULL DEFAULT 0;
+
+
+CREATE TABLE holds (
+    id              UUID            PRIMARY KEY,
+    account_id      INTEGER         NOT NULL REFERENCES accounts,
+    qty_held        BIGINT          NOT NULL CHECK (qty_held > 0),
+    description     VARCHAR(255)    NOT NULL,
+    created_at      TIMESTAMP       DEFAULT CURRENT_TIMESTAMP(2),
+    expires_at      TIMESTAMP       NOT NULL,
+    current_status  hold_status     NOT NULL DEFAULT 'active'
+);
+
+
+CREATE INDEX active_holds_index ON holds (expires_at)
+    WHERE current_status = 'active';
+
+
+CREATE FUNCTION notify_hold_change() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify(
+        'balance_changes',
+        (SELECT user_id FROM accounts WHERE id = NEW.account_id) || ':0'
+    );
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+
+CREATE TRIGGER hold_change_notification
+    AFTER INSERT OR UPDATE OF current_status ON holds
+    FOR EACH ROW EXECUTE PROCEDURE notify_hold_change();
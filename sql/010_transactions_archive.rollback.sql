@@ -0,0 +1,13 @@
+-- archived rows keep their chain positions and are already rolled up
+ALTER TABLE transactions DISABLE TRIGGER USER;
+INSERT INTO transactions (
+    id, account_id, created_at, deal_with, description, qty_change,
+    counterparty_user_id, stripe, chain_seq, chain_hash
+)
+SELECT id, account_id, created_at, deal_with, description, qty_change,
+    counterparty_user_id, stripe, chain_seq, chain_hash
+FROM transactions_archive;
+ALTER TABLE transactions ENABLE TRIGGER USER;
+DROP TABLE transactions_archive;
+ALTER TABLE accounts DROP COLUMN reclaimed_at;
+ALTER TABLE accounts DROP COLUMN deleted_at;
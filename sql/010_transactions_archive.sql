@@ -0,0 +1,31 @@
+ALTER TABLE accounts ADD COLUMN deleted_at TIMESTAMP;
+ALTER TABLE accounts ADD COLUMN reclaimed_at TIMESTAMP;
+
+
+UPDATE accounts
+    SET deleted_at = CURRENT_TIMESTAMP(2)
+    WHERE current_status = 'deleted';
+
+
+CREATE INDEX reclaimable_accounts_index ON accounts (deleted_at)
+    WHERE current_status = 'deleted' AND reclaimed_at IS NULL;
+
+
+-- ledgers of long deleted accounts, kept with their hash chains
+CREATE TABLE transactions_archive (
+    id                      INTEGER         PRIMARY KEY,
+    account_id              INTEGER         NOT NULL,
+    created_at              TIMESTAMP,
+    deal_with               INTEGER         NOT NULL,
+    description             VARCHAR(255)    NOT NULL,
+    qty_change              BIGINT          NOT NULL,
+    counterparty_user_id    INTEGER,
+    stripe                  SMALLINT        NOT NULL,
+    chain_seq               BIGINT          NOT NULL,
+    chain_hash              BYTEA           NOT NULL,
+    archived_at             TIMESTAMP       DEFAULT CURRENT_TIMESTAMP(2)
+);
+
+
+CREATE INDEX transactions_archive_account_index
+    ON transactions_archive (account_id, stripe, chain_seq);
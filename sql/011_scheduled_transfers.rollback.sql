@@ -0,0 +1,3 @@
+DROP TABLE scheduled_transfers;
+DROP TYPE transfer_period;
+DROP TYPE scheduled_transfer_status;
@@ -0,0 +1,30 @@
+CREATE TYPE scheduled_transfer_status AS ENUM (
+    'scheduled', 'completed', 'failed', 'canceled'
+);
+
+
+CREATE TYPE transfer_period AS ENUM ('day', 'week', 'month');
+
+
+-- kept on sender shard, so that run and its bookkeeping commit at once
+CREATE TABLE scheduled_transfers (
+    id              UUID                        PRIMARY KEY,
+    sender_id       INTEGER                     NOT NULL,
+    recipient_id    INTEGER                     NOT NULL,
+    qty_value       BIGINT                      NOT NULL CHECK (qty_value > 0),
+    description     VARCHAR(255),
+    first_due_at    TIMESTAMP                   NOT NULL,
+    due_at          TIMESTAMP                   NOT NULL,
+    period          transfer_period,
+    max_runs        INTEGER,
+    runs            INTEGER                     NOT NULL DEFAULT 0,
+    failed_runs     INTEGER                     NOT NULL DEFAULT 0,
+    last_error      VARCHAR(255),
+    claimed_until   TIMESTAMP,
+    created_at      TIMESTAMP                   DEFAULT CURRENT_TIMESTAMP(2),
+    current_status  scheduled_transfer_status   NOT NULL DEFAULT 'scheduled'
+);
+
+
+CREATE INDEX due_scheduled_transfers_index ON scheduled_transfers (due_at)
+    WHERE current_status = 'scheduled';
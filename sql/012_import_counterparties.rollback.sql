@@ -0,0 +1 @@
+ALTER TABLE import_staging DROP COLUMN counterparty_user_id;
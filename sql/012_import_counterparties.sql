@@ -0,0 +1 @@
+ALTER TABLE import_staging ADD COLUMN counterparty_user_id INTEGER;
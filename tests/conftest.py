@@ -1,11 +1,12 @@
 """Fixtures module."""
 import os
-from typing import AsyncIterator
+from typing import AsyncIterator, List
 
 import pytest
 from asgi_lifespan import LifespanManager
 from fastapi import FastAPI
 from httpx import AsyncClient
+from paymaster.database.migrations import make_migration
 from testcontainers.postgres import PostgresContainer
 
 
@@ -18,6 +19,19 @@ async def dsn() -> str:
         yield postgres.get_connection_url().replace('+psycopg2', '')
 
 
+@pytest.fixture
+async def shard_dsns() -> List[str]:
+    with PostgresContainer("postgres:12-alpine") as first_shard:
+        with PostgresContainer("postgres:12-alpine") as second_shard:
+            dsns = [
+                shard.get_connection_url().replace('+psycopg2', '')
+                for shard in (first_shard, second_shard)
+            ]
+            for shard_dsn in dsns:
+                make_migration(shard_dsn)
+            yield dsns
+
+
 @pytest.fixture
 def non_mocked_hosts() -> list:
     return ['testserver']
@@ -34,6 +48,7 @@ async def app() -> AsyncIterator[FastAPI]:
 @pytest.fixture
 async def initialized_app(app: FastAPI, dsn: str) -> AsyncIterator[FastAPI]:
     os.environ['DSN'] = dsn
+    make_migration(dsn)
     async with LifespanManager(app):
         yield app
 
@@ -45,3 +60,15 @@ async def client(initialized_app: FastAPI) -> AsyncIterator[AsyncClient]:
         base_url="http://testserver",
     ) as client:
         yield client
+
+
+@pytest.fixture
+async def sharded_client(
+    app: FastAPI,
+    shard_dsns: List[str],
+    monkeypatch,
+) -> AsyncIterator[AsyncClient]:
+    monkeypatch.setenv('SHARD_DSNS', ','.join(shard_dsns))
+    async with LifespanManager(app):
+        async with AsyncClient(app=app, base_url="http://testserver") as client:
+            yield client
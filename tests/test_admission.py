@@ -0,0 +1,72 @@
+"""Admission control test module."""
+import asyncio
+
+import pytest
+from paymaster.database.admission import AdmissionController, Lane
+from paymaster.exceptions import PoolOverloadError
+
+pytestmark = pytest.mark.asyncio
+
+POOL_SIZE = 2
+
+
+class FakePool(object):
+    def __init__(self, size: int):
+        self._connections = asyncio.Semaphore(size)
+
+    async def acquire(self, timeout=None):
+        await asyncio.wait_for(self._connections.acquire(), timeout)
+        return object()
+
+    async def release(self, connection):
+        self._connections.release()
+
+
+def make_admission(**kwargs) -> AdmissionController:
+    params = {
+        'pool': FakePool(POOL_SIZE),
+        'pool_size': POOL_SIZE,
+        'acquire_timeout': 0.05,
+        'max_queue': 10,
+        'write_reserve': 1,
+        'retry_after': 1,
+    }
+    params.update(kwargs)
+    return AdmissionController(**params)
+
+
+async def test_acquire_timeout():
+    admission = make_admission()
+    await admission.acquire(Lane.write)
+    await admission.acquire(Lane.write)
+    with pytest.raises(PoolOverloadError):
+        await admission.acquire(Lane.write)
+    assert admission.waiting(Lane.write) == 0
+
+
+async def test_reads_cannot_take_write_reserve():
+    admission = make_admission()
+    async with admission.connection(Lane.read):
+        with pytest.raises(PoolOverloadError):
+            await admission.acquire(Lane.read)
+        async with admission.connection(Lane.write):
+            assert admission.waiting(Lane.write) == 0
+    async with admission.connection(Lane.read):
+        pass
+
+
+async def test_full_queue_fails_fast():
+    admission = make_admission(max_queue=1, acquire_timeout=1)
+    await admission.acquire(Lane.write)
+    await admission.acquire(Lane.write)
+    waiting = asyncio.ensure_future(admission.acquire(Lane.write))
+    await asyncio.sleep(0)
+    with pytest.raises(PoolOverloadError):
+        await admission.acquire(Lane.write)
+    waiting.cancel()
+
+
+@pytest.mark.parametrize('write_reserve', [-1, POOL_SIZE, POOL_SIZE + 1])
+async def test_invalid_write_reserve(write_reserve):
+    with pytest.raises(ValueError):
+        make_admission(write_reserve=write_reserve)
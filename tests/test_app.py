@@ -1,9 +1,18 @@
 """Application test module."""
+import asyncio
+import itertools
+from datetime import datetime, timedelta
+
 import pytest
 from asyncpg import connect
 from fastapi import status
 from httpx import AsyncClient
 from paymaster.app.data_schemas import OperationType
+from paymaster.currencies import BASE_CURRENCY
+from paymaster.database import db
+from paymaster.database.db import set_acc_stripes
+from paymaster.database.holds import expire_holds
+from paymaster.database.scheduled_transfers import run_scheduled_transfers
 from paymaster.scripts.background_tasks import update_currency_rates_job
 from tests.test_currencies import USD_RATE, custom_response
 
@@ -58,6 +67,31 @@ async def test_swagger_doc_and_create_delete_acc(client: AsyncClient):
     assert response.status_code == status.HTTP_404_NOT_FOUND
 
 
+async def test_bulk_create_delete_accs(client: AsyncClient):
+    await client.post(f'/account/create/user_id/{first_user_id}')
+    response = await client.post('/accounts/create', json={
+        'user_ids': [first_user_id, second_user_id, second_user_id],
+    })
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {
+        'succeeded': [second_user_id],
+        'conflicts': [
+            {'user_id': first_user_id, 'error': 'Account already exists'},
+        ],
+    }
+    response = await client.post('/accounts/delete', json={
+        'user_ids': [first_user_id, second_user_id, nonexistent_user],
+    })
+    assert response.status_code == status.HTTP_200_OK
+    response = response.json()
+    assert sorted(response['succeeded']) == [first_user_id, second_user_id]
+    assert response['conflicts'] == [
+        {'user_id': nonexistent_user, 'error': "Account doesn't exists"},
+    ]
+    response = await client.post('/accounts/delete', json={'user_ids': []})
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
 async def test_change_user_balance(client: AsyncClient):
     # test change user balance
     response = await client.post(f'/account/create/user_id/{first_user_id}')
@@ -226,6 +260,23 @@ async def test_getting_user_balance(client: AsyncClient, httpx_mock, dsn):
     response = await client.get(f'/balance/get/user_id/{first_user_id}?currency=usd')
     response = response.json()
     assert response['balance'] == round(50 * USD_RATE, 2)
+    response = await client.get(
+        f'/balance/get/user_id/{first_user_id}',
+        params={'currencies': ['usd', BASE_CURRENCY]},
+    )
+    response = response.json()
+    assert response['balances'] == {
+        BASE_CURRENCY.upper(): 50, 'USD': round(50 * USD_RATE, 2),
+    }
+    response = await client.get(f'/balance/get/user_id/{first_user_id}?currency=xxx')
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    response = await client.post('/currencies/convert', json={'content': [
+        {'amount': 100, 'from_currency': BASE_CURRENCY, 'to_currency': 'USD'},
+        {'amount': 1, 'from_currency': 'USD', 'to_currency': BASE_CURRENCY},
+    ]})
+    assert [item['converted'] for item in response.json()['content']] == [
+        round(100 * USD_RATE, 2), round(1 / USD_RATE, 2),
+    ]
     # with nonexistent user
     response = await client.get(f'/balance/get/user_id/{nonexistent_user}')
     assert response.status_code == status.HTTP_404_NOT_FOUND
@@ -288,6 +339,524 @@ async def test_getting_transaction_history(client: AsyncClient):
     assert response[2]['deal_with'] == first_user_id
     assert response[2]['description'] == 'replenishment'
     assert response[2]['total'] == 100
+    # history with filters
+    response = await client.get(
+        f'/transactions/history/user_id/{first_user_id}',
+        params={'deal_with': second_user_id, 'max_total': -20},
+    )
+    response = response.json()['content']
+    assert [record['total'] for record in response] == [-40]
+    response = await client.get(
+        f'/transactions/history/user_id/{first_user_id}',
+        params={'description': 'with', 'order_by_total': 'asc'},
+    )
+    response = response.json()['content']
+    assert [record['total'] for record in response] == [-10]
+    response = await client.get(
+        f'/transactions/history/user_id/{first_user_id}',
+        params={'date_to': '2020-01-01'},
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()['content'] == []
+    # pagination metadata
+    response = await client.get(
+        f'/transactions/history/user_id/{first_user_id}',
+        params={'page_size': 2},
+    )
+    response = response.json()
+    assert len(response['content']) == 2
+    assert response['total_count'] == 3
+    assert response['page_count'] == 2
+    assert response['has_next']
+    response = await client.get(
+        f'/transactions/history/user_id/{first_user_id}',
+        params={'page_size': 2, 'page_number': 3},
+    )
+    assert response.status_code == status.HTTP_200_OK
+    response = response.json()
+    assert response['content'] == []
+    assert not response['has_next']
+    response = await client.get(
+        f'/transactions/history/user_id/{first_user_id}',
+        params={'page_size': 1, 'max_total': 0},
+    )
+    response = response.json()
+    assert len(response['content']) == 1
+    assert response['total_count'] is None
+    assert response['has_next']
     # with nonexistent user
     response = await client.get(f'/transactions/history/user_id/{nonexistent_user}')
     assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+async def test_striped_account(client: AsyncClient):
+    # tests preparing
+    await client.post(f'/account/create/user_id/{first_user_id}')
+    await client.post(f'/account/create/user_id/{second_user_id}')
+    await client.post(
+        '/balance/change',
+        json={
+            'operation': OperationType.replenishment,
+            'user_id': first_user_id,
+            'total': 100,
+            'description': OperationType.replenishment,
+        },
+    )
+
+    # tests
+    response = await client.post(f'/account/stripes/user_id/{second_user_id}?stripes=4')
+    assert response.status_code == status.HTTP_200_OK
+    for _ in range(10):
+        await client.post(
+            '/transactions/transfer',
+            json={
+                'sender_id': first_user_id,
+                'recipient_id': second_user_id,
+                'total': 5,
+            },
+        )
+    response = await client.get(f'/balance/get/user_id/{second_user_id}')
+    assert response.json()['balance'] == 50
+    response = await client.post(
+        '/transactions/transfer',
+        json={
+            'sender_id': second_user_id,
+            'recipient_id': first_user_id,
+            'total': 50,
+        },
+    )
+    assert response.status_code == status.HTTP_201_CREATED
+    response = await client.post(
+        '/transactions/transfer',
+        json={
+            'sender_id': second_user_id,
+            'recipient_id': first_user_id,
+            'total': 1,
+        },
+    )
+    assert response.status_code == status.HTTP_409_CONFLICT
+    # folding stripes keeps balance
+    await client.post(
+        '/balance/change',
+        json={
+            'operation': OperationType.replenishment,
+            'user_id': second_user_id,
+            'total': 7,
+        },
+    )
+    response = await client.post(f'/account/stripes/user_id/{second_user_id}?stripes=1')
+    assert response.status_code == status.HTTP_200_OK
+    response = await client.get(f'/balance/get/user_id/{second_user_id}')
+    assert response.json()['balance'] == 7
+    # with nonexistent user
+    response = await client.post(f'/account/stripes/user_id/{nonexistent_user}?stripes=4')
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+async def test_credit_racing_stripes_shrink(
+    client: AsyncClient, dsn, monkeypatch,
+):
+    # tests preparing
+    await client.post(f'/account/create/user_id/{first_user_id}')
+    await client.post(f'/account/stripes/user_id/{first_user_id}?stripes=4')
+    monkeypatch.setattr(db, '_stripe_keys', itertools.repeat(3))
+    db_conn = await connect(dsn)
+    resizing = db_conn.transaction()
+    await resizing.start()
+    await set_acc_stripes(first_user_id, 1, db_conn)
+
+    # tests
+    # credit waits for removed stripe and picks remaining one
+    credit = asyncio.create_task(client.post(
+        '/balance/change',
+        json={
+            'operation': OperationType.replenishment,
+            'user_id': first_user_id,
+            'total': 7,
+        },
+    ))
+    await asyncio.sleep(0.5)
+    await resizing.commit()
+    response = await credit
+    assert response.status_code == status.HTTP_201_CREATED
+    response = await client.get(f'/balance/get/user_id/{first_user_id}')
+    assert response.json()['balance'] == 7
+    await db_conn.close()
+
+
+async def test_ledger_import(client: AsyncClient):
+    # tests preparing
+    await client.post(f'/account/create/user_id/{first_user_id}')
+    await client.post(f'/account/create/user_id/{second_user_id}')
+    lines = [
+        '{"operation": "replenishment", "user_id": %d, "total": 100, "deal_with": %d}' % (first_user_id, second_user_id),  # noqa: E501
+        '',
+        '{"operation": "withdraw", "user_id": %d, "total": 30, "description": "fee"}' % first_user_id,  # noqa: E501
+        '{"operation": "withdraw", "user_id": %d, "total": 500}' % second_user_id,  # noqa: E501
+        '{"operation": "replenishment", "user_id": %d, "total": 10}' % nonexistent_user,  # noqa: E501
+        'not a json',
+    ]
+
+    # tests
+    response = await client.post(
+        '/transactions/import', content='\n'.join(lines).encode(),
+    )
+    assert response.status_code == status.HTTP_201_CREATED
+    report = response.json()
+    assert report['status'] == 'completed'
+    assert report['lines_count'] == len(lines)
+    assert report['imported'] == 2
+    assert report['failed'] == 3
+    assert [error['line'] for error in report['errors']] == [4, 5, 6]
+    response = await client.get(f'/balance/get/user_id/{first_user_id}')
+    assert response.json()['balance'] == 70
+    response = await client.get(
+        f'/transactions/history/user_id/{first_user_id}',
+        params={'order_by': 'total', 'sort_key': 'desc'},
+    )
+    history = response.json()['content']
+    assert [record['deal_with'] for record in history] == [
+        second_user_id, first_user_id,
+    ]
+    response = await client.get(
+        '/transactions/import/{0}'.format(report['import_id']),
+    )
+    assert response.json()['imported'] == 2
+
+
+async def test_statement(client: AsyncClient):
+    # tests preparing
+    await client.post(f'/account/create/user_id/{first_user_id}')
+    await client.post(
+        '/transactions/import',
+        content=(
+            '{"operation": "replenishment", "user_id": %d, "total": 50, "created_at": "2020-01-15T10:00:00"}' % first_user_id  # noqa: E501
+        ).encode(),
+    )
+    for operation, total in (
+        (OperationType.replenishment, 100),
+        (OperationType.withdraw, 30),
+    ):
+        await client.post(
+            '/balance/change',
+            json={'operation': operation, 'user_id': first_user_id, 'total': total},  # noqa: E501
+        )
+    today = datetime.utcnow().date()
+
+    # tests
+    response = await client.get(
+        f'/account/statement/user_id/{first_user_id}',
+        params={'date_from': '2020-01-01', 'date_to': today.isoformat()},
+    )
+    assert response.status_code == status.HTTP_200_OK
+    statement = response.json()['content']
+    assert len(statement) == 2
+    assert statement[0]['period_start'] == '2020-01-01'
+    assert statement[0]['closing_balance'] == 50
+    assert statement[1]['opening_balance'] == 50
+    assert statement[1]['total_in'] == 100
+    assert statement[1]['total_out'] == 30
+    assert statement[1]['closing_balance'] == 120
+    assert statement[1]['transactions_count'] == 2
+    response = await client.get(
+        f'/account/statement/user_id/{first_user_id}',
+        params={
+            'period': 'day',
+            'date_from': today.isoformat(),
+            'date_to': today.isoformat(),
+        },
+    )
+    statement = response.json()['content']
+    assert statement == [{
+        'period_start': today.isoformat(),
+        'opening_balance': 50,
+        'total_in': 100,
+        'total_out': 30,
+        'closing_balance': 120,
+        'transactions_count': 2,
+    }]
+    response = await client.get(
+        f'/account/statement/user_id/{nonexistent_user}',
+        params={'date_from': '2020-01-01', 'date_to': today.isoformat()},
+    )
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+async def test_holds(client: AsyncClient, initialized_app):
+    # tests preparing
+    await client.post(f'/account/create/user_id/{first_user_id}')
+    await client.post(
+        '/balance/change',
+        json={
+            'operation': OperationType.replenishment,
+            'user_id': first_user_id,
+            'total': 100,
+        },
+    )
+
+    # tests
+    response = await client.post(
+        '/holds/create', json={'user_id': first_user_id, 'total': 60},
+    )
+    assert response.status_code == status.HTTP_201_CREATED
+    hold_id = response.json()['hold_id']
+    response = await client.get(f'/balance/get/user_id/{first_user_id}')
+    assert response.json()['balance'] == 40
+    response = await client.post(
+        '/balance/change',
+        json={
+            'operation': OperationType.withdraw,
+            'user_id': first_user_id,
+            'total': 50,
+        },
+    )
+    assert response.status_code == status.HTTP_409_CONFLICT
+    capture_url = f'/holds/capture/user_id/{first_user_id}/hold_id/{hold_id}'
+    response = await client.post(capture_url, params={'total': 70})
+    assert response.status_code == status.HTTP_409_CONFLICT
+    response = await client.post(capture_url, params={'total': 30})
+    assert response.status_code == status.HTTP_201_CREATED
+    response = await client.get(f'/balance/get/user_id/{first_user_id}')
+    assert response.json()['balance'] == 70
+    response = await client.post(
+        f'/holds/release/user_id/{first_user_id}/hold_id/{hold_id}',
+    )
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    # expired hold
+    response = await client.post(
+        '/holds/create',
+        json={'user_id': first_user_id, 'total': 70, 'ttl': 0.01},
+    )
+    hold_id = response.json()['hold_id']
+    await asyncio.sleep(0.05)
+    response = await client.post(
+        f'/holds/capture/user_id/{first_user_id}/hold_id/{hold_id}',
+    )
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    assert await expire_holds(initialized_app.state.shards, batch_size=10) == 1
+    response = await client.get(f'/balance/get/user_id/{first_user_id}')
+    assert response.json()['balance'] == 70
+
+    # holds of deleted account are released
+    response = await client.post(
+        '/holds/create', json={'user_id': first_user_id, 'total': 20},
+    )
+    hold_id = response.json()['hold_id']
+    await client.delete(f'/account/delete/user_id/{first_user_id}')
+    response = await client.post(
+        f'/holds/capture/user_id/{first_user_id}/hold_id/{hold_id}',
+    )
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+async def test_conditional_get(client: AsyncClient):
+    # tests preparing
+    await client.post(f'/account/create/user_id/{first_user_id}')
+    await client.post(
+        '/balance/change',
+        json={
+            'operation': OperationType.replenishment,
+            'user_id': first_user_id,
+            'total': 100,
+        },
+    )
+    balance_url = f'/balance/get/user_id/{first_user_id}'
+    history_url = f'/transactions/history/user_id/{first_user_id}'
+
+    # tests
+    response = await client.get(balance_url)
+    etag = response.headers['ETag']
+    response = await client.get(balance_url, headers={'If-None-Match': etag})
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert response.headers['ETag'] == etag
+    response = await client.get(history_url)
+    history_etag = response.headers['ETag']
+    response = await client.get(
+        history_url, headers={'If-None-Match': history_etag},
+    )
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    # holds change balance, not history
+    await client.post(
+        '/holds/create', json={'user_id': first_user_id, 'total': 10},
+    )
+    response = await client.get(balance_url, headers={'If-None-Match': etag})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()['balance'] == 90
+    etag = response.headers['ETag']
+    response = await client.get(
+        history_url, headers={'If-None-Match': history_etag},
+    )
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    # every transaction changes version
+    await client.post(
+        '/balance/change',
+        json={
+            'operation': OperationType.withdraw,
+            'user_id': first_user_id,
+            'total': 10,
+        },
+    )
+    response = await client.get(balance_url, headers={'If-None-Match': etag})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()['balance'] == 80
+    response = await client.get(
+        history_url, headers={'If-None-Match': history_etag},
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert len(response.json()['content']) == 2
+
+
+
+async def test_conditional_get_of_recreated_account(client: AsyncClient):
+    # tests preparing
+    replenishment = {
+        'operation': OperationType.replenishment,
+        'user_id': first_user_id,
+        'total': 100,
+    }
+    await client.post(f'/account/create/user_id/{first_user_id}')
+    await client.post('/balance/change', json=replenishment)
+    balance_url = f'/balance/get/user_id/{first_user_id}'
+    history_url = f'/transactions/history/user_id/{first_user_id}'
+    response = await client.get(balance_url)
+    etag = response.headers['ETag']
+    response = await client.get(history_url)
+    history_etag = response.headers['ETag']
+
+    # tests
+    await client.delete(f'/account/delete/user_id/{first_user_id}')
+    await client.post(f'/account/create/user_id/{first_user_id}')
+    await client.post('/balance/change', json=replenishment)
+    response = await client.get(balance_url, headers={'If-None-Match': etag})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers['ETag'] != etag
+    response = await client.get(
+        history_url, headers={'If-None-Match': history_etag},
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert len(response.json()['content']) == 1
+
+async def test_scheduled_transfers(client: AsyncClient, initialized_app):
+    # tests preparing
+    for user_id in (first_user_id, second_user_id):
+        await client.post(f'/account/create/user_id/{user_id}')
+    await client.post(
+        '/balance/change',
+        json={
+            'operation': OperationType.replenishment,
+            'user_id': first_user_id,
+            'total': 100,
+        },
+    )
+    past = datetime.utcnow() - timedelta(days=2)
+
+    async def run_due():  # noqa: WPS430
+        return await run_scheduled_transfers(
+            initialized_app.state.shards,
+            batch_size=10,
+            concurrency=2,
+            lease=60,
+        )
+
+    # tests
+    response = await client.post('/transfers/schedule', json={
+        'sender_id': first_user_id,
+        'recipient_id': second_user_id,
+        'total': 30,
+        'due_at': past.isoformat(),
+        'period': 'day',
+        'runs': 2,
+    })
+    assert response.status_code == status.HTTP_201_CREATED
+    recurring_id = response.json()['transfer_id']
+    response = await client.post('/transfers/schedule', json={
+        'sender_id': first_user_id,
+        'recipient_id': second_user_id,
+        'total': 10,
+        'due_at': (datetime.utcnow() + timedelta(days=1)).isoformat(),
+    })
+    future_id = response.json()['transfer_id']
+    response = await client.post('/transfers/schedule', json={
+        'sender_id': nonexistent_user,
+        'recipient_id': second_user_id,
+        'total': 10,
+        'due_at': past.isoformat(),
+    })
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    assert (await run_due()).executed == 1
+    # the next day run is due already
+    assert (await run_due()).executed == 1
+    assert (await run_due()).executed == 0
+    response = await client.get(f'/balance/get/user_id/{second_user_id}')
+    assert response.json()['balance'] == 60
+    state_url = '/transfers/scheduled/user_id/{0}/transfer_id/{1}'
+    response = await client.get(
+        state_url.format(first_user_id, recurring_id),
+    )
+    assert response.json()['status'] == 'completed'
+    assert response.json()['runs'] == 2
+
+    # insufficient funds
+    response = await client.post('/transfers/schedule', json={
+        'sender_id': first_user_id,
+        'recipient_id': second_user_id,
+        'total': 50,
+        'due_at': past.isoformat(),
+    })
+    failing_id = response.json()['transfer_id']
+    assert (await run_due()).failed == 1
+    response = await client.get(state_url.format(first_user_id, failing_id))
+    assert response.json()['status'] == 'failed'
+    assert response.json()['last_error']
+
+    # cancel
+    cancel_url = '/transfers/cancel/user_id/{0}/transfer_id/{1}'
+    response = await client.post(cancel_url.format(first_user_id, future_id))
+    assert response.status_code == status.HTTP_200_OK
+    response = await client.post(cancel_url.format(first_user_id, future_id))
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    response = await client.get(state_url.format(second_user_id, future_id))
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+async def test_queued_transfer(client: AsyncClient, initialized_app):
+    # tests preparing
+    for user_id in (first_user_id, second_user_id):
+        await client.post(f'/account/create/user_id/{user_id}')
+    await client.post(
+        '/balance/change',
+        json={
+            'operation': OperationType.replenishment,
+            'user_id': first_user_id,
+            'total': 100,
+        },
+    )
+
+    # tests
+    response = await client.post('/transactions/transfer/queue', json={
+        'sender_id': first_user_id,
+        'recipient_id': second_user_id,
+        'total': 40,
+    })
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    status_url = response.json()['status_url']
+    response = await client.get(status_url)
+    assert response.json()['status'] == 'scheduled'
+    transfers_run = await run_scheduled_transfers(
+        initialized_app.state.shards, batch_size=10, concurrency=2, lease=60,
+    )
+    assert transfers_run.executed == 1
+    response = await client.get(status_url)
+    assert response.json()['status'] == 'completed'
+    response = await client.get(f'/balance/get/user_id/{second_user_id}')
+    assert response.json()['balance'] == 40
+    response = await client.post('/transactions/transfer/queue', json={
+        'sender_id': nonexistent_user,
+        'recipient_id': second_user_id,
+        'total': 40,
+    })
+    assert response.status_code == status.HTTP_404_NOT_FOUND
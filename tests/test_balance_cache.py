@@ -0,0 +1,91 @@
+"""Balance cache test module."""
+import asyncio
+import time
+
+import pytest
+from paymaster.database import balance_cache
+from paymaster.database.balance_cache import (
+    BalanceCache,
+    BalanceChangesListener,
+)
+from paymaster.money import Money
+
+user_id = 444
+balance = Money(1234)
+
+
+def test_hit_and_miss():
+    cache = BalanceCache(max_size=10, max_age=60)
+    assert cache.get(user_id, max_staleness=10) is None
+    cache.put(user_id, balance, time.monotonic())
+    assert cache.get(user_id, max_staleness=10) == balance
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 1
+    assert cache.stats()['hit_ratio'] == 0.5
+
+
+def test_invalidated_before_store():
+    cache = BalanceCache(max_size=10, max_age=60)
+    read_at = time.monotonic()
+    cache.invalidate(user_id, seq=42)
+    cache.put(user_id, balance, read_at)
+    assert cache.get(user_id, max_staleness=10) is None
+    assert cache.stats()['last_seq'] == 42
+
+
+def test_staleness_bound():
+    cache = BalanceCache(max_size=10, max_age=60)
+    cache.put(user_id, balance, time.monotonic())
+    time.sleep(0.05)
+    assert cache.get(user_id, max_staleness=0.01) is None
+    assert cache.get(user_id, max_staleness=10) == balance
+
+
+def test_suspended_and_evicted():
+    cache = BalanceCache(max_size=1, max_age=60)
+    cache.suspended = True
+    cache.put(user_id, balance, time.monotonic())
+    assert cache.get(user_id, max_staleness=10) is None
+    cache.suspended = False
+    cache.put(user_id, balance, time.monotonic())
+    cache.put(user_id + 1, balance, time.monotonic())
+    assert cache.get(user_id, max_staleness=10) is None
+    assert cache.get(user_id + 1, max_staleness=10) == balance
+
+
+def test_evicted_tombstone():
+    cache = BalanceCache(max_size=1, max_age=60)
+    read_at = time.monotonic()
+    cache.invalidate(user_id)
+    cache.put(user_id + 1, balance, time.monotonic())
+    cache.put(user_id, balance, read_at)
+    assert cache.get(user_id, max_staleness=10) is None
+
+
+class FlakyConnection(object):
+    failures = 1
+
+    def add_termination_listener(self, callback):
+        pass
+
+    async def add_listener(self, channel, callback):
+        if FlakyConnection.failures:
+            FlakyConnection.failures -= 1
+            raise OSError('Connection lost')
+
+    async def close(self):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_listener_reconnects_after_failure(monkeypatch):
+    async def connect(dsn):
+        return FlakyConnection()
+
+    monkeypatch.setattr(balance_cache, 'connect', connect)
+    cache = BalanceCache(max_size=10, max_age=60)
+    listener = BalanceChangesListener(cache, ['first', 'second'], 0)
+    listener.start()
+    await asyncio.sleep(0.01)
+    assert not cache.suspended
+    await listener.close()
@@ -0,0 +1,32 @@
+"""Cancellation of database calls test module."""
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from paymaster.app.cancellation import (
+    HTTP_499_CLIENT_CLOSED_REQUEST,
+    run_within_budget,
+)
+
+pytestmark = pytest.mark.asyncio
+
+
+class DisconnectedRequest(object):
+    async def is_disconnected(self):
+        return True
+
+
+async def test_disconnect_waits_for_canceled_call():
+    unwound = asyncio.Event()
+
+    async def db_call():
+        try:
+            await asyncio.sleep(10)
+        finally:
+            await asyncio.sleep(0.01)
+            unwound.set()
+
+    with pytest.raises(HTTPException) as exc_info:
+        await run_within_budget(DisconnectedRequest(), db_call())
+    assert exc_info.value.status_code == HTTP_499_CLIENT_CLOSED_REQUEST
+    assert unwound.is_set()
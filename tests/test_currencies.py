@@ -1,20 +1,24 @@
 """Currencies test module."""
 import os
-import threading
-import time
 from datetime import datetime, timedelta
+from decimal import Decimal
 
-import freezegun
 import pytest
 from asyncpg import connect
 from dotenv import load_dotenv
 from httpx import AsyncClient, Request, Response
 from paymaster.app.data_schemas import OperationType
-from paymaster.currencies import BASE_CURRENCY, get_currencies_rates
+from paymaster.currencies import (
+    BASE_CURRENCY,
+    CrossRates,
+    get_currencies_rates,
+)
 from paymaster.scripts.background_tasks import (
-    _set_task,
+    seconds_until,
     update_currency_rates_job,
 )
+from paymaster.exceptions import CurrencyError
+from paymaster.money import Money
 from pytest_httpx import HTTPXMock
 
 pytestmark = pytest.mark.asyncio
@@ -50,28 +54,39 @@ async def test_background_currencies_update(
     client: AsyncClient,
     dsn: str,
 ):
-    hour, minute = [int(timer) for timer in TRIGGER_TIME.split(':')]
     db_conn = await connect(dsn)
     httpx_mock.add_callback(custom_response)
     await update_currency_rates_job(db_conn)
-    now = datetime(1970, 1, 1, hour, minute)
-    with freezegun.freeze_time(now) as frozen_date:
-        job_thread = threading.Thread(target=_set_task)
-        job_thread.start()
-        frozen_date.move_to(now + timedelta(days=1))
-        time.sleep(1)
-        user_id = 42
-        await client.post(f'/account/create/user_id/{user_id}')
-        await client.post(
-            '/balance/change',
-            json={
-                'operation': OperationType.replenishment,
-                'user_id': user_id,
-                'total': 1,
-                'description': OperationType.replenishment,
-            },
-        )
-        response = await client.get(f'/balance/get/user_id/{user_id}?currency=USD')
-        response = response.json()
-        assert response['balance'] == round(USD_RATE, 2)
-        job_thread.join(1.0)
+    user_id = 42
+    await client.post(f'/account/create/user_id/{user_id}')
+    await client.post(
+        '/balance/change',
+        json={
+            'operation': OperationType.replenishment,
+            'user_id': user_id,
+            'total': 1,
+            'description': OperationType.replenishment,
+        },
+    )
+    response = await client.get(f'/balance/get/user_id/{user_id}?currency=USD')
+    response = response.json()
+    assert response['balance'] == round(USD_RATE, 2)
+
+
+def test_daily_trigger():
+    hour, minute = [int(timer) for timer in TRIGGER_TIME.split(':')]
+    triggered_at = datetime(1970, 1, 2, hour, minute)
+    before = triggered_at - timedelta(minutes=1)
+    assert seconds_until(TRIGGER_TIME, before) == 60
+    assert seconds_until(TRIGGER_TIME, triggered_at) == 24 * 60 * 60
+
+
+def test_cross_rates():
+    cross_rates = CrossRates({'USD': Decimal('0.0132'), 'EUR': Decimal('0.0121')})
+    converted = cross_rates.convert_batch(
+        [Money(10000), Money(100), Money(500)],
+        [(BASE_CURRENCY, 'usd'), ('USD', 'EUR'), ('EUR', BASE_CURRENCY)],
+    )
+    assert converted == [Money(132), Money(92), Money(41322)]
+    with pytest.raises(CurrencyError):
+        cross_rates.convert(Money(100), 'USD', 'XXX')
@@ -0,0 +1,52 @@
+"""Ledger hash chains test module."""
+import pytest
+from asyncpg import connect
+from fastapi import FastAPI
+from httpx import AsyncClient
+from paymaster.app.data_schemas import OperationType
+from paymaster.database.ledger_chain import verify_ledger
+
+pytestmark = pytest.mark.asyncio
+
+user_id = 444
+
+
+async def replenish(client: AsyncClient, total: int) -> None:
+    await client.post(
+        '/balance/change',
+        json={
+            'operation': OperationType.replenishment,
+            'user_id': user_id,
+            'total': total,
+        },
+    )
+
+
+async def test_incremental_verification(
+    client: AsyncClient, initialized_app: FastAPI, dsn: str,
+):
+    router = initialized_app.state.shards
+    await client.post(f'/account/create/user_id/{user_id}')
+    for total in (10, 20, 30):
+        await replenish(client, total)
+
+    verification = await verify_ledger(router, concurrency=2, batch_size=2)
+    assert verification == (3, 0)
+    await replenish(client, 40)
+    verification = await verify_ledger(router, concurrency=2, batch_size=2)
+    assert verification == (1, 0)
+
+    # tampered transaction isn't verified yet
+    await replenish(client, 50)
+    db_con = await connect(dsn)
+    try:
+        await db_con.execute(
+            'UPDATE transactions SET qty_change = 1 WHERE chain_seq = 5;',
+        )
+    finally:
+        await db_con.close()
+    verification = await verify_ledger(router, concurrency=2, batch_size=2)
+    assert verification == (0, 1)
+    await replenish(client, 60)
+    verification = await verify_ledger(router, concurrency=2, batch_size=2)
+    assert verification == (0, 0)
@@ -0,0 +1,28 @@
+"""Ledger import parsing test module."""
+from typing import AsyncIterator, List, Optional, Tuple
+
+import pytest
+from paymaster.app.ledger_import import iter_lines
+
+pytestmark = pytest.mark.asyncio
+
+
+async def split(
+    chunks: List[bytes], max_line_length: int,
+) -> List[Tuple[int, Optional[bytes]]]:
+    async def stream() -> AsyncIterator[bytes]:  # noqa: WPS430
+        for chunk in chunks:
+            yield chunk
+    return [line async for line in iter_lines(stream(), max_line_length)]
+
+
+async def test_lines_across_chunks():
+    lines = await split([b'{"a"', b': 1}\n{"b": 2}\n', b'\n{"c"', b': 3}'], 100)
+    assert lines == [
+        (1, b'{"a": 1}'), (2, b'{"b": 2}'), (3, b''), (4, b'{"c": 3}'),
+    ]
+
+
+async def test_too_long_line_skipped():
+    lines = await split([b'x' * 8, b'x' * 8, b'x\nok\n', b'y' * 20], 10)
+    assert lines == [(1, None), (2, b'ok'), (3, None)]
@@ -0,0 +1,46 @@
+"""Money test module."""
+from decimal import Decimal
+
+import pytest
+from fastapi.encoders import jsonable_encoder
+from paymaster.app.data_schemas import PageOut, TotalValue
+from paymaster.app.responses import MoneyJSONResponse
+from paymaster.money import Money
+
+
+@pytest.mark.parametrize('amount, minor', [
+    (12, 1200),
+    ('12.3', 1230),
+    (0.1, 10),
+    (Decimal('-0.01'), -1),
+])
+def test_from_major(amount, minor):
+    assert Money.from_major(amount) == Money(minor)
+
+
+@pytest.mark.parametrize('amount', ['1.005', 'NaN', 'Infinity', 'x'])
+def test_invalid_amount(amount):
+    with pytest.raises(ValueError):
+        Money.from_major(amount)
+
+
+def test_total_is_positive():
+    with pytest.raises(ValueError):
+        TotalValue.validate(0)
+
+
+def test_convert_rounds_half_to_even():
+    assert Money(5).convert(Decimal('0.5')) == Money(2)
+    assert Money(15).convert(Decimal('0.5')) == Money(8)
+
+
+def test_render():
+    page = PageOut(content=({'total': Money(-150)},))
+    assert page.json(include={'content'}) == '{"content": [{"total": -1.5}]}'
+
+
+def test_render_exact():
+    # nearest float of this amount ends with 94 cents
+    page = PageOut(content=({'total': Money(9007199254740993)},))
+    response = MoneyJSONResponse(jsonable_encoder(page, include={'content'}))
+    assert response.body == b'{"content":[{"total":90071992547409.93}]}'
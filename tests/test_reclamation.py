@@ -0,0 +1,52 @@
+"""Deleted accounts reclamation test module."""
+import pytest
+from asyncpg import connect
+from fastapi import FastAPI
+from httpx import AsyncClient
+from paymaster.app.data_schemas import OperationType
+from paymaster.database.ledger_chain import verify_ledger
+from paymaster.database.reclamation import reclaim_accounts
+
+pytestmark = pytest.mark.asyncio
+
+deleted_user = 444
+active_user = 555
+
+
+async def test_reclaim_deleted_account(
+    client: AsyncClient, initialized_app: FastAPI, dsn: str,
+):
+    router = initialized_app.state.shards
+    for user_id in (deleted_user, active_user):
+        await client.post(f'/account/create/user_id/{user_id}')
+        for _ in range(5):
+            await client.post(
+                '/balance/change',
+                json={
+                    'operation': OperationType.replenishment,
+                    'user_id': user_id,
+                    'total': 10,
+                },
+            )
+    await client.delete(f'/account/delete/user_id/{deleted_user}')
+
+    reclaim = {
+        'retention': 3600, 'batch_size': 2, 'duty_cycle': 0.5, 'max_accounts': 10,
+    }
+    assert await reclaim_accounts(router, **reclaim) == (0, 0)
+    db_con = await connect(dsn)
+    try:
+        await db_con.execute(
+            "UPDATE accounts SET deleted_at = deleted_at - interval '2 hours';",  # noqa: E501
+        )
+        # ledger isn't archived until its hash chains are verified
+        assert await reclaim_accounts(router, **reclaim) == (0, 0)
+        await verify_ledger(router, concurrency=2, batch_size=100)
+        assert await reclaim_accounts(router, **reclaim) == (1, 5)
+        assert await reclaim_accounts(router, **reclaim) == (0, 0)
+        assert await db_con.fetchval(
+            'SELECT count(*) FROM transactions_archive;',
+        ) == 5
+        assert await db_con.fetchval('SELECT count(*) FROM transactions;') == 5
+    finally:
+        await db_con.close()
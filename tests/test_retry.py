@@ -0,0 +1,82 @@
+"""Transactions retries test module."""
+import pytest
+from asyncpg import exceptions
+from paymaster.database.retry import RetryStats, run_with_retries
+from paymaster.exceptions import TransactionConflictError
+
+pytestmark = pytest.mark.asyncio
+
+
+class FlakyTransaction(object):
+    def __init__(self, failures):
+        self.failures = list(failures)
+        self.attempts = 0
+
+    async def __call__(self):
+        self.attempts += 1
+        if self.failures:
+            raise self.failures.pop(0)
+        return 'committed'
+
+
+def make_retry(transaction, stats, **kwargs):
+    params = {
+        'max_attempts': 3,
+        'base_delay': 0.001,
+        'max_delay': 0.01,
+        'time_budget': 1,
+        'stats': stats,
+    }
+    params.update(kwargs)
+    return run_with_retries(transaction, **params)
+
+
+async def test_recovered_after_conflicts():
+    stats = RetryStats()
+    transaction = FlakyTransaction([
+        exceptions.SerializationError('could not serialize access'),
+        exceptions.DeadlockDetectedError('deadlock detected'),
+    ])
+    assert await make_retry(transaction, stats) == 'committed'
+    assert transaction.attempts == 3
+    assert stats.stats() == {
+        'retries': {'SerializationError': 1, 'DeadlockDetectedError': 1},
+        'recovered': 1,
+        'exhausted': 0,
+    }
+
+
+async def test_attempts_exhausted():
+    stats = RetryStats()
+    transaction = FlakyTransaction([
+        exceptions.SerializationError('could not serialize access'),
+    ] * 3)
+    with pytest.raises(TransactionConflictError):
+        await make_retry(transaction, stats)
+    assert transaction.attempts == 3
+    assert stats.exhausted == 1
+    assert stats.recovered == 0
+
+
+async def test_time_budget_exhausted():
+    stats = RetryStats()
+    transaction = FlakyTransaction([
+        exceptions.DeadlockDetectedError('deadlock detected'),
+    ] * 3)
+    with pytest.raises(TransactionConflictError):
+        await make_retry(
+            transaction, stats, base_delay=10, max_delay=10, time_budget=0,
+        )
+    assert transaction.attempts == 1
+    assert stats.exhausted == 1
+
+
+async def test_other_errors_not_retried():
+    stats = RetryStats()
+    transaction = FlakyTransaction([
+        exceptions.UniqueViolationError('duplicate key'),
+    ])
+    with pytest.raises(exceptions.UniqueViolationError):
+        await make_retry(transaction, stats)
+    assert transaction.attempts == 1
+    assert stats.stats()['retries'] == {}
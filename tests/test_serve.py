@@ -0,0 +1,27 @@
+"""Launcher test module."""
+import pytest
+from paymaster import settings
+from paymaster.scripts.serve import _check_budget
+
+
+@pytest.fixture
+def pools(monkeypatch):
+    monkeypatch.setattr(settings, 'WORKER_LISTENERS', 1)
+    monkeypatch.setattr(settings, 'POOL_PROCESSES', 4)
+    monkeypatch.setattr(settings, 'EXTRA_CONNECTIONS', 3)
+    monkeypatch.setattr(settings, 'POOL_WRITE_RESERVE', 2)
+    monkeypatch.setattr(settings, 'POOL_MAX_SIZE', 10)
+
+
+def test_budget_counts_all_pools(pools, monkeypatch):
+    monkeypatch.setattr(settings, 'DB_CONNECTIONS_BUDGET', 43)
+    assert _check_budget() == 11
+    monkeypatch.setattr(settings, 'DB_CONNECTIONS_BUDGET', 42)
+    with pytest.raises(SystemExit):
+        _check_budget()
+
+
+def test_pool_exceeds_write_reserve(pools, monkeypatch):
+    monkeypatch.setattr(settings, 'POOL_MAX_SIZE', 2)
+    with pytest.raises(SystemExit):
+        _check_budget()
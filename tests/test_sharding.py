@@ -0,0 +1,183 @@
+"""Sharding test module."""
+import uuid
+from datetime import datetime
+
+import pytest
+from asyncpg import connect, exceptions
+from fastapi import status
+from httpx import AsyncClient
+from paymaster.app.data_schemas import OperationType
+from paymaster.database.currency_rates import update_rates
+from paymaster.database.db import (
+    change_balance,
+    create_acc,
+    debit_saga,
+    fetch_currency_rates,
+    schedule_transfer,
+)
+from paymaster.database.sagas import recover_sagas
+from paymaster.database.scheduled_transfers import run_scheduled_transfers
+from paymaster.database.sharding import (
+    TRANSACTION_POOLER_MODE,
+    create_shard_router,
+)
+from paymaster.money import Money
+
+pytestmark = pytest.mark.asyncio
+
+# with two shards even ids are stored in first shard, odd ids in second
+first_shard_user = 2
+second_shard_user = 3
+nonexistent_user = 5
+
+
+async def test_cross_shard_transfer(sharded_client: AsyncClient):
+    for user_id in (first_shard_user, second_shard_user):
+        response = await sharded_client.post(f'/account/create/user_id/{user_id}')
+        assert response.status_code == status.HTTP_201_CREATED
+    await sharded_client.post(
+        '/balance/change',
+        json={
+            'operation': OperationType.replenishment,
+            'user_id': first_shard_user,
+            'total': 100,
+        },
+    )
+
+    response = await sharded_client.post(
+        '/transactions/transfer',
+        json={
+            'sender_id': first_shard_user,
+            'recipient_id': second_shard_user,
+            'total': 40,
+        },
+    )
+    assert response.status_code == status.HTTP_201_CREATED
+    response = await sharded_client.get(f'/balance/get/user_id/{first_shard_user}')
+    assert response.json()['balance'] == 60
+    response = await sharded_client.get(f'/balance/get/user_id/{second_shard_user}')
+    assert response.json()['balance'] == 40
+    response = await sharded_client.get(f'/transactions/history/user_id/{second_shard_user}')
+    history = response.json()['content']
+    assert history[0]['deal_with'] == first_shard_user
+    assert history[0]['description'] == 'incoming payment'
+
+    # with nonexistent recipient on another shard
+    response = await sharded_client.post(
+        '/transactions/transfer',
+        json={
+            'sender_id': first_shard_user,
+            'recipient_id': nonexistent_user,
+            'total': 40,
+        },
+    )
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    response = await sharded_client.get(f'/balance/get/user_id/{first_shard_user}')
+    assert response.json()['balance'] == 60
+
+
+async def test_interrupted_saga_recovery(shard_dsns):
+    router = await create_shard_router(shard_dsns)
+    try:
+        for user_id in (first_shard_user, second_shard_user):
+            async with router.connection(user_id) as db_con:
+                await create_acc(user_id, db_con)
+        async with router.connection(first_shard_user) as db_con:
+            await change_balance(
+                user_id=first_shard_user,
+                qty_value=Money(10000),
+                operation_type=OperationType.replenishment,
+                db_con=db_con,
+            )
+            # crash after the debit step
+            await debit_saga(
+                saga_id=uuid.uuid4(),
+                sender_id=first_shard_user,
+                recipient_id=second_shard_user,
+                qty_value=Money(4000),
+                db_con=db_con,
+            )
+
+        assert await recover_sagas(router, older_than=0) == 1
+        assert await recover_sagas(router, older_than=0) == 0
+        async with router.connection(second_shard_user) as db_con:
+            history = await db_con.fetch(
+                'SELECT qty_change FROM transactions;',
+            )
+        assert [row['qty_change'] for row in history] == [4000]
+    finally:
+        await router.close()
+
+
+async def test_transaction_pooler_mode(shard_dsns):
+    router = await create_shard_router(shard_dsns, TRANSACTION_POOLER_MODE)
+    try:
+        async with router.connection(first_shard_user) as db_con:
+            await create_acc(first_shard_user, db_con)
+            await db_con.set_statement_timeout(100)
+            with pytest.raises(exceptions.QueryCanceledError):
+                await db_con.execute('SELECT pg_sleep(1);')
+        async with router.connection(first_shard_user) as db_con:
+            # neither timeout nor statements are left after release
+            await db_con.execute('SELECT pg_sleep(0.2);')
+            assert await db_con.fetchval('SHOW statement_timeout;') == '0'
+            assert not await db_con.fetchval(
+                'SELECT count(*) FROM pg_prepared_statements;',
+            )
+    finally:
+        await router.close()
+
+
+async def test_scheduled_transfer_due_in_utc(shard_dsns):
+    # server time zone is behind UTC, so its local time isn't due yet
+    for shard_dsn in shard_dsns:
+        db_con = await connect(shard_dsn)
+        database = shard_dsn.rsplit('/', 1)[1]
+        await db_con.execute(
+            f"ALTER DATABASE {database} SET timezone = 'Pacific/Honolulu';",
+        )
+        await db_con.close()
+    router = await create_shard_router(shard_dsns)
+    try:
+        for user_id in (first_shard_user, second_shard_user):
+            async with router.connection(user_id) as db_con:
+                await create_acc(user_id, db_con)
+        async with router.connection(first_shard_user) as db_con:
+            await change_balance(
+                user_id=first_shard_user,
+                qty_value=Money(10000),
+                operation_type=OperationType.replenishment,
+                db_con=db_con,
+            )
+            await schedule_transfer(
+                transfer_id=uuid.uuid4(),
+                sender_id=first_shard_user,
+                recipient_id=second_shard_user,
+                qty_value=Money(4000),
+                due_at=datetime.utcnow(),
+                db_con=db_con,
+            )
+        transfers_run = await run_scheduled_transfers(
+            router, batch_size=10, concurrency=1, lease=60,
+        )
+        assert transfers_run.executed == 1
+    finally:
+        await router.close()
+
+
+async def test_rates_shard_updated_last(shard_dsns):
+    router = await create_shard_router(shard_dsns)
+    try:
+        await update_rates(router, [('USD', 0.5)])
+        for shard_user in (first_shard_user, second_shard_user):
+            async with router.connection(shard_user) as db_con:
+                assert await fetch_currency_rates(db_con) == {'USD': 0.5}
+        async with router.connection(second_shard_user) as db_con:
+            await db_con.execute('DROP TABLE currencies;')
+        with pytest.raises(exceptions.UndefinedTableError):
+            await update_rates(router, [('USD', 0.25)])
+        # rates are read from the first shard, it keeps the previous ones
+        async with router.connection(first_shard_user) as db_con:
+            assert await fetch_currency_rates(db_con) == {'USD': 0.5}
+    finally:
+        await router.close()
@@ -0,0 +1,63 @@
+"""Tracing test module."""
+import asyncio
+import json
+
+import pytest
+from fastapi import APIRouter, FastAPI
+from httpx import AsyncClient
+from paymaster.app.traced_route import TracedRoute
+from paymaster.tracing import TracingMiddleware, span
+from pydantic import BaseModel
+
+pytestmark = pytest.mark.asyncio
+
+
+class Item(BaseModel):
+    name: str
+
+
+def make_app(tmp_path) -> FastAPI:
+    router = APIRouter(route_class=TracedRoute)
+
+    @router.post('/items', response_model=Item)
+    async def create_item(item: Item):  # noqa: WPS430
+        with span('db.query', query='SELECT 1'):
+            await asyncio.sleep(0.05)
+        return item
+
+    app = FastAPI()
+    app.include_router(router)
+    app.add_middleware(
+        TracingMiddleware,
+        trace_dir=str(tmp_path),
+        profile_dir=str(tmp_path),
+        profile_threshold=10,
+        profile_interval=0.001,
+    )
+    return app
+
+
+async def test_traced_and_profiled_by_header(tmp_path):
+    async with AsyncClient(app=make_app(tmp_path), base_url='http://test') as client:  # noqa: E501
+        response = await client.post('/items', json={'name': 'first'})
+        assert response.status_code == 200
+        assert not list(tmp_path.iterdir())
+        response = await client.post(
+            '/items',
+            json={'name': 'second'},
+            headers={'X-Trace': '1', 'X-Profile': '1'},
+        )
+        assert response.json() == {'name': 'second'}
+
+    trace_file = next(tmp_path.glob('trace-*.json'))
+    events = json.loads(trace_file.read_text().rstrip(',\n') + ']')
+    assert [event['name'] for event in events] == [
+        'db.query',
+        'endpoint create_item',
+        'request.validation',
+        'response.serialization',
+        'POST /items',
+    ]
+    assert events[0]['args'] == {'query': 'SELECT 1'}
+    profile = next(tmp_path.glob('*.folded')).read_text()
+    assert profile.strip()